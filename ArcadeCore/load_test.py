@@ -0,0 +1,316 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import secrets
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+# Load tester for the arcade APIs: many simulated players hitting Connect Four
+# (ConnectFour/api_server.py) and Infinity Word (InfinityWord/word_api.py) at once.
+#
+#   python load_test.py --connect4-players 50 --word-players 20 --duration 60
+#   python load_test.py --mode http --connect4-url http://localhost:8001 --word-url http://localhost:8002
+#
+# --mode asgi (default) imports the apps and calls them in-process, so no servers are
+# needed but the load generator shares the CPU with them; --mode http goes through real
+# sockets to running servers (e.g. `uvicorn word_api:app --port 8002` in InfinityWord/).
+# Results (throughput and p50/p95/p99 latency per endpoint) are printed and written to
+# --output as JSON.
+#
+# Needs httpx, which the servers don't: pip install -r requirements-dev.txt
+#
+# Connect Four grants pro/vip tiers only to API keys listed in its TIER_API_KEYS, so a
+# --tier-mix above free_tier needs --api-key in http mode. In asgi mode, without a key,
+# a throwaway vip key is generated and configured for the in-process app.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = ["APPLE", "BEACH", "BRAIN", "SPEED", "LEVEL", "ENTER", "CRANE", "SLATE", "GHOST", "PIANO",
+         "HOUSE", "TRAIN", "PLANT", "SNAKE", "ZEBRA", "QUICK", "WALTZ", "ADIEU", "RAISE", "STONE"]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def parse_mix(text):
+    """'easy=5,medium=3,hard=2' -> ({'easy': 5.0, ...})"""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def parse_range(text):
+    """'0.5:2' -> (0.5, 2.0); '1' -> (1.0, 1.0)"""
+    low, _, high = text.partition(":")
+    return float(low), float(high or low)
+
+
+class Recorder:
+    """Latency samples and status counts per endpoint (method + route template)."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+
+    async def request(self, client, endpoint, method, url, **kwargs):
+        """Send one request and record it. Returns the response, or None on a transport error."""
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[endpoint] += 1
+            self.statuses[endpoint]["error"] += 1
+            return None
+        self.latencies[endpoint].append(time.perf_counter() - start)
+        self.statuses[endpoint][str(response.status_code)] += 1
+        if response.status_code >= 400:
+            self.errors[endpoint] += 1
+        return response
+
+    def report(self, elapsed):
+        endpoints = {}
+        total = errors = 0
+        for endpoint in sorted(self.statuses):
+            samples = sorted(self.latencies[endpoint])
+            count = sum(self.statuses[endpoint].values())
+            total += count
+            errors += self.errors[endpoint]
+            endpoints[endpoint] = {
+                "requests": count,
+                "errors": self.errors[endpoint],
+                "statuses": dict(self.statuses[endpoint]),
+                "throughput_rps": round(count / elapsed, 2),
+                "latency_ms": {
+                    "mean": round(1000 * sum(samples) / len(samples), 3) if samples else None,
+                    "p50": round(1000 * percentile(samples, 50), 3) if samples else None,
+                    "p95": round(1000 * percentile(samples, 95), 3) if samples else None,
+                    "p99": round(1000 * percentile(samples, 99), 3) if samples else None,
+                    "max": round(1000 * samples[-1], 3) if samples else None,
+                },
+            }
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "requests": total,
+            "errors": errors,
+            "throughput_rps": round(total / elapsed, 2),
+            "endpoints": endpoints,
+        }
+
+
+async def think(think_time):
+    await asyncio.sleep(random.uniform(*think_time))
+
+
+async def connect4_player(client, recorder, args, deadline):
+    """Plays human-vs-bot games back to back until the deadline."""
+    fmt = {"format": args.board_format}
+    difficulties = list(args.difficulty_mix)
+    weights = list(args.difficulty_mix.values())
+    tiers = list(args.tier_mix)
+    tier_weights = list(args.tier_mix.values())
+    while time.time() < deadline:
+        difficulty = random.choices(difficulties, weights)[0]
+        tier = random.choices(tiers, tier_weights)[0]
+        # With several tiers, bot endpoints are reported per tier
+        suffix = f" [{tier}]" if len(tiers) > 1 else ""
+        r = await recorder.request(client, "POST /api/games/new", "POST", "/api/games/new", params=fmt,
+                                   json={"player1_type": "human", "player2_type": "bot", "difficulty": difficulty,
+                                         "tier": tier})
+        if r is None or r.status_code != 200:
+            await think(args.think_time)
+            continue
+        game_id = r.json()["game_id"]
+        # Column heights tracked here, so every --board-format (even no board) works
+        heights = [0] * 7
+        game_over = False
+        while not game_over and time.time() < deadline:
+            await think(args.think_time)
+            move = {"column": random.choice([col for col in range(7) if heights[col] < 6]), "player": 1}
+            if random.random() < args.turn_share:
+                r = await recorder.request(client, "POST /api/games/{id}/turn" + suffix, "POST",
+                                           f"/api/games/{game_id}/turn", params=fmt, json=move)
+            else:
+                r = await recorder.request(client, "POST /api/games/{id}/move", "POST",
+                                           f"/api/games/{game_id}/move", params=fmt, json=move)
+                if r is not None and r.status_code == 200 and not r.json()["game_over"]:
+                    r = await recorder.request(client, "GET /api/games/{id}/bot-move" + suffix, "GET",
+                                               f"/api/games/{game_id}/bot-move", params=fmt)
+            if r is None or r.status_code != 200:
+                break
+            body = r.json()
+            heights[move["column"]] += 1
+            if "bot_move" in body: # /turn (bot_move is None if our move ended the game)
+                reply = body["bot_move"]
+            elif "reasoning" in body: # /bot-move
+                reply = body
+            else: # /move that ended the game
+                reply = None
+            if reply is not None:
+                heights[reply["column"]] += 1
+            game_over = body["game_over"]
+            if random.random() < args.state_share:
+                await recorder.request(client, "GET /api/games/{id}/state", "GET",
+                                       f"/api/games/{game_id}/state", params=fmt)
+        await recorder.request(client, "DELETE /api/games/{id}", "DELETE", f"/api/games/{game_id}")
+
+
+async def word_player(client, recorder, args, deadline):
+    """Plays rounds of six guesses against a random target until the deadline."""
+    while time.time() < deadline:
+        target = random.choice(WORDS)
+        for _ in range(6):
+            await think(args.think_time)
+            if time.time() >= deadline:
+                return
+            guess = random.choice(WORDS)
+            r = await recorder.request(client, "POST /api/validate", "POST", "/api/validate",
+                                       json={"guess": guess, "target": target})
+            if r is None or guess == target:
+                break
+        if random.random() < args.state_share:
+            await recorder.request(client, "GET /api/health", "GET", "/api/health")
+
+
+def load_app(directory, module_name):
+    """Import an API module the way it is run: from its own directory, flat imports."""
+    path = os.path.join(ROOT, directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    cwd = os.getcwd()
+    os.chdir(path) # Some modules read data files relative to where they run
+    try:
+        return __import__(module_name)
+    finally:
+        os.chdir(cwd)
+
+
+def make_client(args, game, players):
+    limits = httpx.Limits(max_connections=max(players, 1), max_keepalive_connections=max(players, 1))
+    timeout = httpx.Timeout(args.timeout)
+    headers = {"X-API-Key": args.api_key} if game == "connect4" and args.api_key else None
+    if args.mode == "http":
+        url = args.connect4_url if game == "connect4" else args.word_url
+        return httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout, headers=headers), None
+    if game == "connect4" and args.api_key is None and "TIER_API_KEYS" not in os.environ:
+        args.api_key = secrets.token_hex(16) # Read by api_server at import
+        os.environ["TIER_API_KEYS"] = f"{args.api_key}:vip"
+        headers = {"X-API-Key": args.api_key}
+    module = load_app("ConnectFour", "api_server") if game == "connect4" else load_app("InfinityWord", "word_api")
+    if hasattr(module, "bot_pool"):
+        module.bot_pool.start() # No lifespan events over ASGITransport; warm the workers up front
+    transport = httpx.ASGITransport(app=module.app)
+    return httpx.AsyncClient(transport=transport, base_url="http://loadtest", limits=limits, timeout=timeout,
+                             headers=headers), module
+
+
+async def run(args):
+    recorder = Recorder()
+    clients = []
+    players = []
+    modules = []
+    start = time.time()
+    deadline = start + args.ramp_up + args.duration
+    for game, count, player in (("connect4", args.connect4_players, connect4_player),
+                                ("word", args.word_players, word_player)):
+        if count <= 0:
+            continue
+        client, module = make_client(args, game, count)
+        clients.append(client)
+        if module is not None:
+            modules.append(module)
+        for i in range(count):
+            players.append(delayed(args.ramp_up * i / count, player(client, recorder, args, deadline)))
+
+    try:
+        await asyncio.gather(*players)
+    finally:
+        for client in clients:
+            await client.aclose()
+        for module in modules:
+            # In-process Connect Four owns a bot worker pool; don't leave it running
+            pool = getattr(module, "bot_pool", None)
+            if pool is not None:
+                pool.shutdown()
+    return recorder.report(time.time() - start)
+
+
+async def delayed(delay, coro):
+    await asyncio.sleep(delay)
+    await coro
+
+
+def print_report(report):
+    print(f"\n{report['requests']} requests in {report['elapsed_seconds']}s "
+          f"({report['throughput_rps']} req/s, {report['errors']} errors)\n")
+    print(f"{'endpoint':<48} {'reqs':>7} {'err':>5} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint, stats in report["endpoints"].items():
+        latency = stats["latency_ms"]
+        print(f"{endpoint:<48} {stats['requests']:>7} {stats['errors']:>5} {stats['throughput_rps']:>8} "
+              f"{latency['p50'] or '-':>9} {latency['p95'] or '-':>9} {latency['p99'] or '-':>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the Connect Four and Infinity Word APIs.")
+    parser.add_argument("--mode", choices=("asgi", "http"), default="asgi",
+                        help="asgi: call the apps in-process; http: hit running servers")
+    parser.add_argument("--connect4-url", default="http://localhost:8001")
+    parser.add_argument("--word-url", default="http://localhost:8002")
+    parser.add_argument("--connect4-players", type=int, default=20)
+    parser.add_argument("--word-players", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="seconds of full load after ramp-up")
+    parser.add_argument("--ramp-up", type=float, default=5, help="seconds over which players join")
+    parser.add_argument("--think-time", type=parse_range, default=(0.2, 1.0),
+                        help="seconds between a player's actions, 'min:max'")
+    parser.add_argument("--difficulty-mix", type=parse_mix, default=parse_mix("easy=5,medium=4,hard=1"),
+                        help="bot difficulty weights, e.g. 'easy=5,medium=4,hard=1'")
+    parser.add_argument("--tier-mix", type=parse_mix, default=parse_mix("free_tier=1"),
+                        help="player subscription tier weights, e.g. 'free_tier=8,pro=1,vip=1'")
+    parser.add_argument("--api-key", default=None,
+                        help="Connect Four API key (X-API-Key) granting the tiers in --tier-mix")
+    parser.add_argument("--turn-share", type=float, default=0.5,
+                        help="share of Connect Four moves sent as one /turn call instead of move + bot-move")
+    parser.add_argument("--state-share", type=float, default=0.1,
+                        help="chance of a state/health poll after each move or word round")
+    parser.add_argument("--board-format", choices=("full", "compact", "moves"), default="full")
+    parser.add_argument("--timeout", type=float, default=30, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", default="load_test_results.json")
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    report = asyncio.run(run(args))
+    report["config"] = {
+        "mode": args.mode,
+        "connect4_players": args.connect4_players,
+        "word_players": args.word_players,
+        "duration": args.duration,
+        "ramp_up": args.ramp_up,
+        "think_time": list(args.think_time),
+        "difficulty_mix": args.difficulty_mix,
+        "tier_mix": args.tier_mix,
+        "turn_share": args.turn_share,
+        "board_format": args.board_format,
+    }
+    print_report(report)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
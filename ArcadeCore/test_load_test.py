@@ -0,0 +1,27 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+from load_test import ROOT, main
+
+class TestLoadTest(unittest.TestCase):
+    def test_asgi_smoke_run_finishes_games(self):
+        # A relative archive directory, as by default: the app must not depend on the
+        # working directory it was imported from
+        archive = tempfile.mkdtemp(prefix="smoke_archive_", dir=os.path.join(ROOT, "ConnectFour"))
+        self.addCleanup(shutil.rmtree, archive, True)
+        os.environ["GAME_ARCHIVE_DIR"] = os.path.basename(archive)
+        self.addCleanup(os.environ.pop, "GAME_ARCHIVE_DIR", None)
+        os.environ.setdefault("BOT_POOL_WORKERS", "1")
+        output = os.path.join(archive, "report.json")
+        report = main(["--connect4-players", "2", "--word-players", "0", "--duration", "4", "--ramp-up", "0",
+                       "--think-time", "0", "--difficulty-mix", "easy=1", "--seed", "1", "--output", output])
+        self.assertGreater(report["requests"], 0)
+        self.assertEqual(report["errors"], 0)
+        self.assertTrue(any(name.startswith("segment-") for name in os.listdir(archive)))
+        with open(output) as f:
+            self.assertEqual(json.load(f)["requests"], report["requests"])
+
+if __name__ == '__main__':
+    unittest.main()
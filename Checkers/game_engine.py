@@ -1,96 +1,264 @@
-
 import json
+import random
 
 # Constants
 EMPTY = 0
 PLAYER1 = 1
 PLAYER2 = 2
-ROWS = 6
-COLS = 7
+PLAYER1_KING = 3
+PLAYER2_KING = 4
+ROWS = 8
+COLS = 8
+
+# The 32 dark squares are numbered 0-31 row by row from the top, 4 per row (square
+# n + 1 in standard checkers notation). PLAYER1 starts on the bottom three rows and
+# moves up, PLAYER2 starts on the top three and moves down; PLAYER1 moves first.
+# A position is one 32-bit mask per player plus a mask of kings.
+SQUARES = 32
+FULL = (1 << SQUARES) - 1
+START = {PLAYER1: 0xFFF00000, PLAYER2: 0x00000FFF}
+PROMOTION = {PLAYER1: 0x0000000F, PLAYER2: 0xF0000000} # Row a man is crowned on
+NO_PROGRESS_LIMIT = 80 # Plies (40 moves each) of king moves without a capture: a draw
+REPETITION_LIMIT = 3 # The same position, same side to move, this often: a draw
+
+def square_position(square):
+    """Square number -> (row, col) on the 8x8 board."""
+    row = square // 4
+    return row, 2 * (square % 4) + (1 - row % 2)
+
+def square_at(row, col):
+    """(row, col) -> square number, or None for a light square or off the board."""
+    if 0 <= row < ROWS and 0 <= col < COLS and (row + col) % 2 == 1:
+        return row * 4 + col // 2
+    return None
+
+def _tables(directions):
+    """Per square: mask of step targets, and (over bit, landing bit, landing square) of each jump."""
+    steps, jumps = [], []
+    for square in range(SQUARES):
+        row, col = square_position(square)
+        mask, square_jumps = 0, []
+        for dr, dc in directions:
+            step = square_at(row + dr, col + dc)
+            land = square_at(row + 2 * dr, col + 2 * dc)
+            if step is not None:
+                mask |= 1 << step
+                if land is not None:
+                    square_jumps.append((1 << step, 1 << land, land))
+        steps.append(mask)
+        jumps.append(tuple(square_jumps))
+    return steps, jumps
+
+# Precomputed move and jump masks for men of each side and for kings
+UP, DOWN = ((-1, -1), (-1, 1)), ((1, -1), (1, 1))
+MAN_STEPS, MAN_JUMPS = {}, {}
+MAN_STEPS[PLAYER1], MAN_JUMPS[PLAYER1] = _tables(UP)
+MAN_STEPS[PLAYER2], MAN_JUMPS[PLAYER2] = _tables(DOWN)
+KING_STEPS, KING_JUMPS = _tables(UP + DOWN)
+
+# Zobrist keys: one per (player, man or king, square), plus one for PLAYER2 to move
+_rng = random.Random(0xC4EC)
+ZOBRIST = {(player, king): [_rng.getrandbits(64) for _ in range(SQUARES)]
+           for player in (PLAYER1, PLAYER2) for king in (False, True)}
+SIDE_KEY = _rng.getrandbits(64)
+
+def _squares(mask):
+    while mask:
+        bit = mask & -mask
+        yield bit.bit_length() - 1
+        mask ^= bit
+
+def _hash(pieces, kings, player):
+    h = SIDE_KEY if player == PLAYER2 else 0
+    for owner in (PLAYER1, PLAYER2):
+        for square in _squares(pieces[owner]):
+            h ^= ZOBRIST[owner, bool(kings >> square & 1)][square]
+    return h
+
+def notation(path):
+    """A move in standard notation: "22-18", or "22x15x6" for jumps (squares numbered from 1)."""
+    frm, to = path[0], path[1]
+    jump = abs(square_position(frm)[0] - square_position(to)[0]) == 2
+    return ("x" if jump else "-").join(str(square + 1) for square in path)
+
+class CheckersGame:
+    """
+    English draughts. A move is the tuple of squares the piece visits, e.g. (21, 17) or,
+    for a multi-jump, (22, 13, 6). Captures are mandatory, and a jump continues while the
+    piece can keep jumping; a man reaching the far row is crowned and its move ends.
+    A player with no legal move loses.
+
+    make_move / undo_move keep the moves of the new position (generated once, to see
+    whether the game ended) and restore the old ones on undo, so a search can call
+    get_valid_moves, make_move and undo_move at every node without generating twice.
+    """
+    __slots__ = ("pieces", "kings", "current_player", "game_over", "winner", "hash",
+                 "_moves", "_stack", "_hashes", "_quiet", "_start")
 
-class ConnectFourGame:
     def __init__(self):
-        self.board = [[EMPTY for _ in range(COLS)] for _ in range(ROWS)]
+        self.pieces = [0, START[PLAYER1], START[PLAYER2]] # Indexed by player (slot 0 unused)
+        self.kings = 0
         self.current_player = PLAYER1
-        self.move_history = []
         self.game_over = False
         self.winner = None
+        self.hash = _hash(self.pieces, self.kings, PLAYER1)
+        self._hashes = [self.hash] # Position hash after each ply, for repetitions
+        self._quiet = 0 # Plies since the last capture or man move (nothing before can repeat)
+        self._stack = [] # Undo information, one entry per ply
+        self._moves = self.generate_moves()
+        self._start = None # The set-up position of a from_position game, for to_json
+
+    @classmethod
+    def from_position(cls, player1, player2, kings=(), current_player=PLAYER1):
+        """A game starting from a set-up position, given as lists of squares."""
+        game = cls()
+        game.pieces = [0, sum(1 << square for square in player1), sum(1 << square for square in player2)]
+        game.kings = sum(1 << square for square in kings)
+        game.current_player = current_player
+        game._start = {"player1": sorted(player1), "player2": sorted(player2),
+                       "kings": sorted(kings), "current_player": current_player}
+        game.hash = _hash(game.pieces, game.kings, current_player)
+        game._hashes = [game.hash]
+        game._moves = game.generate_moves()
+        if not game._moves:
+            game.game_over = True
+            game.winner = 3 - current_player
+        return game
+
+    def generate_moves(self):
+        """Legal moves of the side to move: {path: mask of the squares it captures}"""
+        player = self.current_player
+        own, opponent = self.pieces[player], self.pieces[3 - player]
+        empty = FULL & ~(own | opponent)
+        kings = self.kings
+        moves = {}
+        for square in _squares(own):
+            if kings >> square & 1:
+                # The king's own square is free to land on again during a multi-jump
+                self._jumps(square, KING_JUMPS, opponent, empty | 1 << square, 0, 0, (square,), moves)
+            else:
+                self._jumps(square, MAN_JUMPS[player], opponent, empty, PROMOTION[player], 0, (square,), moves)
+        if moves:
+            return moves
+        man_steps = MAN_STEPS[player]
+        for square in _squares(own):
+            targets = (KING_STEPS if kings >> square & 1 else man_steps)[square] & empty
+            for target in _squares(targets):
+                moves[(square, target)] = 0
+        return moves
+
+    def _jumps(self, square, table, opponent, empty, promotion, captured, path, moves):
+        extended = False
+        for over_bit, land_bit, land in table[square]:
+            # Captured pieces stay on the board until the move ends: they can't be
+            # jumped twice or landed on
+            if opponent & over_bit and empty & land_bit and not captured & over_bit:
+                extended = True
+                if land_bit & promotion:
+                    moves[path + (land,)] = captured | over_bit
+                else:
+                    self._jumps(land, table, opponent, empty, promotion, captured | over_bit, path + (land,), moves)
+        if not extended and captured:
+            moves[path] = captured
 
-    def is_valid_move(self, column):
-        """Check if dropping a piece in the column is valid."""
-        if column < 0 or column >= COLS:
-            return False
-        if self.board[0][column] != EMPTY:
-            return False
-        return True
+    def is_valid_move(self, path):
+        return not self.game_over and tuple(path) in self._moves
 
     def get_valid_moves(self):
-        """Return a list of valid column indices."""
-        return [col for col in range(COLS) if self.is_valid_move(col)]
+        """Return the legal moves as paths (tuples of squares)."""
+        return [] if self.game_over else list(self._moves)
 
-    def drop_piece(self, column):
-        """Drop a piece into the specified column."""
+    def make_move(self, path):
+        """Play a move given as its path. Returns the squares it captured."""
         if self.game_over:
             raise ValueError("Game is over")
-        if not self.is_valid_move(column):
-            raise ValueError(f"Invalid move: column {column}")
-
-        # Find the lowest empty row
-        for row in range(ROWS - 1, -1, -1):
-            if self.board[row][column] == EMPTY:
-                self.board[row][column] = self.current_player
-                self.move_history.append(column)
-                
-                if self.check_winner(row, column):
-                    self.game_over = True
-                    self.winner = self.current_player
-                elif self.is_draw():
-                    self.game_over = True
-                    self.winner = 'draw'
-                else:
-                    self.switch_player()
-                return
+        path = tuple(path)
+        captured = self._moves.get(path)
+        if captured is None:
+            raise ValueError(f"Invalid move: {notation(path) if len(path) > 1 else path}")
 
-    def switch_player(self):
-        self.current_player = PLAYER2 if self.current_player == PLAYER1 else PLAYER1
+        player = self.current_player
+        opponent = 3 - player
+        frm, to = path[0], path[-1]
+        frm_bit, to_bit = 1 << frm, 1 << to
+        was_king = bool(self.kings & frm_bit)
+        promoted = not was_king and bool(to_bit & PROMOTION[player])
+        captured_kings = self.kings & captured
+        self._stack.append((path, captured, captured_kings, was_king, promoted, self._quiet, self._moves))
 
-    def check_winner(self, last_row, last_col):
-        """Check for a win starting from the last placed piece."""
-        piece = self.board[last_row][last_col]
+        h = self.hash ^ SIDE_KEY ^ ZOBRIST[player, was_king][frm] ^ ZOBRIST[player, was_king or promoted][to]
+        for square in _squares(captured):
+            h ^= ZOBRIST[opponent, bool(captured_kings >> square & 1)][square]
+        self.pieces[player] = self.pieces[player] & ~frm_bit | to_bit
+        self.pieces[opponent] &= ~captured
+        kings = self.kings & ~captured
+        if was_king:
+            kings = kings & ~frm_bit | to_bit
+        elif promoted:
+            kings |= to_bit
+        self.kings = kings
+        self.hash = h
+        self._hashes.append(h)
+        self._quiet = self._quiet + 1 if was_king and not captured else 0
+        self.current_player = opponent
 
-        # Directions: (row_delta, col_delta)
-        directions = [
-            (0, 1),   # Horizontal
-            (1, 0),   # Vertical
-            (1, 1),   # Diagonal Positive Slope (down-right)
-            (1, -1)   # Diagonal Negative Slope (down-left)
-        ]
+        self._moves = self.generate_moves()
+        if not self._moves:
+            self.game_over = True
+            self.winner = player
+        elif self._quiet >= NO_PROGRESS_LIMIT or self.repetitions() >= REPETITION_LIMIT:
+            self.game_over = True
+            self.winner = 'draw'
+        return list(_squares(captured))
 
-        for dr, dc in directions:
-            count = 1  # Count the piece itself
-            
-            # Check forward direction
-            r, c = last_row + dr, last_col + dc
-            while 0 <= r < ROWS and 0 <= c < COLS and self.board[r][c] == piece:
-                count += 1
-                r += dr
-                c += dc
-            
-            # Check backward direction
-            r, c = last_row - dr, last_col - dc
-            while 0 <= r < ROWS and 0 <= c < COLS and self.board[r][c] == piece:
+    def undo_move(self):
+        """Take back the last move. Returns its path."""
+        if not self._stack:
+            raise ValueError("No moves to undo")
+        path, captured, captured_kings, was_king, promoted, self._quiet, self._moves = self._stack.pop()
+        self._hashes.pop()
+        self.hash = self._hashes[-1]
+        opponent = self.current_player
+        player = self.current_player = 3 - opponent
+        frm_bit, to_bit = 1 << path[0], 1 << path[-1]
+        self.pieces[player] = self.pieces[player] & ~to_bit | frm_bit
+        self.pieces[opponent] |= captured
+        kings = self.kings | captured_kings
+        if was_king:
+            kings = kings & ~to_bit | frm_bit
+        elif promoted:
+            kings &= ~to_bit
+        self.kings = kings
+        self.game_over = False
+        self.winner = None
+        return path
+
+    def repetitions(self):
+        """How often the current position has occurred (same side to move), counting now."""
+        hashes = self._hashes
+        count = 1
+        # Only positions since the last capture or man move can match
+        for i in range(len(hashes) - 3, len(hashes) - 2 - self._quiet, -2):
+            if hashes[i] == self.hash:
                 count += 1
-                r -= dr
-                c -= dc
-            
-            if count >= 4:
-                return True
-        return False
+        return count
 
     def is_draw(self):
-        """Check if the board is full with no winner."""
-        # Top row full implies board full
-        return all(cell != EMPTY for cell in self.board[0])
+        return self.winner == 'draw'
+
+    @property
+    def move_history(self):
+        return [list(entry[0]) for entry in self._stack]
+
+    @property
+    def board(self):
+        """8x8 board, top row first: EMPTY, PLAYER1, PLAYER2, PLAYER1_KING or PLAYER2_KING."""
+        board = [[EMPTY] * COLS for _ in range(ROWS)]
+        for player in (PLAYER1, PLAYER2):
+            for square in _squares(self.pieces[player]):
+                row, col = square_position(square)
+                board[row][col] = player + 2 if self.kings >> square & 1 else player
+        return board
 
     def to_json(self):
         """Serialize game state to JSON string."""
@@ -99,41 +267,49 @@ class ConnectFourGame:
             "current_player": self.current_player,
             "move_history": self.move_history,
             "game_over": self.game_over,
-            "winner": self.winner
+            "winner": self.winner,
+            "start": self._start # None for the standard opening
         }
         return json.dumps(state)
 
     @classmethod
     def from_json(cls, json_str):
-        """Restore game state from JSON string."""
+        """Restore game state from JSON string (replays the moves, so repetitions still count)."""
         state = json.loads(json_str)
-        game = cls()
-        game.board = state["board"]
-        game.current_player = state["current_player"]
-        game.move_history = state["move_history"]
-        game.game_over = state["game_over"]
-        game.winner = state["winner"]
+        start = state.get("start")
+        game = cls.from_position(**start) if start else cls()
+        for path in state["move_history"]:
+            game.make_move(path)
         return game
 
     def display(self):
         """Return ASCII art representation of the board."""
-        lines = []
-        lines.append(" 0 1 2 3 4 5 6")
-        for row in self.board:
-            line = "|"
-            for cell in row:
-                if cell == EMPTY:
-                    line += " |"
-                elif cell == PLAYER1:
-                    line += "X|"
-                elif cell == PLAYER2:
-                    line += "O|"
-            lines.append(line)
-        lines.append("---------------")
+        symbols = {EMPTY: " ", PLAYER1: "x", PLAYER2: "o", PLAYER1_KING: "X", PLAYER2_KING: "O"}
+        lines = ["  0 1 2 3 4 5 6 7"]
+        for r, row in enumerate(self.board):
+            lines.append(f"{r}|" + "|".join(symbols[cell] for cell in row) + "|")
+        lines.append("  ---------------")
         return "\n".join(lines)
 
+def perft(game, depth):
+    """Move sequences of length `depth` from the game's position. Leaves the game as it found it."""
+    if depth == 0:
+        return 1
+    moves = game.get_valid_moves()
+    if depth == 1:
+        return len(moves)
+    total = 0
+    for path in moves:
+        game.make_move(path)
+        total += perft(game, depth - 1)
+        game.undo_move()
+    return total
+
 if __name__ == "__main__":
-    # Simple test
-    game = ConnectFourGame()
-    game.display()
-    print("Game initialized.")
+    # Simple test: perft from the start position (7, 49, 302, 1469, 7361, 36768, 179740, 845931)
+    import time
+    game = CheckersGame()
+    print(game.display())
+    for depth in range(1, 9):
+        start = time.perf_counter()
+        print(f"depth {depth}: {perft(game, depth)} ({time.perf_counter() - start:.2f}s)")
@@ -0,0 +1,116 @@
+import unittest
+import json
+import random
+from game_engine import (CheckersGame, perft, notation, square_at, square_position, _hash,
+                         EMPTY, PLAYER1, PLAYER2, PLAYER1_KING, ROWS, COLS, SQUARES)
+
+class TestCheckersEngine(unittest.TestCase):
+    def test_initial_state(self):
+        game = CheckersGame()
+        self.assertEqual(game.current_player, PLAYER1)
+        self.assertFalse(game.game_over)
+        board = game.board
+        self.assertEqual(sum(row.count(PLAYER1) for row in board), 12)
+        self.assertEqual(sum(row.count(PLAYER2) for row in board), 12)
+        self.assertEqual(len(game.get_valid_moves()), 7)
+
+    def test_squares_are_the_dark_squares(self):
+        for square in range(SQUARES):
+            row, col = square_position(square)
+            self.assertEqual(square_at(row, col), square)
+        self.assertIsNone(square_at(0, 0))
+        self.assertEqual(notation((20, 16)), "21-17")
+
+    def test_perft_from_the_start(self):
+        # Known counts for English draughts
+        game = CheckersGame()
+        self.assertEqual([perft(game, depth) for depth in range(1, 7)], [7, 49, 302, 1469, 7361, 36768])
+        self.assertEqual(game.hash, CheckersGame().hash)
+
+    def test_capture_is_mandatory(self):
+        man, target, other = square_at(5, 2), square_at(4, 3), square_at(7, 0)
+        game = CheckersGame.from_position([man, other], [target])
+        self.assertEqual(game.get_valid_moves(), [(man, square_at(3, 4))])
+        with self.assertRaises(ValueError):
+            game.make_move((other, square_at(6, 1)))
+        self.assertEqual(game.make_move((man, square_at(3, 4))), [target])
+        # The last piece was taken: nothing left to move
+        self.assertTrue(game.game_over)
+        self.assertEqual(game.winner, PLAYER1)
+
+    def test_multi_jump_branches(self):
+        game = CheckersGame.from_position([square_at(5, 2)], [square_at(4, 3), square_at(2, 3), square_at(2, 5)])
+        start, middle = square_at(5, 2), square_at(3, 4)
+        self.assertEqual(sorted(game.get_valid_moves()),
+                         sorted([(start, middle, square_at(1, 2)), (start, middle, square_at(1, 6))]))
+        game.make_move((start, middle, square_at(1, 6)))
+        self.assertEqual(game.board[2][5], EMPTY)
+        self.assertEqual(game.board[2][3], PLAYER2) # Not on this branch
+
+    def test_crowning_ends_the_move(self):
+        # As a king it could jump on from (0, 3), but a man's move ends when it is crowned
+        game = CheckersGame.from_position([square_at(2, 5)], [square_at(1, 4), square_at(1, 2)])
+        self.assertEqual(game.get_valid_moves(), [(square_at(2, 5), square_at(0, 3))])
+        game.make_move(game.get_valid_moves()[0])
+        self.assertEqual(game.board[0][3], PLAYER1_KING)
+        game.undo_move()
+        self.assertEqual(game.board[2][5], PLAYER1)
+        self.assertEqual(game.board[1][4], PLAYER2)
+
+    def test_threefold_repetition_is_a_draw(self):
+        game = CheckersGame.from_position([square_at(7, 0)], [square_at(0, 7)], kings=[square_at(7, 0), square_at(0, 7)])
+        shuffle = [(square_at(7, 0), square_at(6, 1)), (square_at(0, 7), square_at(1, 6)),
+                   (square_at(6, 1), square_at(7, 0)), (square_at(1, 6), square_at(0, 7))]
+        for path in shuffle * 2:
+            self.assertFalse(game.game_over)
+            game.make_move(path)
+        self.assertEqual(game.repetitions(), 3)
+        self.assertTrue(game.game_over)
+        self.assertTrue(game.is_draw())
+        game.undo_move()
+        self.assertFalse(game.game_over)
+
+    def test_make_and_undo_keep_the_hash_in_step(self):
+        rng = random.Random(5)
+        for _ in range(20):
+            game = CheckersGame()
+            start = (game.board, game.hash)
+            plies = 0
+            while not game.game_over and plies < 200:
+                game.make_move(rng.choice(game.get_valid_moves()))
+                plies += 1
+                self.assertEqual(game.hash, _hash(game.pieces, game.kings, game.current_player))
+                self.assertFalse(game.pieces[PLAYER1] & game.pieces[PLAYER2])
+            for _ in range(plies):
+                game.undo_move()
+            self.assertEqual((game.board, game.hash), start)
+            self.assertEqual(len(game.get_valid_moves()), 7)
+
+    def test_json_round_trip(self):
+        game = CheckersGame()
+        rng = random.Random(1)
+        for _ in range(30):
+            if game.game_over:
+                break
+            game.make_move(rng.choice(game.get_valid_moves()))
+        restored = CheckersGame.from_json(game.to_json())
+        self.assertEqual(restored.board, game.board)
+        self.assertEqual(restored.hash, game.hash)
+        self.assertEqual(json.loads(restored.to_json()), json.loads(game.to_json()))
+        self.assertEqual(len(game.board), ROWS)
+        self.assertEqual(len(game.board[0]), COLS)
+
+    def test_json_round_trip_from_a_set_up_position(self):
+        game = CheckersGame.from_position([square_at(5, 2), square_at(7, 0)], [square_at(4, 3), square_at(0, 7)],
+                                          kings=[square_at(0, 7)], current_player=PLAYER2)
+        for _ in range(4):
+            game.make_move(game.get_valid_moves()[0])
+        self.assertEqual(len(game.move_history), 4)
+        restored = CheckersGame.from_json(game.to_json())
+        self.assertEqual(restored.board, game.board)
+        self.assertEqual(restored.hash, game.hash)
+        self.assertEqual(restored.move_history, game.move_history)
+        self.assertEqual(json.loads(restored.to_json()), json.loads(game.to_json()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,34 @@
 
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any, Union
+import asyncio
+import json
+import os
 import uuid
 import time
+from functools import lru_cache
 
-from game_engine import ConnectFourGame, PLAYER1, PLAYER2, EMPTY, ROWS, COLS
-from bot_ai import MinimaxAI
+from game_engine import ConnectFourGame, PackedGame, PLAYER1, PLAYER2, EMPTY, ROWS, COLS, encode_board
+from bot_ai import CancelToken, SearchCancelled, WIN_SCORE, BOOK_SCORE
+from shared_analysis import ANALYSIS_DIFFICULTY
+from bot_worker import bot_pool, DIFFICULTIES
+from bot_scheduler import SchedulerFull, DEFAULT_TIER
+from game_archive import create_game_archive
+from game_stats import game_stats
+from game_store import create_game_store, shared_config, GameSession, GameLockTimeout, SWEEP_INTERVAL
+from move_cache import move_cache
+from spectators import spectators, SPECTATOR_POLL_INTERVAL
+from metrics import registry, create_multiprocess_metrics, MetricsMiddleware, METRICS_WRITE_INTERVAL
+
+try:
+    import orjson  # noqa: F401 - only needed by ORJSONResponse
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:
+    FastJSONResponse = JSONResponse
 
 app = FastAPI(
     title="Connect Four AI API",
@@ -23,21 +44,167 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+
+def cancel_game_searches(game_id: str, data: GameSession):
+    # Stop any bot search still burning a worker for this game
+    for token in data.running_searches():
+        token.cancel("deleted")
+
+def drop_evicted_game(game_id: str, data: GameSession):
+    """The store dropped a game for space or idleness: it is gone for its bots and watchers alike."""
+    cancel_game_searches(game_id, data)
+    spectators.close(game_id, "deleted")
+
+@lru_cache(maxsize=None)
+def seat_bots(player1_bot: bool, player2_bot: bool, difficulty: str) -> Dict[int, str]:
+    """Seat -> difficulty of the bot seats. Shared between sessions, so read-only."""
+    bots = {}
+    if player1_bot:
+        bots[PLAYER1] = difficulty
+    if player2_bot:
+        bots[PLAYER2] = difficulty
+    return bots
+
+def new_session(config: Dict[str, Any], created_at: Optional[float] = None) -> GameSession:
+    """Build a fresh game session from its creation config (also used to reload stored games)."""
+    # Bots live in the worker pool; the game only records which seats they play
+    difficulty = config["difficulty"] if config["difficulty"] in DIFFICULTIES else "medium"
+    bots = seat_bots(config["player1_type"] == "bot", config["player2_type"] == "bot", difficulty)
+    return GameSession(PackedGame(), shared_config(config), bots, created_at)
+
+# Game storage, bounded by size and idle time. GAME_STORE=sqlite makes it durable, and
+# GAME_STORE_SHARED=1 lets several uvicorn workers serve the same games from one file.
+games_db = create_game_store(new_session, on_evict=drop_evicted_game)
+
+# Finished games leave games_db for the append-only archive (GAME_ARCHIVE_DIR, "" = keep them live)
+game_archive = create_game_archive()
+
+def save_or_archive(game_id: str, data: GameSession):
+    """Persist a session after a move; a game that just ended is moved to the archive instead."""
+    game: PackedGame = data.game
+    if game.game_over:
+        game_stats.record_game(game.move_history, game.winner, data.config, data.bots, data.created_at)
+    if game.game_over and game_archive is not None:
+        game_archive.append(game_id, game.move_history, game.winner, data.config, data.created_at)
+        games_db.pop(game_id)
+    else:
+        games_db.save(game_id, data)
+
+def announce_move(game_id: str, data: GameSession, player: int, column: int, row: int):
+    """Publish a move that was just played to the game's spectators (call under the game lock)."""
+    if games_db.shared:
+        return # Moves may land in any worker; follow_shared_game reads them from the store
+    game: PackedGame = data.game
+    kind = "bot_move" if player in data.bots else "move"
+    ply = len(game.moves)
+    spectators.publish(game_id, kind, dict(move_message(kind, game, player, column, row), ply=ply), seq=ply)
+    if game.game_over:
+        spectators.close(game_id)
+
+async def store_call(fn, *args):
+    """
+    Run a call that reads, locks or refreshes a game. With a shared store that can wait
+    on other worker processes (or on SQLite's busy timeout), so it runs off the event
+    loop there. Async endpoints go through this for every store access.
+    """
+    if games_db.shared:
+        return await run_in_threadpool(fn, *args)
+    return fn(*args)
+
+@app.exception_handler(GameLockTimeout)
+async def game_lock_timeout(request: Request, exc: GameLockTimeout):
+    return JSONResponse(status_code=503, content={"detail": "Game is busy, try again"},
+                        headers={"Retry-After": "1"})
+
+# How often a running bot search checks whether its client is still there
+DISCONNECT_POLL_INTERVAL = 0.1
+# With a shared store: how often a search checks for a cancel from another worker
+SEARCH_CANCEL_POLL_INTERVAL = 0.25
+
+async def sweep_idle_games():
+    while True:
+        await asyncio.sleep(SWEEP_INTERVAL)
+        await asyncio.to_thread(games_db.sweep)
+
+@app.on_event("startup")
+async def start_background_work():
+    # Spin up the bot worker processes before the first request needs them
+    bot_pool.start()
+    app.state.sweeper = asyncio.create_task(sweep_idle_games())
+    if worker_metrics is not None:
+        app.state.metrics_writer = asyncio.create_task(write_worker_metrics())
+
+@app.on_event("shutdown")
+async def stop_background_work():
+    app.state.sweeper.cancel()
+    if worker_metrics is not None:
+        app.state.metrics_writer.cancel()
+    for task in list(exhibitions) + list(spectator_followers.values()):
+        task.cancel()
+    bot_pool.shutdown()
+    move_cache.flush()
+    games_db.close()
+    if game_archive is not None:
+        game_archive.close()
+
+# --- Metrics ---
+# With several workers, METRICS_DIR makes /metrics sum them all (see metrics.py)
+worker_metrics = create_multiprocess_metrics(registry)
+
+async def write_worker_metrics():
+    while True:
+        await asyncio.sleep(METRICS_WRITE_INTERVAL)
+        await asyncio.to_thread(worker_metrics.write)
+
+# Read at scrape time
 
-# In-memory storage for games
-# In production, use Redis or a database
-games_db: Dict[str, Dict[str, Any]] = {}
+registry.gauge_function("connect4_games_active", "Live games in the game store",
+                        lambda: games_db.stats()["active_games"], aggregate="max")  # Same store everywhere
+registry.gauge_function("connect4_games_evicted_total", "Games evicted from the game store",
+                        lambda: [(("lru",), games_db.evicted_lru), (("ttl",), games_db.evicted_ttl)],
+                        labels=("reason",), kind="counter")
+registry.gauge_function("connect4_move_cache_lookups_total", "Bot move cache lookups",
+                        lambda: [(("memory_hit",), move_cache.hits), (("file_hit",), move_cache.file_hits),
+                                 (("miss",), move_cache.misses)],
+                        labels=("result",), kind="counter")
+registry.gauge_function("connect4_move_cache_hit_ratio", "Bot move cache hit ratio since start",
+                        lambda: move_cache.stats()["hit_rate"], aggregate="mean")
+registry.gauge_function("connect4_bot_queue_depth", "Bot searches waiting for a worker slot",
+                        lambda: [((name,), t["queued"]) for name, t in bot_pool.scheduler.stats()["tiers"].items()],
+                        labels=("tier",))
+registry.gauge_function("connect4_bot_rejected_total", "Bot searches rejected because the tier's queue was full",
+                        lambda: [((name,), t["rejected"]) for name, t in bot_pool.scheduler.stats()["tiers"].items()],
+                        labels=("tier",), kind="counter")
+registry.gauge_function("connect4_move_cache_entries", "Entries in the in-memory bot move cache",
+                        lambda: len(move_cache.entries))
+registry.gauge_function("connect4_spectators", "Connected game spectators",
+                        lambda: spectators.stats()["subscribers"])
+registry.gauge_function("connect4_spectators_dropped_total", "Spectators dropped for falling too far behind",
+                        lambda: spectators.dropped, kind="counter")
 
 # --- Data Models ---
 
+# Game endpoints take ?format= for the board:
+#   full     nested 6x7 lists (default)
+#   compact  42-char string, row-major from the top row ("0" empty, "1"/"2" pieces)
+#   moves    no board at all; the client replays the moves it already knows
+# Game responses are built from server state we trust, so they skip the
+# response_model validation and go straight to FastJSONResponse; the models below
+# are what the docs show.
+BoardFormat = Literal["full", "compact", "moves"]
+Board = Optional[Union[List[List[int]], str]]  # Missing in the "moves" format
+
 class NewGameRequest(BaseModel):
     player1_type: str = "human" # "human" or "bot"
     player2_type: str = "bot"   # "human" or "bot"
-    difficulty: str = "medium"  # "easy", "medium", "hard"
+    difficulty: str = "medium"  # "easy", "medium", "hard", "vip"
+    shared_analysis: bool = False  # Pick moves from the shared per-position analysis instead of searching
+    tier: str = DEFAULT_TIER  # "free_tier", "pro" or "vip", up to what the X-API-Key grants
 
 class NewGameResponse(BaseModel):
     game_id: str
-    board: List[List[int]]
+    board: Board = None
     current_player: int
     message: str
 
@@ -47,7 +214,7 @@ class MoveRequest(BaseModel):
 
 class MoveResponse(BaseModel):
     success: bool
-    board: List[List[int]]
+    board: Board = None
     current_player: int
     winner: Optional[Any] # 1, 2, "draw", or None
     game_over: bool
@@ -59,149 +226,1026 @@ class BotMoveResponse(BaseModel):
     reasoning: str
     evaluation_score: float
     thinking_time: float
-    board: List[List[int]]
+    board: Board = None
     winner: Optional[Any]
     game_over: bool
 
+class BotMove(BaseModel):
+    column: int
+    row: int
+    reasoning: str
+    evaluation_score: float
+    thinking_time: float
+
+class TurnResponse(BaseModel):
+    column: int  # The human move that was applied
+    row: int
+    bot_move: Optional[BotMove]  # None if the human move ended the game, or the bot failed
+    error: Optional[str] = None  # Why the bot didn't reply; the human move stands, retry via bot-move
+    board: Board = None
+    current_player: int
+    winner: Optional[Any]
+    game_over: bool
+    valid_moves: List[int]
+
 class GameStateResponse(BaseModel):
     game_id: str
-    board: List[List[int]]
+    board: Board = None
     current_player: int
     winner: Optional[Any]
     game_over: bool
     move_history: List[int]
 
+class BatchNewGamesRequest(BaseModel):
+    games: List[NewGameRequest]
+    play_bot_openings: bool = False  # Also play the first move of games where player 1 is a bot
+
+class BatchNewGamesResponse(BaseModel):
+    games: List[NewGameResponse]
+
+class PositionRequest(BaseModel):
+    moves: Optional[List[int]] = None        # Either the move list from the empty board...
+    board: Optional[List[List[int]]] = None  # ...or a raw board
+    player: Optional[int] = None             # Side to move; checked against the position if given
+    difficulty: str = "medium"
+    shared_analysis: bool = False
+
+class PositionEvaluation(BaseModel):
+    column: Optional[int] = None
+    evaluation_score: Optional[float] = None
+    error: Optional[str] = None
+
+class EvaluatePositionsRequest(BaseModel):
+    positions: List[PositionRequest]
+
+class EvaluatePositionsResponse(BaseModel):
+    results: List[PositionEvaluation]
+
+class MoveAnalysis(BaseModel):
+    ply: int
+    player: int
+    column: int
+    best_column: int
+    score: float  # Of the move played, from the mover's side
+    best_score: float
+    evaluation: float  # score from player 1's side
+    loss: float  # best_score - score
+    blunder: bool
+
+class GameAnalysisResponse(BaseModel):
+    game_id: str
+    difficulty: str
+    moves: List[MoveAnalysis]
+    eval_curve: List[float]  # evaluation of each move
+    blunders: Dict[str, int]  # Per player
+    thinking_time: float
+
+class ExhibitionRequest(BaseModel):
+    difficulty: str = "medium"  # Both bots
+    move_delay: float = 1.0  # Seconds between moves, so spectators can follow
+
+# Upper bound on items per batch request
+MAX_BATCH_SIZE = 500
+
 # --- Endpoints ---
 
+def with_board(payload: Dict[str, Any], game: PackedGame, fmt: BoardFormat) -> Dict[str, Any]:
+    """Add the board to a response payload in the requested wire format."""
+    if fmt == "full":
+        payload["board"] = game.board
+    elif fmt == "compact":
+        payload["board"] = encode_board(game.board)
+    return payload
+
 @app.get("/api/health")
 def health_check():
     return {"status": "healthy", "games_active": len(games_db)}
 
+# Subscription tiers are granted by the server, never taken from the client: the
+# X-API-Key header is looked up in TIER_API_KEYS ("key:tier,key:tier", e.g. keys the
+# arcade auth hands out after check_access), and no or an unknown key is free_tier.
+# A game's `tier` field only picks a tier up to the granted one (a VIP may start a
+# free_tier game), so nobody can claim vip scheduling weight or analysis on their own.
+SUBSCRIPTION_TIERS = ("free_tier", "pro", "vip")  # Lowest first
+
+def parse_tier_keys(text: str) -> Dict[str, str]:
+    keys = {}
+    for part in text.split(","):
+        key, _, tier = part.strip().rpartition(":")
+        if key and tier in SUBSCRIPTION_TIERS:
+            keys[key] = tier
+    return keys
+
+TIER_API_KEYS = parse_tier_keys(os.getenv("TIER_API_KEYS", ""))
+
+def granted_tier(request: Request) -> str:
+    """The highest subscription tier the caller's API key allows."""
+    return TIER_API_KEYS.get(request.headers.get("x-api-key", ""), DEFAULT_TIER)
+
+def check_game_config(config: NewGameRequest, granted: str):
+    if config.tier not in SUBSCRIPTION_TIERS:
+        raise HTTPException(status_code=400, detail=f"Unknown tier: {config.tier}")
+    if SUBSCRIPTION_TIERS.index(config.tier) > SUBSCRIPTION_TIERS.index(granted):
+        raise HTTPException(status_code=403, detail=f"Your API key doesn't grant the {config.tier} tier")
+    # vip difficulty is the god_mode_ai feature of the VIP subscription
+    if config.difficulty == "vip" and config.tier != "vip":
+        raise HTTPException(status_code=403, detail="vip difficulty needs a VIP subscription")
+
+def new_game_payload(game_id: str, game: PackedGame, fmt: BoardFormat) -> Dict[str, Any]:
+    return with_board({
+        "game_id": game_id,
+        "current_player": game.current_player,
+        "message": "New game started"
+    }, game, fmt)
+
 @app.post("/api/games/new", response_model=NewGameResponse)
-def create_new_game(request: NewGameRequest):
+def create_new_game(request: NewGameRequest, http_request: Request, fmt: BoardFormat = Query("full", alias="format")):
+    check_game_config(request, granted_tier(http_request))
     game_id = str(uuid.uuid4())
+    data = new_session(request.dict())
+    games_db.put(game_id, data)
+    
+    return FastJSONResponse(new_game_payload(game_id, data.game, fmt))
+
+@app.post("/api/games/batch", response_model=BatchNewGamesResponse)
+async def create_games_batch(request: BatchNewGamesRequest, http_request: Request,
+                             fmt: BoardFormat = Query("full", alias="format")):
+    """Create many games in one call (tournament / QA tooling). Results are in request order."""
+    if len(request.games) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} games per batch")
+    
+    granted = granted_tier(http_request)
+    for config in request.games:
+        check_game_config(config, granted)
+    created = []
+    for config in request.games:
+        game_id = str(uuid.uuid4())
+        data = new_session(config.dict())
+        await store_call(games_db.put, game_id, data)
+        created.append((game_id, data))
+    
+    if request.play_bot_openings:
+        # One opening search per worker slot at a time, so a full batch fits the batch
+        # tier's queue; if any fails the whole batch is undone, as the client never
+        # learns the game ids
+        token = CancelToken()
+        limit = asyncio.Semaphore(bot_pool.scheduler.capacity)
+        failures = []
+        
+        async def play_opening(game_id: str, data: GameSession):
+            async with limit:
+                if token.cancelled:
+                    return
+                try:
+                    await search_and_play(game_id, data, token, tier="batch")
+                except HTTPException as e:
+                    if not failures:
+                        failures.append(e)
+                    token.cancel("cancelled")  # Stops the other openings
+        
+        await asyncio.gather(*[play_opening(game_id, data) for game_id, data in created if PLAYER1 in data.bots])
+        if failures:
+            for game_id, _ in created:
+                await store_call(games_db.pop, game_id)
+            raise failures[0]
+    
+    return FastJSONResponse({"games": [new_game_payload(game_id, data.game, fmt) for game_id, data in created]})
+
+def check_board(board: List[List[int]]) -> int:
+    """
+    Raise ValueError unless `board` is a position reachable in a game still in
+    progress. Returns the side to move.
+    """
+    if len(board) != ROWS or any(len(row) != COLS for row in board):
+        raise ValueError(f"Board must be {ROWS}x{COLS}")
+    if any(cell not in (EMPTY, PLAYER1, PLAYER2) for row in board for cell in row):
+        raise ValueError(f"Board cells must be {EMPTY}, {PLAYER1} or {PLAYER2}")
+    for row in range(ROWS - 1):
+        for col in range(COLS):
+            if board[row][col] != EMPTY and board[row + 1][col] == EMPTY:
+                raise ValueError(f"Floating piece in column {col}")
+    player1 = sum(row.count(PLAYER1) for row in board)
+    player2 = sum(row.count(PLAYER2) for row in board)
+    if player1 - player2 not in (0, 1):
+        raise ValueError("Player 1 moves first, so it has as many pieces as player 2 or one more")
+    game = ConnectFourGame()
+    game.board = board
+    if any(board[row][col] != EMPTY and game.check_winner(row, col) for row in range(ROWS) for col in range(COLS)):
+        raise ValueError("Game is over")
+    return PLAYER1 if player1 == player2 else PLAYER2
+
+def position_from_request(position: PositionRequest) -> ConnectFourGame:
+    """The position to search. Raises ValueError for anything that isn't a legal, unfinished game."""
+    if position.player is not None and position.player not in (PLAYER1, PLAYER2):
+        raise ValueError(f"Player must be {PLAYER1} or {PLAYER2}")
     game = ConnectFourGame()
+    if position.moves is not None:
+        for col in position.moves:
+            game.drop_piece(col)
+    elif position.board is not None:
+        game.current_player = check_board(position.board)
+        game.board = [row[:] for row in position.board]
+    else:
+        raise ValueError("Give either moves or board")
+    if game.game_over or not game.get_valid_moves():
+        raise ValueError("Game is over")
+    if position.player is not None and position.player != game.current_player:
+        raise ValueError(f"Player {game.current_player} is to move in this position")
+    return game
+
+async def evaluate_position(position: PositionRequest) -> PositionEvaluation:
+    try:
+        game = position_from_request(position)
+    except ValueError as e:
+        return PositionEvaluation(error=str(e))
+    difficulty = position.difficulty if position.difficulty in DIFFICULTIES else "medium"
+    engine = "shared" if position.shared_analysis else "minimax"
+    try:
+        column, score = await bot_pool.search(game.board, game.current_player, difficulty, engine, tier="batch")
+    except SchedulerFull:
+        return PositionEvaluation(error="Bot workers are busy, try again")
+    return PositionEvaluation(column=column, evaluation_score=score)
+
+@app.post("/api/positions/evaluate", response_model=EvaluatePositionsResponse)
+async def evaluate_positions(request: EvaluatePositionsRequest):
+    """Bot move + score for many positions, spread over the bot worker pool, in request order."""
+    if len(request.positions) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} positions per batch")
+    # One search per worker slot at a time, so a full batch fits the batch tier's queue
+    limit = asyncio.Semaphore(bot_pool.scheduler.capacity)
     
-    # Initialize Bots if needed (stored in memory associated with game)
-    bots = {}
-    if request.player1_type == "bot":
-        bots[PLAYER1] = MinimaxAI(PLAYER1, request.difficulty)
-    if request.player2_type == "bot":
-        bots[PLAYER2] = MinimaxAI(PLAYER2, request.difficulty)
-    
-    games_db[game_id] = {
-        "game": game,
-        "bots": bots,
-        "config": request.dict(),
-        "created_at": time.time()
-    }
+    async def evaluate(position: PositionRequest) -> PositionEvaluation:
+        async with limit:
+            return await evaluate_position(position)
     
-    return NewGameResponse(
-        game_id=game_id,
-        board=game.board,
-        current_player=game.current_player,
-        message="New game started"
-    )
+    results = await asyncio.gather(*[evaluate(position) for position in request.positions])
+    return EvaluatePositionsResponse(results=results)
 
 def get_game_or_404(game_id: str):
-    if game_id not in games_db:
+    data = games_db.get(game_id)
+    if data is None:
+        if game_archive is not None and game_id in game_archive:
+            raise HTTPException(status_code=400, detail="Game is over")
         raise HTTPException(status_code=404, detail="Game not found")
-    return games_db[game_id]
+    return data
 
 @app.get("/api/games/{game_id}/state", response_model=GameStateResponse)
-def get_game_state(game_id: str):
-    data = get_game_or_404(game_id)
-    game: ConnectFourGame = data["game"]
+def get_game_state(game_id: str, fmt: BoardFormat = Query("full", alias="format")):
+    data = games_db.get(game_id)
+    if data is not None:
+        game: PackedGame = data.game
+    else:
+        # Finished games are only in the archive
+        archived = game_archive.get(game_id) if game_archive is not None else None
+        if archived is None:
+            raise HTTPException(status_code=404, detail="Game not found")
+        game = archived.replay()
+    
+    return FastJSONResponse(with_board({
+        "game_id": game_id,
+        "current_player": game.current_player,
+        "winner": game.winner,
+        "game_over": game.game_over,
+        "move_history": game.move_history
+    }, game, fmt))
+
+def apply_human_move(game_id: str, data: GameSession, column: int, player: int) -> int:
+    """Validate and play a human move. Returns the row the piece landed in."""
+    game: PackedGame = data.game
     
-    return GameStateResponse(
-        game_id=game_id,
-        board=game.board,
-        current_player=game.current_player,
-        winner=game.winner,
-        game_over=game.game_over,
-        move_history=game.move_history
-    )
+    with games_db.game_lock(game_id):
+        # Another worker may have moved since we loaded the game
+        if games_db.refresh(game_id, data) is None:
+            raise HTTPException(status_code=404, detail="Game not found")
+        
+        if game.game_over:
+            raise HTTPException(status_code=400, detail="Game is already over")
+        
+        if player != game.current_player:
+            raise HTTPException(status_code=400, detail="Not your turn")
+            
+        if not game.is_valid_move(column):
+            raise HTTPException(status_code=400, detail="Invalid move")
+        
+        try:
+            row = game.drop_piece(column)
+        except ValueError as e:
+             raise HTTPException(status_code=400, detail=str(e))
+        save_or_archive(game_id, data)
+        announce_move(game_id, data, player, column, row)
+    return row
+
+def commit_bot_move(game_id: str, data: GameSession, ply: int, column: int) -> int:
+    """Play a searched bot move if the game is still where the search started. Returns the row."""
+    game: PackedGame = data.game
+    with games_db.game_lock(game_id):
+        if games_db.refresh(game_id, data) is None:
+            raise HTTPException(status_code=410, detail="Game was deleted")
+        # Another request may have moved while we were searching
+        if len(game.move_history) != ply or game.game_over:
+            raise HTTPException(status_code=409, detail="Game changed during bot search")
+        player = game.current_player
+        row = game.drop_piece(column)
+        save_or_archive(game_id, data)
+        announce_move(game_id, data, player, column, row)
+    return row
 
 @app.post("/api/games/{game_id}/move", response_model=MoveResponse)
-def make_move(game_id: str, move: MoveRequest):
+def make_move(game_id: str, move: MoveRequest, fmt: BoardFormat = Query("full", alias="format")):
     data = get_game_or_404(game_id)
-    game: ConnectFourGame = data["game"]
+    game: PackedGame = data.game
+    apply_human_move(game_id, data, move.column, move.player)
+         
+    return FastJSONResponse(with_board({
+        "success": True,
+        "current_player": game.current_player,
+        "winner": game.winner,
+        "game_over": game.game_over,
+        "valid_moves": game.get_valid_moves(),
+        "message": None
+    }, game, fmt))
+
+async def watch_bot_search(request: Optional[Request], token: CancelToken, max_time: Optional[float]):
+    """
+    Cancel the search if the client goes away or the caller's deadline passes.
+    Pass request=None where the response itself notices disconnects (streams).
+    """
+    deadline = time.time() + max_time if max_time else None
+    while not token.cancelled:
+        if request is not None and await request.is_disconnected():
+            token.cancel("disconnected")
+            return
+        if deadline is not None and time.time() >= deadline:
+            token.cancel("timeout")
+            return
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+
+async def follow_search_cancel(search_id: str, token: CancelToken):
+    """Shared store: apply a cancel another worker recorded for the search (accept, delete)."""
+    while not token.cancelled:
+        await asyncio.sleep(SEARCH_CANCEL_POLL_INTERVAL)
+        reason = await run_in_threadpool(games_db.search_cancel_reason, search_id)
+        if reason is not None:
+            token.cancel(reason)
+
+async def play_bot_move(game_id: str, data: GameSession, token: CancelToken, partial: bool = False) -> Dict[str, Any]:
+    """
+    Search and play the current bot's move in the bot worker pool.
+    Returns the move as a dict: column, row, reasoning, evaluation_score, thinking_time.
+    """
+    game: PackedGame = data.game
     
     if game.game_over:
-        raise HTTPException(status_code=400, detail="Game is already over")
+        raise HTTPException(status_code=400, detail="Game is over")
     
-    if move.player != game.current_player:
-        raise HTTPException(status_code=400, detail="Not your turn")
-        
-    if not game.is_valid_move(move.column):
-        raise HTTPException(status_code=400, detail="Invalid move")
+    if game.current_player not in data.bots:
+         raise HTTPException(status_code=400, detail="Current player is not a bot")
+    
+    return await search_and_play(game_id, data, token, partial)
+
+async def search_and_play(game_id: str, data: GameSession, token: CancelToken, partial: bool = False,
+                          on_progress=None, tier: Optional[str] = None) -> Dict[str, Any]:
+    """
+    play_bot_move without the turn checks, for callers that have already made them.
+    on_progress(depth, column, score) makes the search iterative, see BotPool.search.
+    `tier` overrides the game's scheduling tier (batch work).
+    A search cancelled with reason "accepted" commits its best move so far.
+    """
+    game: PackedGame = data.game
+    bots = data.bots
+    current_player = game.current_player
+    engine = "shared" if data.config.get("shared_analysis") else "minimax"
+    ply = len(game.move_history)
     
+    data.track_search(token)
+    follower = None
+    if games_db.shared:
+        # Accept and delete may reach another worker; they cancel through the store
+        search_id = uuid.uuid4().hex
+        await store_call(games_db.add_search, game_id, search_id)
+        follower = asyncio.create_task(follow_search_cancel(search_id, token))
+    start_time = time.time()
     try:
-        game.drop_piece(move.column)
-    except ValueError as e:
-         raise HTTPException(status_code=400, detail=str(e))
-         
-    return MoveResponse(
-        success=True,
-        board=game.board,
-        current_player=game.current_player,
-        winner=game.winner,
-        game_over=game.game_over,
-        valid_moves=game.get_valid_moves()
-    )
+        best_col, score = await bot_pool.search(game.board, current_player, bots[current_player], engine, token,
+                                                on_progress, tier or data.config.get("tier", DEFAULT_TIER))
+    except SchedulerFull as e:
+        raise HTTPException(status_code=503, detail="Bot workers are busy, try again",
+                            headers={"Retry-After": str(e.retry_after)})
+    except SearchCancelled as e:
+        if token.reason == "deleted":
+            raise HTTPException(status_code=410, detail="Game was deleted")
+        if token.reason == "accepted" or (token.reason == "timeout" and partial):
+            best_col, score = e.column, e.score
+        elif token.reason == "timeout":
+            raise HTTPException(status_code=504, detail="Bot search timed out")
+        else:
+            raise HTTPException(status_code=503, detail="Bot search cancelled")
+    finally:
+        data.untrack_search(token)
+        if follower is not None:
+            follower.cancel()
+            await store_call(games_db.remove_search, search_id)
+    duration = time.time() - start_time
+    
+    row = await store_call(commit_bot_move, game_id, data, ply, best_col)
+    game_stats.record_think(bots[current_player], duration)
+    
+    reasoning = "Calculated best strategic advantage."
+    if token.reason == "timeout": reasoning = "Best move found before the time limit."
+    elif token.reason == "accepted": reasoning = "Best move found when the search was accepted."
+    elif score > 50000: reasoning = "Found winning path."
+    elif score < -50000: reasoning = "Forced defense to prevent loss."
+    elif score == BOOK_SCORE: reasoning = "Opening book optimized move."
+    
+    return {
+        "column": best_col,
+        "row": row,
+        "reasoning": reasoning,
+        "evaluation_score": score,
+        "thinking_time": duration
+    }
 
 @app.get("/api/games/{game_id}/bot-move", response_model=BotMoveResponse)
-def trigger_bot_move(game_id: str):
-    data = get_game_or_404(game_id)
-    game: ConnectFourGame = data["game"]
-    bots = data["bots"]
+async def trigger_bot_move(game_id: str, request: Request, max_time: Optional[float] = None, partial: bool = False,
+                           fmt: BoardFormat = Query("full", alias="format")):
+    """
+    Runs the bot search in the bot worker pool. The search is cancelled if the client
+    disconnects, the game is deleted, or `max_time` seconds pass; with `partial=true`
+    a timed-out search commits the best move found so far instead of failing.
+    """
+    data = await store_call(get_game_or_404, game_id)
+    game: PackedGame = data.game
+    
+    token = CancelToken()
+    watcher = asyncio.create_task(watch_bot_search(request, token, max_time))
+    try:
+        move = await play_bot_move(game_id, data, token, partial)
+    finally:
+        watcher.cancel()
+    
+    return FastJSONResponse(with_board({
+        "column": move["column"],
+        "reasoning": move["reasoning"],
+        "evaluation_score": move["evaluation_score"],
+        "thinking_time": move["thinking_time"],
+        "winner": game.winner,
+        "game_over": game.game_over
+    }, game, fmt))
+
+def sse_event(kind: str, payload: Dict[str, Any]) -> str:
+    return f"event: {kind}\ndata: {json.dumps(payload)}\n\n"
+
+@app.get("/api/games/{game_id}/bot-move/stream")
+async def stream_bot_move(game_id: str, max_time: Optional[float] = None, partial: bool = False,
+                          fmt: BoardFormat = Query("full", alias="format")):
+    """
+    Server-Sent Events version of bot-move, meant for hard and vip bots. The search
+    deepens iteratively and emits:
+      progress  {depth, column, evaluation_score, thinking_time} per completed depth
+      move      the bot-move response once the move is committed
+      error     {status, detail} if the search fails
+    POST .../bot-move/accept stops the search and commits the best move so far.
+    Closing the stream cancels the search without moving.
+    """
+    data = await store_call(get_game_or_404, game_id)
+    game: PackedGame = data.game
     
     if game.game_over:
         raise HTTPException(status_code=400, detail="Game is over")
+    if game.current_player not in data.bots:
+        raise HTTPException(status_code=400, detail="Current player is not a bot")
     
-    current_player = game.current_player
-    if current_player not in bots:
-         raise HTTPException(status_code=400, detail="Current player is not a bot")
-         
-    bot: MinimaxAI = bots[current_player]
-    valid_moves = game.get_valid_moves()
+    token = CancelToken()
+    events: asyncio.Queue = asyncio.Queue()
+    start_time = time.time()
+    
+    def on_progress(depth: int, column: int, score: float):
+        events.put_nowait(sse_event("progress", {
+            "depth": depth,
+            "column": column,
+            "evaluation_score": score,
+            "thinking_time": time.time() - start_time
+        }))
+    
+    async def play():
+        watcher = asyncio.create_task(watch_bot_search(None, token, max_time))
+        try:
+            move = await search_and_play(game_id, data, token, partial, on_progress)
+            events.put_nowait(sse_event("move", with_board({
+                "column": move["column"],
+                "reasoning": move["reasoning"],
+                "evaluation_score": move["evaluation_score"],
+                "thinking_time": move["thinking_time"],
+                "winner": game.winner,
+                "game_over": game.game_over
+            }, game, fmt)))
+        except HTTPException as e:
+            events.put_nowait(sse_event("error", {"status": e.status_code, "detail": e.detail}))
+        finally:
+            watcher.cancel()
+            events.put_nowait(None)
+    
+    async def stream():
+        task = asyncio.create_task(play())
+        try:
+            while (event := await events.get()) is not None:
+                yield event
+        finally:
+            # The client went away before the move landed
+            if not task.done():
+                token.cancel("disconnected")
+                task.cancel()
+    
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/api/games/{game_id}/bot-move/accept")
+def accept_bot_move(game_id: str):
+    """
+    Stop the game's running bot searches; each commits the best move found so far.
+    With a shared store the searches may run in other workers, which pick the accept
+    up from the store within SEARCH_CANCEL_POLL_INTERVAL.
+    """
+    data = get_game_or_404(game_id)
+    accepted = games_db.cancel_searches(game_id, "accepted") if games_db.shared else 0
+    running = [token for token in data.running_searches() if not token.cancelled]
+    for token in running:
+        token.cancel("accepted")
+    accepted = max(accepted, len(running))
+    if not accepted:
+        raise HTTPException(status_code=409, detail="No bot search running")
+    return {"success": True, "accepted": accepted}
+
+@app.post("/api/games/{game_id}/turn", response_model=TurnResponse)
+async def play_turn(game_id: str, move: MoveRequest, request: Request, max_time: Optional[float] = None, partial: bool = False,
+                    fmt: BoardFormat = Query("full", alias="format")):
+    """
+    Human-vs-bot turn in one round trip: applies the human move, then the bot's reply.
+    `max_time` / `partial` bound the bot search as on the bot-move endpoint. The human
+    move is committed first, so if the bot fails (busy, timed out) the response is still
+    200 with bot_move null and `error` set; the client asks bot-move for the reply.
+    """
+    data = await store_call(get_game_or_404, game_id)
+    game: PackedGame = data.game
+    
+    opponent = PLAYER2 if move.player == PLAYER1 else PLAYER1
+    if opponent not in data.bots:
+        raise HTTPException(status_code=400, detail="Opponent is not a bot")
+    
+    row = await store_call(apply_human_move, game_id, data, move.column, move.player)
     
+    bot_move = None
+    error = None
+    if not game.game_over:
+        token = CancelToken()
+        watcher = asyncio.create_task(watch_bot_search(request, token, max_time))
+        try:
+            bot_move = await search_and_play(game_id, data, token, partial)
+        except HTTPException as e:
+            error = e.detail
+        finally:
+            watcher.cancel()
+    
+    return FastJSONResponse(with_board({
+        "column": move.column,
+        "row": row,
+        "bot_move": bot_move,
+        "error": error,
+        "current_player": game.current_player,
+        "winner": game.winner,
+        "game_over": game.game_over,
+        "valid_moves": game.get_valid_moves()
+    }, game, fmt))
+
+# --- Post-game analysis (Pro feature) ---
+# Every position of the game gets every move scored (AnalysisCache.analyze at the
+# analysis depth), in parallel over the bot pool. Positions already analyzed - common
+# openings, earlier analyses, shared-analysis bot games - come from the analysis cache.
+
+ANALYSIS_TIERS = ("pro", "vip")
+DECISIVE_SCORE = WIN_SCORE // 2  # Beyond this, the search has found a forced result
+BLUNDER_LOSS = 10000  # Score drop worth a blunder flag, about one unanswered open three
+
+def move_is_blunder(best: float, achieved: float, loss: float) -> bool:
+    if best > -DECISIVE_SCORE and achieved <= -DECISIVE_SCORE:
+        return True  # Walked into a forced loss
+    if best >= DECISIVE_SCORE and achieved < DECISIVE_SCORE:
+        return True  # Let a forced win go
+    return loss >= BLUNDER_LOSS
+
+@app.post("/api/games/{game_id}/analysis", response_model=GameAnalysisResponse)
+async def analyze_game(game_id: str, request: Request):
+    """Per-move scores, eval curve and blunder flags for a game, live or archived."""
+    data = await store_call(games_db.get, game_id)
+    if data is not None:
+        moves, tier = data.game.move_history, data.config.get("tier")
+    else:
+        archived = await run_in_threadpool(game_archive.get, game_id) if game_archive is not None else None
+        if archived is None:
+            raise HTTPException(status_code=404, detail="Game not found")
+        moves, tier = archived.moves, archived.tier
+    if tier not in ANALYSIS_TIERS:
+        raise HTTPException(status_code=403, detail="Game analysis needs a Pro or VIP subscription")
+
+    # Replay, keeping each position the mover faced
+    game = ConnectFourGame()
+    positions = []
+    for column in moves:
+        positions.append(([row[:] for row in game.board], game.current_player))
+        game.drop_piece(column)
+
+    token = CancelToken()
+    watcher = asyncio.create_task(watch_bot_search(request, token, None))
+    # One job per worker slot at a time keeps a long game from filling the tier's queue
+    limit = asyncio.Semaphore(bot_pool.scheduler.capacity)
+
+    async def analyze(board, player):
+        async with limit:
+            return await bot_pool.analyze(board, player, token, tier)
+
     start_time = time.time()
-    best_col, score = bot.get_best_move(game.board, valid_moves)
-    duration = time.time() - start_time
+    try:
+        results = await asyncio.gather(*[analyze(board, player) for board, player in positions])
+    except SchedulerFull as e:
+        raise HTTPException(status_code=503, detail="Bot workers are busy, try again",
+                            headers={"Retry-After": str(e.retry_after)})
+    except SearchCancelled:
+        raise HTTPException(status_code=503, detail="Analysis cancelled")
+    finally:
+        watcher.cancel()
+        token.cancel("cancelled")  # Stops the other jobs if one failed
+
+    analysis = []
+    blunders = {str(PLAYER1): 0, str(PLAYER2): 0}
+    for ply, (column, scores, (_, player)) in enumerate(zip(moves, results, positions)):
+        best = max(scores.values())
+        # Ties go to the most central column, as in the bots' move ordering
+        best_column = min((col for col in scores if scores[col] == best), key=lambda c: abs(c - COLS // 2))
+        achieved = scores[column]
+        loss = best - achieved
+        blunder = move_is_blunder(best, achieved, loss)
+        blunders[str(player)] += blunder
+        analysis.append({
+            "ply": ply,
+            "player": player,
+            "column": column,
+            "best_column": best_column,
+            "score": achieved,
+            "best_score": best,
+            "evaluation": achieved if player == PLAYER1 else -achieved,
+            "loss": loss,
+            "blunder": blunder,
+        })
+
+    return FastJSONResponse({
+        "game_id": game_id,
+        "difficulty": ANALYSIS_DIFFICULTY,
+        "moves": analysis,
+        "eval_curve": [move["evaluation"] for move in analysis],
+        "blunders": blunders,
+        "thinking_time": time.time() - start_time,
+    })
+
+# --- WebSocket game channel ---
+# One socket per game replaces the move / bot-move / state polling round trips.
+# Client -> server: {"type": "move", "column": c, "player": p}
+#                   {"type": "bot_move"}   (ask the bot to move, e.g. when it plays first)
+#                   {"type": "state"}
+# Server -> client: "state" (full board, on connect and on request), then per move only
+#                   the changed cell: "move" / "bot_move" with row, column and result.
+
+def state_message(game: PackedGame) -> Dict[str, Any]:
+    return {
+        "type": "state",
+        "board": game.board,
+        "current_player": game.current_player,
+        "winner": game.winner,
+        "game_over": game.game_over,
+        "move_history": game.move_history,
+        "valid_moves": game.get_valid_moves()
+    }
+
+def move_message(kind: str, game: PackedGame, player: int, column: int, row: int) -> Dict[str, Any]:
+    return {
+        "type": kind,
+        "player": player,
+        "column": column,
+        "row": row,
+        "current_player": game.current_player,
+        "winner": game.winner,
+        "game_over": game.game_over
+    }
+
+async def push_bot_moves(websocket: WebSocket, game_id: str, data: GameSession, token: CancelToken):
+    """Play bot moves for as long as it is a bot's turn, pushing each one as it lands."""
+    game: PackedGame = data.game
+    while not game.game_over and game.current_player in data.bots:
+        player = game.current_player
+        try:
+            move = await play_bot_move(game_id, data, token)
+        except HTTPException as e:
+            if not token.cancelled:
+                await websocket.send_json({"type": "error", "detail": e.detail})
+            return
+        message = move_message("bot_move", game, player, move["column"], move["row"])
+        message.update(
+            evaluation_score=move["evaluation_score"],
+            thinking_time=move["thinking_time"],
+            reasoning=move["reasoning"]
+        )
+        await websocket.send_json(message)
+
+@app.websocket("/api/games/{game_id}/ws")
+async def game_channel(websocket: WebSocket, game_id: str):
+    data = await store_call(games_db.get, game_id)
+    if data is None:
+        await websocket.close(code=4404)
+        return
+    game: PackedGame = data.game
+    await websocket.accept()
+    await websocket.send_json(state_message(game))
     
-    game.drop_piece(best_col)
+    token = CancelToken()  # Cancels our bot searches when the socket goes away
+    bot_task = None
+    try:
+        while True:
+            message = await websocket.receive_json()
+            kind = message.get("type")
+            if kind == "move":
+                player = game.current_player
+                try:
+                    column = int(message.get("column", -1))
+                    row = await store_call(apply_human_move, game_id, data, column, message.get("player", player))
+                except (TypeError, ValueError):
+                    await websocket.send_json({"type": "error", "detail": "Invalid move"})
+                    continue
+                except HTTPException as e:
+                    await websocket.send_json({"type": "error", "detail": e.detail})
+                    continue
+                await websocket.send_json(move_message("move", game, player, column, row))
+            elif kind == "state":
+                await store_call(games_db.refresh, game_id, data)
+                await websocket.send_json(state_message(game))
+                continue
+            elif kind != "bot_move":
+                await websocket.send_json({"type": "error", "detail": f"Unknown message type: {kind}"})
+                continue
+            
+            if bot_task is None or bot_task.done():
+                bot_task = asyncio.create_task(push_bot_moves(websocket, game_id, data, token))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        token.cancel("disconnected")
+        if bot_task is not None:
+            bot_task.cancel()
+
+# --- Spectators ---
+# Any game can be watched without taking part:
+#   WS  /api/games/{id}/spectate         "state" snapshot (with its ply), then every
+#                                         "move" / "bot_move" with the ply it made
+#   GET /api/games/{id}/spectate/stream  the same as Server-Sent Events
+# Streams end with the game ("deleted" first if it was deleted). Each event is
+# serialized once for all viewers; a viewer that falls SPECTATOR_BUFFER events behind
+# gets "dropped" and is disconnected (WebSocket close code 4008) and may reconnect for
+# a fresh snapshot. POST /api/exhibitions starts a bot-vs-bot game worth watching.
+#
+# Exhibitions cost bot searches whether or not anyone watches, so each API worker runs
+# at most MAX_EXHIBITIONS at once (503 past that), and one nobody has watched for
+# EXHIBITION_IDLE_TIMEOUT seconds is stopped and deleted. With a shared store the
+# viewers may be on other workers; their followers mark the game in the store.
+
+MAX_EXHIBITION_MOVE_DELAY = 60
+MAX_EXHIBITIONS = int(os.getenv("MAX_EXHIBITIONS", 8))
+EXHIBITION_IDLE_TIMEOUT = float(os.getenv("EXHIBITION_IDLE_TIMEOUT", 30))
+WATCH_MARK_INTERVAL = EXHIBITION_IDLE_TIMEOUT / 3  # How often a follower marks its game watched
+
+exhibitions = set()  # Tasks playing exhibition games
+spectator_followers: Dict[str, asyncio.Task] = {}  # Shared store: game id -> follow_shared_game task
+
+def spectator_snapshot(game_id: str) -> Optional[Dict[str, Any]]:
+    """State message of a live or archived game, or None if there is no such game."""
+    data = games_db.get(game_id)
+    if data is not None:
+        game: PackedGame = data.game
+    else:
+        archived = game_archive.get(game_id) if game_archive is not None else None
+        if archived is None:
+            return None
+        game = archived.replay()
+    return dict(state_message(game), game_id=game_id, ply=len(game.moves))
+
+def publish_moves(game_id: str, moves: bytes, bots: Dict[int, str], since: int):
+    """Publish the moves after ply `since` of a game known only by its move list."""
+    game = PackedGame()
+    for column in moves:
+        player = game.current_player
+        row = game.drop_piece(column)
+        ply = len(game.moves)
+        if ply > since:
+            kind = "bot_move" if player in bots else "move"
+            spectators.publish(game_id, kind, dict(move_message(kind, game, player, column, row), ply=ply), seq=ply)
+
+async def follow_shared_game(game_id: str, ply: int):
+    """
+    With a shared store, moves land in whichever worker got the request. One task per
+    watched game (not per viewer) reads it from the store and publishes what is new.
+    """
+    marked = 0.0
+    try:
+        while spectators.watching(game_id):
+            await asyncio.sleep(SPECTATOR_POLL_INTERVAL)
+            if time.monotonic() - marked >= WATCH_MARK_INTERVAL:
+                marked = time.monotonic()
+                await run_in_threadpool(games_db.mark_watched, game_id)
+            data = await run_in_threadpool(games_db.get, game_id)
+            if data is not None:
+                game: PackedGame = data.game
+                publish_moves(game_id, game.moves, data.bots, ply)
+                ply = len(game.moves)
+                if game.game_over:
+                    spectators.close(game_id)
+                continue
+            archived = await run_in_threadpool(game_archive.get, game_id) if game_archive is not None else None
+            if archived is None:
+                spectators.close(game_id, "deleted")
+            else:
+                bots = seat_bots(archived.player1_type == "bot", archived.player2_type == "bot", archived.difficulty)
+                publish_moves(game_id, bytes(archived.moves), bots, ply)
+                spectators.close(game_id)
+    finally:
+        if spectator_followers.get(game_id) is asyncio.current_task():
+            del spectator_followers[game_id]
+
+async def join_spectators(game_id: str):
+    """
+    Subscribe to a game and read its snapshot. Returns: (subscriber, snapshot); the
+    subscriber is None when the game is already over, the snapshot None if there is no game.
+    """
+    subscriber, created = spectators.subscribe(game_id)
+    snapshot = await run_in_threadpool(spectator_snapshot, game_id)
+    if snapshot is None or snapshot["game_over"]:
+        spectators.unsubscribe(game_id, subscriber)
+        return None, snapshot
+    if games_db.shared and game_id not in spectator_followers:
+        spectator_followers[game_id] = asyncio.create_task(follow_shared_game(game_id, snapshot["ply"]))
+    return subscriber, snapshot
+
+async def spectator_events(game_id: str, subscriber, snapshot: Dict[str, Any]):
+    """Events for one viewer after its snapshot, until the stream ends."""
+    while (event := await subscriber.get()) is not None:
+        if event.seq is None or event.seq > snapshot["ply"]:
+            yield event
+
+async def close_on_disconnect(websocket: WebSocket, subscriber):
+    # Spectators only listen; whatever they send is ignored
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        subscriber.close()
+
+@app.websocket("/api/games/{game_id}/spectate")
+async def spectate_game(websocket: WebSocket, game_id: str):
+    subscriber, snapshot = await join_spectators(game_id)
+    if snapshot is None:
+        await websocket.close(code=4404)
+        return
+    await websocket.accept()
+    await websocket.send_json(snapshot)
+    if subscriber is None:
+        await websocket.close()
+        return
+    reader = asyncio.create_task(close_on_disconnect(websocket, subscriber))
+    try:
+        async for event in spectator_events(game_id, subscriber, snapshot):
+            await websocket.send_text(event.json)
+    except WebSocketDisconnect:
+        reader.cancel()
+        return
+    finally:
+        spectators.unsubscribe(game_id, subscriber)
+    if reader.done():
+        return # The viewer left
+    # The stream ended on our side: the game is over, or the viewer was too slow
+    reader.cancel()
+    await websocket.close(code=4008 if subscriber.dropped else 1000)
+
+@app.get("/api/games/{game_id}/spectate/stream")
+async def stream_spectate_game(game_id: str):
+    subscriber, snapshot = await join_spectators(game_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Game not found")
     
-    reasoning = "Calculated best strategic advantage."
-    if score > 50000: reasoning = "Found winning path."
-    elif score < -50000: reasoning = "Forced defense to prevent loss."
-    elif score == 999999: reasoning = "Opening book optimized move."
-    
-    return BotMoveResponse(
-        column=best_col,
-        reasoning=reasoning,
-        evaluation_score=score,
-        thinking_time=duration,
-        board=game.board,
-        winner=game.winner,
-        game_over=game.game_over
-    )
+    async def stream():
+        yield sse_event("state", snapshot)
+        if subscriber is None:
+            return
+        try:
+            async for event in spectator_events(game_id, subscriber, snapshot):
+                yield event.sse
+        finally:
+            spectators.unsubscribe(game_id, subscriber)
+    
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+async def exhibition_watched(game_id: str) -> bool:
+    if spectators.watching(game_id):
+        return True
+    if games_db.shared:
+        seen = await run_in_threadpool(games_db.last_watched, game_id)
+        return seen is not None and time.time() - seen < EXHIBITION_IDLE_TIMEOUT
+    return False
+
+async def play_exhibition(game_id: str, data: GameSession, move_delay: float):
+    """
+    Play a bot-vs-bot game to the end at a pace spectators can follow, or until nobody
+    has watched it for EXHIBITION_IDLE_TIMEOUT (the game is then deleted).
+    """
+    game: PackedGame = data.game
+    token = CancelToken()
+    watched = time.monotonic() # The creator gets the timeout to start watching
+    while not game.game_over:
+        await asyncio.sleep(move_delay)
+        if await exhibition_watched(game_id):
+            watched = time.monotonic()
+        elif time.monotonic() - watched >= EXHIBITION_IDLE_TIMEOUT:
+            if await store_call(games_db.pop, game_id) is not None:
+                spectators.close(game_id, "deleted")
+            return
+        try:
+            await search_and_play(game_id, data, token, tier="batch")
+        except HTTPException as e:
+            if e.status_code != 503 or token.cancelled:
+                return # Deleted, or changed from under us
+            # Workers busy with players' games: exhibitions wait their turn
+            await asyncio.sleep(int(e.headers.get("Retry-After", 1)) if e.headers else 1)
+
+@app.post("/api/exhibitions", response_model=NewGameResponse)
+async def start_exhibition(request: ExhibitionRequest, http_request: Request,
+                           fmt: BoardFormat = Query("full", alias="format")):
+    """Start a bot-vs-bot game that the server plays by itself; watch it via /spectate."""
+    if len(exhibitions) >= MAX_EXHIBITIONS:
+        raise HTTPException(status_code=503, detail="Too many exhibitions running, try again later",
+                            headers={"Retry-After": str(int(EXHIBITION_IDLE_TIMEOUT))})
+    granted = granted_tier(http_request)
+    config = NewGameRequest(player1_type="bot", player2_type="bot", difficulty=request.difficulty, tier=granted)
+    check_game_config(config, granted)
+    if not 0 <= request.move_delay <= MAX_EXHIBITION_MOVE_DELAY:
+        raise HTTPException(status_code=400, detail=f"move_delay must be 0-{MAX_EXHIBITION_MOVE_DELAY} seconds")
+    game_id = str(uuid.uuid4())
+    data = new_session(config.dict())
+    await store_call(games_db.put, game_id, data)
+    
+    task = asyncio.create_task(play_exhibition(game_id, data, request.move_delay))
+    exhibitions.add(task)
+    task.add_done_callback(exhibitions.discard)
+    return FastJSONResponse(new_game_payload(game_id, data.game, fmt))
 
 @app.delete("/api/games/{game_id}")
 def delete_game(game_id: str):
-    if game_id in games_db:
-        del games_db[game_id]
+    data = games_db.pop(game_id)
+    if data is not None:
+        cancel_game_searches(game_id, data)
+        if games_db.shared:
+            games_db.cancel_searches(game_id, "deleted")  # Searches in other workers
+        spectators.close(game_id, "deleted")
         return {"success": True, "message": "Game deleted"}
+    if game_archive is not None and game_id in game_archive:
+        return {"success": True, "message": "Game is finished and archived"}
     raise HTTPException(status_code=404, detail="Game not found")
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus text exposition format; every worker's metrics summed when METRICS_DIR is set."""
+    text = worker_metrics.render() if worker_metrics is not None else registry.render()
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
 @app.get("/api/stats")
 def get_server_stats():
+    """Debug view of the worker process that answers; /metrics covers every worker."""
     return {
+        "worker_pid": os.getpid(),
         "active_games": len(games_db),
+        "game_store": games_db.stats(),
+        "move_cache": move_cache.stats(),
+        "game_archive": game_archive.stats() if game_archive is not None else None,
+        "spectators": spectators.stats(),
+        "exhibitions": len(exhibitions),
+        "gameplay": game_stats.snapshot(),
+        "bot_pool": {
+            "workers": bot_pool.workers,
+            "mode": "process" if bot_pool.workers > 0 else "thread",
+            "scheduler": bot_pool.scheduler.stats()
+        },
         "uptime": "running"
     }
 
 if __name__ == "__main__":
     import uvicorn
-    # In dev mode, run on port 8000
-    uvicorn.run(app, host="0.0.0.0", port=8001)
+    # In dev mode, run on port 8001. WEB_CONCURRENCY > 1 needs GAME_STORE=sqlite + GAME_STORE_SHARED=1.
+    workers = int(os.getenv("WEB_CONCURRENCY", 1))
+    # One worker serves this module's app; passing "api_server:app" would import the
+    # module a second time, with its own store, archive and metrics
+    uvicorn.run(app if workers == 1 else "api_server:app", host="0.0.0.0", port=8001, workers=workers)
@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from game_engine import ConnectFourGame
+from bot_ai import MinimaxAI, EVALUATIONS
+
+# Search benchmark: nodes, nodes/sec and time-to-depth of MinimaxAI over a fixed
+# corpus of positions, for each evaluation.
+#
+#   python benchmark.py                                   # run and print
+#   python benchmark.py --save benchmark_baseline.json    # record a baseline
+#   python benchmark.py --baseline benchmark_baseline.json --threshold 0.1
+#
+# With --baseline the run fails (exit 1) if an evaluation's overall nodes/sec drops
+# more than --threshold below the baseline. Node counts and chosen moves don't depend
+# on the machine, so a change in those means the search itself behaves differently;
+# it is reported, and fails the run with --strict. Timings do depend on the machine:
+# compare against a baseline recorded on the same one.
+
+# Positions as move lists from the empty board. Depth-5 searches find no forced
+# result in any of them, so every search runs to full depth.
+CORPUS = {
+    "opening-1": [4, 1, 2],
+    "opening-2": [6, 5, 3, 4],
+    "opening-3": [0, 4, 6, 5, 3],
+    "opening-4": [4, 1, 2, 3, 3],
+    "middlegame-1": [6, 5, 3, 3, 3, 4, 3, 0, 5, 3, 1, 0],
+    "middlegame-2": [6, 5, 3, 4, 3, 3, 4, 4, 6, 5, 6, 6],
+    "middlegame-3": [0, 4, 6, 5, 3, 4, 3, 4, 4, 1, 3, 3, 5, 1, 4, 0, 1],
+    "middlegame-4": [6, 5, 3, 4, 3, 3, 4, 4, 6, 5, 6, 6, 5, 3, 5, 5, 3, 4],
+    "endgame-1": [0, 4, 6, 5, 3, 4, 3, 4, 4, 1, 3, 3, 5, 1, 4, 0, 1, 1, 3, 0, 0, 3, 5, 6],
+    "endgame-2": [4, 2, 3, 3, 3, 2, 5, 6, 4, 4, 5, 3, 4, 4, 3, 6, 1, 1, 2, 2, 2, 1, 2, 5, 5],
+    "endgame-3": [3, 3, 2, 4, 3, 4, 1, 0, 2, 2, 1, 3, 2, 2, 3, 6, 0, 1, 1, 1, 6, 1, 4, 4, 4, 6, 6, 5],
+    "endgame-4": [0, 4, 6, 5, 3, 4, 3, 4, 4, 1, 3, 3, 5, 1, 4, 0, 1, 1, 3, 0, 0, 3, 5, 6, 1, 4, 1, 6],
+}
+
+DEFAULT_DEPTH = 5
+
+
+def position(moves):
+    game = ConnectFourGame()
+    for column in moves:
+        game.drop_piece(column)
+    return game
+
+
+def bench_position(moves, evaluation, depth, repeat=1):
+    """
+    Iterative deepening to `depth` on one position, best of `repeat` runs.
+    Returns: {nodes, seconds, nps, column, score, time_to_depth: [seconds per depth, cumulative]}
+    """
+    game = position(moves)
+    best = None
+    for _ in range(repeat):
+        bot = MinimaxAI(game.current_player, depth=depth, evaluation=evaluation)
+        reached = []
+        start = time.perf_counter()
+
+        def on_iteration(d, column, score):
+            reached.append(time.perf_counter() - start)
+
+        column, score = bot.iterative_search(game.board, game.get_valid_moves(), on_iteration=on_iteration)
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best["seconds"]:
+            best = {
+                "nodes": bot.nodes,
+                "seconds": round(seconds, 6),
+                "nps": round(bot.nodes / seconds) if seconds else None,
+                "column": column,
+                "score": score,
+                "time_to_depth": [round(t, 6) for t in reached],
+            }
+    return best
+
+
+def run(depth=DEFAULT_DEPTH, evaluations=tuple(EVALUATIONS), positions=None, repeat=1, progress=None):
+    results = {}
+    totals = {}
+    for evaluation in evaluations:
+        nodes = seconds = 0
+        for name, moves in CORPUS.items():
+            if positions and name not in positions:
+                continue
+            result = bench_position(moves, evaluation, depth, repeat)
+            results[f"{name}/{evaluation}"] = result
+            nodes += result["nodes"]
+            seconds += result["seconds"]
+            if progress:
+                progress(f"{name}/{evaluation}", result)
+        totals[evaluation] = {"nodes": nodes, "seconds": round(seconds, 6),
+                              "nps": round(nodes / seconds) if seconds else None}
+    return {
+        "meta": {
+            "depth": depth,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "processor": platform.processor() or None,
+            "cpus": os.cpu_count(),
+            "recorded": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "totals": totals,
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold):
+    """
+    Check a run against a baseline. Returns: (regressions, changes) - lists of messages.
+    A regression is an evaluation whose total nodes/sec fell more than `threshold`;
+    a change is a position whose node count, move or score differs.
+    """
+    regressions, changes = [], []
+    if baseline["meta"]["depth"] != report["meta"]["depth"]:
+        raise ValueError(f"Baseline was recorded at depth {baseline['meta']['depth']}, "
+                         f"this run is at depth {report['meta']['depth']}")
+    for evaluation, total in report["totals"].items():
+        before = baseline["totals"].get(evaluation)
+        if not before or not before["nps"] or not total["nps"]:
+            continue
+        ratio = total["nps"] / before["nps"]
+        if ratio < 1 - threshold:
+            regressions.append(f"{evaluation}: {total['nps']} nodes/s is {1 - ratio:.1%} below the baseline's {before['nps']}")
+    for key, result in report["results"].items():
+        before = baseline["results"].get(key)
+        if before is None:
+            continue
+        for field in ("nodes", "column", "score"):
+            if result[field] != before[field]:
+                changes.append(f"{key}: {field} {before[field]} -> {result[field]}")
+    return regressions, changes
+
+
+def print_report(report, baseline=None):
+    print(f"\n{'position':<26} {'nodes':>10} {'seconds':>9} {'nodes/s':>9} {'vs base':>8}  time to depth")
+    for key, result in report["results"].items():
+        before = baseline["results"].get(key) if baseline else None
+        delta = f"{result['nps'] / before['nps'] - 1:+.1%}" if before and before["nps"] and result["nps"] else ""
+        depths = " ".join(f"{t:.3f}" for t in result["time_to_depth"])
+        print(f"{key:<26} {result['nodes']:>10} {result['seconds']:>9.3f} {result['nps'] or 0:>9} {delta:>8}  {depths}")
+    for evaluation, total in report["totals"].items():
+        before = baseline["totals"].get(evaluation) if baseline else None
+        delta = f"{total['nps'] / before['nps'] - 1:+.1%}" if before and before["nps"] and total["nps"] else ""
+        print(f"{'total/' + evaluation:<26} {total['nodes']:>10} {total['seconds']:>9.3f} {total['nps'] or 0:>9} {delta:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Connect Four search on a fixed position corpus.")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH)
+    parser.add_argument("--evaluation", action="append", choices=sorted(EVALUATIONS),
+                        help="evaluation(s) to run (default: all)")
+    parser.add_argument("--position", action="append", choices=sorted(CORPUS), help="only these positions")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per position; the fastest counts")
+    parser.add_argument("--save", help="write this run as a JSON baseline")
+    parser.add_argument("--baseline", help="compare against this JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed nodes/sec drop vs the baseline")
+    parser.add_argument("--strict", action="store_true", help="also fail if node counts or moves changed")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["meta"]["depth"] != args.depth:
+            parser.error(f"baseline is at depth {baseline['meta']['depth']}; pass --depth {baseline['meta']['depth']}")
+
+    report = run(args.depth, tuple(args.evaluation or EVALUATIONS), args.position, args.repeat,
+                 progress=lambda key, result: print(f"  {key}: {result['nodes']} nodes, {result['seconds']:.3f}s",
+                                                    file=sys.stderr))
+    print_report(report, baseline)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline written to {args.save}")
+    if baseline is None:
+        return 0
+
+    regressions, changes = compare(report, baseline, args.threshold)
+    for message in changes:
+        print(f"changed: {message}")
+    for message in regressions:
+        print(f"REGRESSION: {message}")
+    failed = bool(regressions) or (args.strict and bool(changes))
+    print("\nFAILED" if failed else "\nOK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
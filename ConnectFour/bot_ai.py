@@ -4,16 +4,89 @@ import math
 import time
 import json
 import os
+import threading
 from game_engine import ConnectFourGame, ROWS, COLS, EMPTY, PLAYER1, PLAYER2
+from evaluation import score_position
 from evaluation_v2 import score_position_v2, SCORE_WIN
 
 # Constants
 DIFFICULTY_EASY = 2
 DIFFICULTY_MEDIUM = 4
 DIFFICULTY_HARD = 6 # Can push to 7 or 8 with optimization
+DIFFICULTY_VIP = 8 # Several seconds per move; meant for iterative_search with progress
+
+# Version of what a search returns for a position. Bump it with any change to the
+# search, evaluations, depths or opening book: cached moves (move_cache.py) are keyed by it
+ENGINE_VERSION = 1
+
+WIN_SCORE = 10000000 # Terminal win from minimax (a loss is the negative)
+BOOK_SCORE = 999999 # Score reported for opening book moves (not an evaluation)
+
+# Static evaluations a bot can use at the search horizon
+EVALUATIONS = {"v1": score_position, "v2": score_position_v2}
+
+CANCEL_CHECK_INTERVAL = 1024 # Nodes searched between cancel-token checks
+
+def _load_opening_book():
+    try:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'opening_book.json'), 'r') as f:
+            return json.load(f).get("opening_moves", {})
+    except (OSError, ValueError):
+        return {} # Fail gracefully if book missing
+
+# Parsed once per process and shared by every bot
+OPENING_BOOK = _load_opening_book()
+
+class CancelToken:
+    """Cooperative cancellation flag shared between a running search and its caller."""
+    def __init__(self):
+        self.cancelled = False
+        self.reason = None
+        self._callbacks = []
+
+    def on_cancel(self, callback):
+        """Register callback(reason), e.g. to forward the cancel to another process."""
+        self._callbacks.append(callback)
+        if self.cancelled:
+            callback(self.reason)
+
+    def cancel(self, reason='cancelled'):
+        if not self.cancelled:
+            self.reason = reason
+            self.cancelled = True
+            for callback in self._callbacks:
+                callback(reason)
+
+class SearchCancelled(Exception):
+    """Raised by a cancelled search. Carries the best move found before it stopped."""
+    def __init__(self, column, score, reason=None):
+        super().__init__(f"Search cancelled ({reason})")
+        self.column = column
+        self.score = score
+        self.reason = reason
+
+class _Abort(Exception):
+    """Internal: unwinds the recursion when the cancel token fires."""
+
+class _SearchState:
+    """Per-call search bookkeeping, kept off the bot so one bot can serve many threads."""
+    __slots__ = ("token", "nodes")
+
+    def __init__(self, token):
+        self.token = token
+        self.nodes = 0
+
+    def tick(self):
+        self.nodes += 1
+        if self.nodes % CANCEL_CHECK_INTERVAL == 0 and self.token is not None and self.token.cancelled:
+            raise _Abort()
 
 class MinimaxAI:
-    def __init__(self, player_piece, difficulty='medium'):
+    def __init__(self, player_piece, difficulty='medium', depth=None, evaluation='v2', time_budget=None):
+        """
+        `depth` overrides the difficulty's depth. With `time_budget` (seconds per move),
+        get_best_move deepens iteratively until the time is up, with depth as the cap.
+        """
         self.player_piece = player_piece
         self.opponent_piece = PLAYER1 if player_piece == PLAYER2 else PLAYER2
         
@@ -21,29 +94,41 @@ class MinimaxAI:
             self.depth = DIFFICULTY_EASY
         elif difficulty == 'hard':
             self.depth = DIFFICULTY_HARD
+        elif difficulty == 'vip':
+            self.depth = DIFFICULTY_VIP
         else:
             self.depth = DIFFICULTY_MEDIUM
+        if depth is not None:
+            self.depth = depth
 
-        # Load Opening Book
-        self.opening_book = {}
-        try:
-            with open('opening_book.json', 'r') as f:
-                data = json.load(f)
-                self.opening_book = data.get("opening_moves", {})
-        except:
-            pass # Fail gracefully if book missing
+        self.evaluate = EVALUATIONS[evaluation]
+        self.time_budget = time_budget
+        self.opening_book = OPENING_BOOK
+        self.last_search = None
+
+    def _start_search(self, cancel_token):
+        search = _SearchState(cancel_token)
+        self.last_search = search
+        return search
 
-    def get_best_move(self, board, valid_moves):
+    @property
+    def nodes(self):
+        """Nodes visited by this bot's latest search (so far, if it is still running)."""
+        return self.last_search.nodes if self.last_search is not None else 0
+
+    def get_best_move(self, board, valid_moves, cancel_token=None):
         """
         Determines the best column to drop a piece in using Minimax with Alpha-Beta Pruning.
+        If `cancel_token` is cancelled mid-search, raises SearchCancelled carrying the best
+        move among the root moves searched so far.
         Returns: (column, score)
         """
         # Check Opening Book First
-        board_key = self.get_board_key(board)
-        if board_key in self.opening_book:
-             move = self.opening_book[board_key]["best_move"]
-             if move in valid_moves:
-                 return move, 999999
+        book_move = self.get_book_move(board, valid_moves)
+        if book_move is not None:
+            return book_move, BOOK_SCORE
+        if self.time_budget is not None and cancel_token is None:
+            return self.timed_search(board, valid_moves, self.time_budget)
 
         start_time = time.time()
         
@@ -52,33 +137,118 @@ class MinimaxAI:
         center = COLS // 2
         ordered_moves = sorted(valid_moves, key=lambda x: abs(x - center))
 
-        best_score = -math.inf
-        best_col = random.choice(valid_moves) # Fallback
+        best = [random.choice(valid_moves), -math.inf] # Fallback
+        search = self._start_search(cancel_token)
+        try:
+            self._search_root(board, ordered_moves, self.depth, search, best)
+        except _Abort:
+            # Nothing searched yet: the center-most move is the best guess we have
+            if best[1] == -math.inf:
+                raise SearchCancelled(ordered_moves[0], 0, cancel_token.reason)
+            raise SearchCancelled(best[0], best[1], cancel_token.reason)
+
+        end_time = time.time()
+        # print(f"AI Search Depth: {self.depth} | Time: {end_time - start_time:.4f}s | Best Move: {best[0]} (Score: {best[1]})")
+        return best[0], best[1]
+
+    def iterative_search(self, board, valid_moves, cancel_token=None, on_iteration=None):
+        """
+        Iterative deepening: full searches at depth 1, 2, ... up to self.depth, each one
+        trying the previous depth's best move first. Calls on_iteration(depth, column, score)
+        after every completed depth. A cancelled search raises SearchCancelled carrying the
+        last completed depth's move.
+        Returns: (column, score)
+        """
+        book_move = self.get_book_move(board, valid_moves)
+        if book_move is not None:
+            return book_move, BOOK_SCORE
+
+        center = COLS // 2
+        ordered_moves = sorted(valid_moves, key=lambda x: abs(x - center))
+        search = self._start_search(cancel_token)
+        result = None
+        for depth in range(1, self.depth + 1):
+            best = [ordered_moves[0], -math.inf]
+            try:
+                self._search_root(board, ordered_moves, depth, search, best)
+            except _Abort:
+                if result is None:
+                    raise SearchCancelled(ordered_moves[0], 0, cancel_token.reason)
+                raise SearchCancelled(result[0], result[1], cancel_token.reason)
+            result = (best[0], best[1])
+            if on_iteration is not None:
+                on_iteration(depth, best[0], best[1])
+            if abs(best[1]) >= WIN_SCORE:
+                break # Forced result; searching deeper can't change it
+            ordered_moves = [best[0]] + [col for col in ordered_moves if col != best[0]]
+        return result
+
+    def timed_search(self, board, valid_moves, seconds):
+        """
+        Iterative deepening for `seconds`. Returns: (column, score) of the deepest search
+        that completed in time.
+        """
+        token = CancelToken()
+        timer = threading.Timer(seconds, token.cancel, ("timeout",))
+        timer.start()
+        try:
+            return self.iterative_search(board, valid_moves, token)
+        except SearchCancelled as e:
+            return e.column, e.score
+        finally:
+            timer.cancel()
 
+    def _search_root(self, board, ordered_moves, depth, search, best):
+        """
+        One alpha-beta pass over the root moves. `best` is a [column, score] list updated
+        as each root move finishes, so a cancelled pass leaves its partial result there.
+        """
         alpha = -math.inf
         beta = math.inf
-
         for col in ordered_moves:
             # Simulate move
             temp_board = [row[:] for row in board]
             self.drop_piece_simulation(temp_board, col, self.player_piece)
             
             # Call Minimax
-            score = self.minimax(temp_board, self.depth - 1, alpha, beta, False)
+            if search.token is not None and search.token.cancelled:
+                raise _Abort()
+            score = self.minimax(temp_board, depth - 1, alpha, beta, False, search)
             
-            if score > best_score:
-                best_score = score
-                best_col = col
+            if score > best[1]:
+                best[0] = col
+                best[1] = score
             
-            alpha = max(alpha, best_score)
+            alpha = max(alpha, best[1])
             if alpha >= beta:
                 break
 
-        end_time = time.time()
-        # print(f"AI Search Depth: {self.depth} | Time: {end_time - start_time:.4f}s | Best Move: {best_col} (Score: {best_score})")
-        return best_col, best_score
+    def score_moves(self, board, valid_moves, cancel_token=None, depth=None):
+        """
+        Scores every valid move with a full-window search (no root cutoffs), so the
+        scores are exact at this depth (or `depth`) and can be shared by weaker tiers.
+        Returns: {column: score}
+        """
+        depth = depth or self.depth
+        scores = {}
+        search = self._start_search(cancel_token)
+        for col in valid_moves:
+            temp_board = [row[:] for row in board]
+            self.drop_piece_simulation(temp_board, col, self.player_piece)
+            try:
+                if cancel_token is not None and cancel_token.cancelled:
+                    raise _Abort()
+                scores[col] = self.minimax(temp_board, depth - 1, -math.inf, math.inf, False, search)
+            except _Abort:
+                if not scores:
+                    raise SearchCancelled(valid_moves[0], 0, cancel_token.reason)
+                best_col = max(scores, key=scores.get)
+                raise SearchCancelled(best_col, scores[best_col], cancel_token.reason)
+        return scores
 
-    def minimax(self, board, depth, alpha, beta, maximizingPlayer):
+    def minimax(self, board, depth, alpha, beta, maximizingPlayer, search=None):
+        if search is not None:
+            search.tick()
         valid_moves = self.get_valid_locations(board)
         is_terminal = self.is_terminal_node(board, valid_moves)
         
@@ -91,7 +261,7 @@ class MinimaxAI:
                 else:
                     return 0 # Game over, no winner (Draw)
             else:
-                return score_position_v2(board, self.player_piece)
+                return self.evaluate(board, self.player_piece)
 
         if maximizingPlayer:
             value = -math.inf
@@ -102,7 +272,7 @@ class MinimaxAI:
             for col in sorted_moves:
                 temp_board = [row[:] for row in board]
                 self.drop_piece_simulation(temp_board, col, self.player_piece)
-                new_score = self.minimax(temp_board, depth - 1, alpha, beta, False)
+                new_score = self.minimax(temp_board, depth - 1, alpha, beta, False, search)
                 value = max(value, new_score)
                 alpha = max(alpha, value)
                 if alpha >= beta:
@@ -116,7 +286,7 @@ class MinimaxAI:
             for col in sorted_moves:
                 temp_board = [row[:] for row in board]
                 self.drop_piece_simulation(temp_board, col, self.opponent_piece)
-                new_score = self.minimax(temp_board, depth - 1, alpha, beta, True)
+                new_score = self.minimax(temp_board, depth - 1, alpha, beta, True, search)
                 value = min(value, new_score)
                 beta = min(beta, value)
                 if alpha >= beta:
@@ -164,6 +334,15 @@ class MinimaxAI:
                     return True
         return False
 
+    def get_book_move(self, board, valid_moves):
+        """Opening book move for this position, or None."""
+        board_key = self.get_board_key(board)
+        if board_key in self.opening_book:
+            move = self.opening_book[board_key]["best_move"]
+            if move in valid_moves:
+                return move
+        return None
+
     def get_board_key(self, board):
         """Generate simple key for opening book lookup (e.g. flat string of top plays)"""
         # Very simple version: just check empty board state
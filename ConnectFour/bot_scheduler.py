@@ -0,0 +1,170 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+# Admission control for bot searches, in front of the bot worker pool.
+#
+# Every search takes one of `capacity` slots (one per pool worker). When all slots are
+# busy, requests wait in a bounded queue per tier, and a freed slot goes to the tier
+# with the lowest virtual time (stride scheduling: a tier's virtual time advances by
+# 1/weight per job it starts), so under contention VIP gets 8 slots for every free one.
+# A tier can also be capped below the full capacity, which keeps free-tier spikes from
+# ever occupying every worker. A full queue is rejected straight away with a
+# Retry-After estimate instead of adding more latency for everyone queued behind it.
+
+# weight:        share of freed slots while tiers compete
+# running_share: max fraction of the slots the tier may hold at once
+# queue_per_slot: waiting requests allowed per slot before rejecting
+TIER_POLICIES = {
+    "vip": {"weight": 8, "running_share": 1.0, "queue_per_slot": 16},
+    "pro": {"weight": 4, "running_share": 1.0, "queue_per_slot": 8},
+    "free_tier": {"weight": 1, "running_share": 0.75, "queue_per_slot": 4},
+    "batch": {"weight": 1, "running_share": 0.5, "queue_per_slot": 256}, # Batch/tooling endpoints
+}
+DEFAULT_TIER = "free_tier"
+
+
+class SchedulerFull(Exception):
+    """The tier's queue is full. retry_after is a hint in whole seconds."""
+
+    def __init__(self, tier, retry_after):
+        super().__init__(f"Bot queue for {tier} is full")
+        self.tier = tier
+        self.retry_after = retry_after
+
+
+class _Tier:
+    __slots__ = ("name", "weight", "max_running", "max_queued", "running", "queue", "vtime",
+                 "started", "rejected")
+
+    def __init__(self, name, capacity, weight, running_share, queue_per_slot):
+        self.name = name
+        self.weight = weight
+        self.max_running = max(1, int(capacity * running_share))
+        self.max_queued = max(1, int(capacity * queue_per_slot))
+        self.running = 0
+        self.queue = deque() # Futures of waiting requests, oldest first
+        self.vtime = 0.0
+        self.started = 0
+        self.rejected = 0
+
+
+class BotScheduler:
+    """Weighted-fair, bounded admission for `capacity` concurrent bot searches. Event-loop only."""
+
+    def __init__(self, capacity, policies=None):
+        self.capacity = max(1, capacity)
+        self.tiers = {
+            name: _Tier(name, self.capacity, **policy)
+            for name, policy in (policies or TIER_POLICIES).items()
+        }
+        self.running = 0
+        self.vclock = 0.0 # Virtual time of the last job started
+        self.service_time = 0.5 # EWMA of seconds per search, for Retry-After
+
+    def tier(self, name):
+        return self.tiers.get(name) or self.tiers[DEFAULT_TIER]
+
+    @asynccontextmanager
+    async def slot(self, tier_name, cancel_token=None):
+        """
+        Hold one search slot for the block. Yields True, or False if cancel_token fired
+        while the request was still queued (no slot is held then).
+        Raises SchedulerFull when the tier's queue is full.
+        """
+        tier = self.tier(tier_name)
+        if not await self._acquire(tier, cancel_token):
+            yield False
+            return
+        start = time.perf_counter()
+        try:
+            yield True
+        finally:
+            self.service_time = 0.8 * self.service_time + 0.2 * (time.perf_counter() - start)
+            self._release(tier)
+
+    async def _acquire(self, tier, cancel_token=None):
+        if not tier.queue and self._can_start(tier):
+            self._activate(tier)
+            self._start(tier)
+            return True
+        if len(tier.queue) >= tier.max_queued:
+            tier.rejected += 1
+            raise SchedulerFull(tier.name, self.retry_after(tier))
+        self._activate(tier)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        tier.queue.append(future)
+        if cancel_token is not None:
+            # Tokens can be cancelled from any thread; leave the queue on the loop's thread
+            cancel_token.on_cancel(lambda _: loop.call_soon_threadsafe(self._withdraw, tier, future))
+        try:
+            return await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.result():
+                self._release(tier) # Granted a slot just as we were cancelled; hand it on
+            else:
+                self._withdraw(tier, future)
+            raise
+
+    def _withdraw(self, tier, future):
+        if not future.done():
+            tier.queue.remove(future)
+            future.set_result(False)
+
+    def _can_start(self, tier):
+        return self.running < self.capacity and tier.running < tier.max_running
+
+    def _activate(self, tier):
+        if tier.running == 0 and not tier.queue:
+            # Idle tiers don't bank credit: rejoin at the current virtual time
+            tier.vtime = max(tier.vtime, self.vclock)
+
+    def _start(self, tier):
+        self.vclock = tier.vtime
+        tier.vtime += 1.0 / tier.weight
+        tier.running += 1
+        tier.started += 1
+        self.running += 1
+
+    def _release(self, tier):
+        tier.running -= 1
+        self.running -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """Hand free slots to waiting requests, lowest virtual time first."""
+        while self.running < self.capacity:
+            ready = [t for t in self.tiers.values() if t.queue and t.running < t.max_running]
+            if not ready:
+                return
+            tier = min(ready, key=lambda t: t.vtime)
+            future = tier.queue.popleft()
+            if future.done():
+                continue
+            self._start(tier)
+            future.set_result(True)
+
+    def retry_after(self, tier):
+        """Rough seconds for the tier's queue to drain."""
+        waves = (len(tier.queue) + 1) / tier.max_running
+        return max(1, math.ceil(waves * self.service_time))
+
+    def stats(self):
+        return {
+            "capacity": self.capacity,
+            "running": self.running,
+            "tiers": {
+                name: {
+                    "running": t.running,
+                    "queued": len(t.queue),
+                    "max_running": t.max_running,
+                    "max_queued": t.max_queued,
+                    "started": t.started,
+                    "rejected": t.rejected,
+                }
+                for name, t in self.tiers.items()
+            },
+        }
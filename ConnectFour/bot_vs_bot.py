@@ -8,6 +8,7 @@ import sys
 # Player 1: Minimax AI (Medium)
 # Player 2: Minimax AI (Hard)
 # This tests if the Hard AI beats the Medium AI (expected behavior).
+# For ratings across many configs and openings, on all cores, see tournament.py.
 
 def run_simulation(matches=10):
     p1_wins = 0
@@ -0,0 +1,319 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from game_engine import PLAYER1, PLAYER2, ROWS, COLS, EMPTY, encode_board, decode_board
+from bot_ai import MinimaxAI, SearchCancelled
+from shared_analysis import TieredBot, shared_cache, ANALYSIS_DIFFICULTY, TIER_PROFILES
+from move_cache import move_cache
+from bot_scheduler import BotScheduler, DEFAULT_TIER
+from metrics import BOT_SEARCH_SECONDS, BOT_QUEUE_SECONDS
+
+# Bot searches run in a pool of warm worker processes so a hard search never holds
+# the API process's GIL. Jobs are fed a 42-char board encoding (see encode_board)
+# and cancelled through a shared-memory flag per job slot. Iterative searches also
+# publish (column, score) of every completed depth in the slot's progress cells, one
+# pair per depth, so the API process reports each depth even when several complete
+# between two polls.
+#
+# BOT_POOL_WORKERS=<n>  number of worker processes (default: one per CPU)
+# BOT_POOL_WORKERS=0    run searches on threads inside the API process (dev/tests)
+#
+# analyze_position jobs score every move of a position for post-game analysis, through
+# the same analysis cache the shared-analysis bots use. Shared-analysis bot moves are
+# sampled in the API process from its copy of that cache; only a miss reaches a worker.
+#
+# Searches are admitted by a BotScheduler (bot_scheduler.py) with one slot per worker,
+# so requests queue per tier in the API process rather than FIFO in the executor.
+
+ENGINES = ("minimax", "shared")
+DIFFICULTIES = ("easy", "medium", "hard", "vip")
+
+MAX_JOBS = 1024 # Concurrent jobs that can be cancelled; extra jobs just run to completion
+
+# Cancel reasons travel through shared memory as small ints
+CANCEL_REASONS = ["", "cancelled", "disconnected", "timeout", "deleted", "accepted"]
+
+MAX_DEPTH = ROWS * COLS # Deeper than any search can go
+PROGRESS_CELLS = 1 + 2 * MAX_DEPTH # Per slot: depths completed, then (column, score) per depth
+PROGRESS_POLL_INTERVAL = 0.05
+
+_cancel_flags = None # Shared RawArray, installed in each worker by _init_worker
+_progress = None # Shared RawArray of PROGRESS_CELLS doubles per slot
+_bots = {} # (engine, difficulty, side) -> bot, one per process
+
+
+def _init_worker(cancel_flags, progress):
+    """Pool initializer: keep the shared arrays and build every bot up front."""
+    global _cancel_flags, _progress
+    _cancel_flags = cancel_flags
+    _progress = progress
+    for engine in ENGINES:
+        for difficulty in DIFFICULTIES:
+            for side in (PLAYER1, PLAYER2):
+                get_bot(engine, difficulty, side)
+
+
+def get_bot(engine, difficulty, side):
+    """
+    Shared bot for (engine, difficulty, side). Bots keep no per-game or per-search
+    state, so one instance serves every game and thread in the process.
+    """
+    key = (engine, difficulty, side)
+    bot = _bots.get(key)
+    if bot is None:
+        bot_class = TieredBot if engine == "shared" else MinimaxAI
+        bot = _bots[key] = bot_class(side, difficulty)
+    return bot
+
+
+def _warmup():
+    return os.getpid()
+
+
+class _SlotToken:
+    """CancelToken look-alike backed by one byte of shared memory."""
+    __slots__ = ("slot",)
+
+    def __init__(self, slot):
+        self.slot = slot
+
+    @property
+    def cancelled(self):
+        return _cancel_flags[self.slot] != 0
+
+    @property
+    def reason(self):
+        return CANCEL_REASONS[_cancel_flags[self.slot]]
+
+
+def _report_progress(slot, depth, column, score):
+    base = slot * PROGRESS_CELLS
+    _progress[base + 2 * depth - 1] = column
+    _progress[base + 2 * depth] = score
+    _progress[base] = depth # Written last: depths up to it are complete and never change
+
+
+def search_position(encoded_board, player, difficulty, engine="minimax", slot=None, iterative=False):
+    """
+    Worker entry point. `iterative` runs a minimax bot by iterative deepening and
+    reports each completed depth to the slot's progress cells.
+    Returns: (column, score, cancel_reason) - cancel_reason is None for a full search.
+    """
+    board = decode_board(encoded_board)
+    valid_moves = [c for c in range(COLS) if board[0][c] == EMPTY]
+    token = _SlotToken(slot) if slot is not None else None
+    bot = get_bot(engine, difficulty, player)
+    try:
+        if iterative and slot is not None and engine == "minimax":
+            column, score = bot.iterative_search(
+                board, valid_moves, token, lambda depth, col, value: _report_progress(slot, depth, col, value))
+        else:
+            column, score = bot.get_best_move(board, valid_moves, token)
+        return column, score, None
+    except SearchCancelled as e:
+        return e.column, e.score, e.reason
+
+
+def analyze_position(encoded_board, player, depth=None, slot=None):
+    """
+    Worker entry point: score every valid move for `player`, `depth` deep (default: the
+    analysis depth), through the worker's shared analysis cache (see shared_analysis.py).
+    Returns: ({column: score}, cancel_reason) - scores is None if cancelled.
+    """
+    board = decode_board(encoded_board)
+    valid_moves = [c for c in range(COLS) if board[0][c] == EMPTY]
+    token = _SlotToken(slot) if slot is not None else None
+    try:
+        return shared_cache.analyze(board, player, valid_moves, token, depth), None
+    except SearchCancelled as e:
+        return None, e.reason
+
+
+class BotPool:
+    """Owns the executor and the cancel-flag slots. One per API process."""
+
+    def __init__(self, workers=None):
+        if workers is None:
+            workers = int(os.getenv("BOT_POOL_WORKERS", os.cpu_count() or 1))
+        self.workers = workers
+        # spawn: forking a process that already runs an event loop and threads is unsafe
+        self.context = multiprocessing.get_context("spawn")
+        self.cancel_flags = self.context.RawArray('b', MAX_JOBS)
+        self.progress = self.context.RawArray('d', MAX_JOBS * PROGRESS_CELLS)
+        self.free_slots = list(range(MAX_JOBS))
+        self.lock = threading.Lock()
+        self.executor = None
+        self.threads = os.cpu_count() or 1 # Thread-mode executor size
+        self.scheduler = BotScheduler(workers if workers > 0 else self.threads)
+
+    def start(self):
+        """Create the executor and block until every worker has the engine loaded."""
+        if self.executor is not None:
+            return
+        if self.workers > 0:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=self.context,
+                initializer=_init_worker,
+                initargs=(self.cancel_flags, self.progress),
+            )
+            # Processes start lazily; force them all up now instead of on the first moves
+            for future in [self.executor.submit(_warmup) for _ in range(self.workers)]:
+                future.result()
+        else:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.threads,
+                initializer=_init_worker,
+                initargs=(self.cancel_flags, self.progress),
+            )
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def _acquire_slot(self):
+        with self.lock:
+            if not self.free_slots:
+                return None
+            slot = self.free_slots.pop()
+        self.cancel_flags[slot] = 0
+        self.progress[slot * PROGRESS_CELLS] = 0
+        return slot
+
+    def _read_progress(self, slot, after):
+        """Returns: [(depth, column, score)] of the depths the slot has completed past `after`."""
+        base = slot * PROGRESS_CELLS
+        depth = int(self.progress[base])
+        return [(d, int(self.progress[base + 2 * d - 1]), int(self.progress[base + 2 * d]))
+                for d in range(after + 1, depth + 1)]
+
+    def _release_slot(self, slot):
+        if slot is not None:
+            with self.lock:
+                self.free_slots.append(slot)
+
+    async def search(self, board, player, difficulty, engine="minimax", cancel_token=None, on_progress=None,
+                     tier=DEFAULT_TIER):
+        """
+        Run one bot search in the pool, or answer it from the move cache.
+        Raises SearchCancelled (with the partial best move) if cancel_token fires, and
+        SchedulerFull if the tier's queue is full.
+        With on_progress (needs a cancel_token for the job slot), minimax searches deepen
+        iteratively and on_progress(depth, column, score) is called per completed depth.
+        Returns: (column, score)
+        """
+        if engine == "shared":
+            return await self._shared_move(board, player, difficulty, cancel_token, tier)
+        position = encode_board(board) # Snapshot: the live board can change while we wait
+        hit = await move_cache.lookup(position, player, engine, difficulty)
+        if hit is not None:
+            return hit
+        if self.executor is None:
+            self.start()
+        queued = time.perf_counter()
+        async with self.scheduler.slot(tier, cancel_token) as granted:
+            BOT_QUEUE_SECONDS.observe(time.perf_counter() - queued, tier)
+            if not granted:
+                # Cancelled while queued: nothing searched, offer the center-most move
+                valid_moves = [c for c in range(COLS) if board[0][c] == EMPTY]
+                raise SearchCancelled(min(valid_moves, key=lambda c: abs(c - COLS // 2)), 0, cancel_token.reason)
+            column, score, reason = await self._run(
+                search_position, (position, player, difficulty, engine), cancel_token, on_progress, (engine, difficulty))
+        if reason is not None:
+            raise SearchCancelled(column, score, reason)
+        move_cache.put(position, player, engine, difficulty, column, score)
+        return column, score
+
+    async def _shared_move(self, board, player, difficulty, cancel_token, tier):
+        """
+        Shared-analysis bot move: sampled here from this process's analysis cache, so a
+        cached position takes no worker slot. Only a miss sends the analysis to the pool.
+        (The move is sampled at random, so it doesn't go through the move cache.)
+        """
+        valid_moves = [c for c in range(COLS) if board[0][c] == EMPTY]
+        board = [row[:] for row in board] # Snapshot: the live board can change while we wait
+        try:
+            scores = await self.analyze(board, player, cancel_token, tier, difficulty)
+        except SearchCancelled as e:
+            # Nothing to sample from: offer the center-most move, as a search cancelled in the queue does
+            raise SearchCancelled(min(valid_moves, key=lambda c: abs(c - COLS // 2)), 0, e.reason)
+        return get_bot("shared", difficulty, player).pick(scores, valid_moves)
+
+    async def analyze(self, board, player, cancel_token=None, tier=DEFAULT_TIER, difficulty=ANALYSIS_DIFFICULTY):
+        """
+        Scores of every valid move for `player` (see AnalysisCache), searched as deep as
+        `difficulty`'s tier profile, from this process's analysis cache or a pool worker.
+        Raises SearchCancelled / SchedulerFull like search().
+        Returns: {column: score}
+        """
+        depth = TIER_PROFILES[difficulty]["depth"]
+        scores = shared_cache.get(board, player, depth)
+        if scores is not None:
+            return scores
+        position = encode_board(board)
+        if self.executor is None:
+            self.start()
+        queued = time.perf_counter()
+        async with self.scheduler.slot(tier, cancel_token) as granted:
+            BOT_QUEUE_SECONDS.observe(time.perf_counter() - queued, tier)
+            if granted:
+                scores, reason = await self._run(
+                    analyze_position, (position, player, depth), cancel_token, None, ("analysis", difficulty))
+        if not granted or reason is not None:
+            raise SearchCancelled(None, 0, cancel_token.reason)
+        # Remember it on this side too, so the next request for the position skips the pool
+        shared_cache.put(board, player, scores, depth)
+        return scores
+
+    async def _run(self, fn, args, cancel_token, on_progress, labels):
+        """
+        Run a worker entry point, fn(*args, slot=..., [iterative=True]), in the executor
+        with a cancel slot when there's a cancel_token. `labels` are the
+        BOT_SEARCH_SECONDS labels. Returns what fn returns.
+        """
+        slot = self._acquire_slot() if cancel_token is not None else None
+        job = {"slot": slot}
+        if slot is not None:
+            def forward(reason):
+                # The slot may already be back in the free list if the search finished
+                with self.lock:
+                    if job["slot"] is not None:
+                        self.cancel_flags[slot] = CANCEL_REASONS.index(reason) if reason in CANCEL_REASONS else 1
+            cancel_token.on_cancel(forward)
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        iterative = on_progress is not None and slot is not None
+        call = partial(fn, *args, slot=slot, iterative=True) if iterative else partial(fn, *args, slot=slot)
+        future = loop.run_in_executor(self.executor, call)
+        try:
+            if iterative:
+                reported = 0
+                while True:
+                    done, _ = await asyncio.wait({future}, timeout=PROGRESS_POLL_INTERVAL)
+                    for depth, col, value in self._read_progress(slot, reported):
+                        reported = depth
+                        on_progress(depth, col, value)
+                    if done:
+                        break
+            result = await future
+        finally:
+            if not future.done() and cancel_token is not None:
+                # Our caller went away; stop the worker before its slot is reused
+                cancel_token.cancel("cancelled")
+            with self.lock:
+                job["slot"] = None
+            if future.done():
+                self._release_slot(slot)
+            else:
+                future.add_done_callback(lambda _: self._release_slot(slot))
+        BOT_SEARCH_SECONDS.observe(time.perf_counter() - start, *labels)
+        return result
+
+
+bot_pool = BotPool()
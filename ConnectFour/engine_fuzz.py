@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from game_engine import ENGINES, ROWS, COLS
+
+# Differential fuzzer for the game backends in game_engine.ENGINES.
+#
+#   python engine_fuzz.py --games 1000000 --workers 8
+#   python engine_fuzz.py --engines list,bitboard --seed 42 --games 10000
+#
+# Random games are played through every backend in lockstep. After each step the row
+# played, current player, game over / winner, valid moves, move history, board and
+# serialized state must agree everywhere. Steps are mostly random legal moves, with
+# some take-backs (undo_move) and illegal moves (full or out-of-range columns, moves
+# after the game ended), which must raise ValueError in every backend. The first
+# mismatch is printed with the game's seed and steps so it can be replayed, and the
+# run exits 1. Also reports the time each backend spent on its moves.
+
+UNDO_CHANCE = 0.05
+ILLEGAL_CHANCE = 0.05
+MAX_STEPS = 200 # Take-backs make games longer; stop runaway ones
+
+
+def state(game):
+    """The fields ConnectFourGame.to_json serializes."""
+    return {
+        "board": game.board,
+        "current_player": game.current_player,
+        "move_history": list(game.move_history),
+        "game_over": game.game_over,
+        "winner": game.winner,
+    }
+
+
+def observe(game):
+    observed = state(game)
+    # Backends without to_json would be serialized from the same fields, in the same order
+    to_json = getattr(game, "to_json", None)
+    observed["serialized"] = to_json() if to_json else json.dumps(observed)
+    observed["valid_moves"] = game.get_valid_moves()
+    observed["is_draw"] = game.is_draw()
+    return observed
+
+
+def apply(game, action, column):
+    """One step. Returns the step's result, or "ValueError" if it was refused."""
+    try:
+        if action == "undo":
+            return game.undo_move()
+        return game.drop_piece(column)
+    except ValueError:
+        return "ValueError"
+
+
+def fuzz_game(engines, seed, timings=None):
+    """
+    Play one random game through every engine class in `engines` ({name: class}).
+    Returns None, or a description of the first disagreement.
+    """
+    rng = random.Random(seed)
+    games = {name: cls() for name, cls in engines.items()}
+    reference = next(iter(games.values()))
+    steps = []
+    for _ in range(MAX_STEPS):
+        valid = reference.get_valid_moves()
+        roll = rng.random()
+        if reference.game_over or roll < ILLEGAL_CHANCE:
+            if reference.game_over and reference.move_history and rng.random() < 0.5:
+                action, column = "undo", None # Take back a finished game's last move too
+            elif reference.game_over and valid and rng.random() < 0.5:
+                action, column = "illegal", rng.choice(valid) # Free column, but the game is over
+            else:
+                full = [col for col in range(COLS) if col not in valid]
+                action, column = "illegal", rng.choice(full if full and rng.random() < 0.7 else [-1, COLS])
+        elif roll < ILLEGAL_CHANCE + UNDO_CHANCE and reference.move_history:
+            action, column = "undo", None
+        else:
+            action, column = "move", rng.choice(valid)
+        steps.append(column if action != "undo" else "undo")
+
+        results = {}
+        for name, game in games.items():
+            start = time.perf_counter()
+            results[name] = apply(game, action, column)
+            if timings is not None:
+                timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+        if action == "illegal" and any(result != "ValueError" for result in results.values()):
+            return {"seed": seed, "steps": steps, "field": "illegal move accepted", "values": results}
+        if len(set(map(repr, results.values()))) > 1:
+            return {"seed": seed, "steps": steps, "field": "result", "values": results}
+
+        observed = {name: observe(game) for name, game in games.items()}
+        expected = observed[next(iter(observed))]
+        for field in expected:
+            values = {name: o[field] for name, o in observed.items()}
+            if any(value != expected[field] for value in values.values()):
+                return {"seed": seed, "steps": steps, "field": field, "values": values}
+        if reference.game_over and len(reference.move_history) == ROWS * COLS:
+            break
+        if reference.game_over and rng.random() < 0.3:
+            break
+    return None
+
+
+def fuzz_batch(engine_names, seed, start, count):
+    """Games start .. start + count - 1 of a run. Returns: (games played, mismatch or None, seconds per engine)"""
+    engines = {name: ENGINES[name] for name in engine_names}
+    timings = {}
+    for i in range(start, start + count):
+        mismatch = fuzz_game(engines, (seed << 32) + i, timings)
+        if mismatch is not None:
+            return i - start + 1, mismatch, timings
+    return count, None, timings
+
+
+def run(engine_names, games, seed, workers, batch=1000, progress=None):
+    """Fuzz `games` games. Returns: (games played, mismatch or None, seconds per engine)"""
+    played = 0
+    timings = {name: 0.0 for name in engine_names}
+    batches = [(start, min(batch, games - start)) for start in range(0, games, batch)]
+
+    def collect(result):
+        nonlocal played
+        count, mismatch, spent = result
+        played += count
+        for name, seconds in spent.items():
+            timings[name] += seconds
+        if progress:
+            progress(played)
+        return mismatch
+
+    if workers == 0:
+        for start, count in batches:
+            mismatch = collect(fuzz_batch(engine_names, seed, start, count))
+            if mismatch:
+                return played, mismatch, timings
+        return played, None, timings
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        queue = iter(batches)
+        for start, count in queue:
+            pending.add(executor.submit(fuzz_batch, engine_names, seed, start, count))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                mismatch = collect(future.result())
+                if mismatch:
+                    for other in pending:
+                        other.cancel()
+                    return played, mismatch, timings
+                job = next(queue, None)
+                if job is not None:
+                    pending.add(executor.submit(fuzz_batch, engine_names, seed, *job))
+    return played, None, timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Differential fuzzing of the Connect Four game backends.")
+    parser.add_argument("--engines", default=",".join(ENGINES),
+                        help=f"comma-separated backends, the first is the reference (default: {','.join(ENGINES)})")
+    parser.add_argument("--games", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes; 0 = in-process")
+    args = parser.parse_args(argv)
+
+    engine_names = [name.strip() for name in args.engines.split(",")]
+    unknown = [name for name in engine_names if name not in ENGINES]
+    if unknown or len(engine_names) < 2:
+        parser.error(f"need two or more of: {', '.join(ENGINES)}")
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 31)
+    print(f"Fuzzing {', '.join(engine_names)} over {args.games} games (seed {seed})")
+
+    start = time.time()
+    step = max(args.games // 10, 1)
+    played, mismatch, timings = run(engine_names, args.games, seed, args.workers,
+                                    progress=lambda n: n % step < 1000 and print(f"  {n} games", flush=True))
+    elapsed = time.time() - start
+    print(f"{played} games in {elapsed:.1f}s ({played / elapsed:,.0f} games/s)")
+    base = timings[engine_names[0]]
+    for name in engine_names:
+        print(f"  {name:<10} {timings[name]:>8.2f}s in steps  ({base / timings[name] if timings[name] else 0:.2f}x {engine_names[0]})")
+    if mismatch:
+        print(f"\nMISMATCH in {mismatch['field']} (game seed {mismatch['seed']})")
+        print(f"  steps: {mismatch['steps']}")
+        for name, value in mismatch["values"].items():
+            print(f"  {name}: {value}")
+        return 1
+    print("All backends agree.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
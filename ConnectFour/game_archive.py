@@ -0,0 +1,321 @@
+import os
+import re
+import struct
+import threading
+import time
+import uuid
+
+from game_engine import PackedGame, PLAYER1, PLAYER2
+
+# Append-only archive of finished games.
+#
+# Games are appended to numbered segment files (segment-000001.c4a, ...) and a new
+# segment is started once the last one reaches GAME_ARCHIVE_SEGMENT_BYTES. A record
+# is a fixed 30-byte header plus the moves packed one nibble each, so a whole game is
+# ~50 bytes. Each record goes out in a single O_APPEND write, which lets several API
+# worker processes append to the same directory without coordinating.
+#
+# Lookups by game id go through an in-memory offset index. It is rebuilt on open from
+# per-segment .idx files (written when a segment is sealed) plus a scan of whatever
+# they don't cover, and catches up with other processes' appends on a miss.
+#
+# GAME_ARCHIVE_DIR            directory of the archive; empty disables archiving
+# GAME_ARCHIVE_SEGMENT_BYTES  size at which a new segment is started
+
+SEGMENT_BYTES = int(os.getenv("GAME_ARCHIVE_SEGMENT_BYTES", 8 * 1024 * 1024))
+
+MAGIC = 0xC4
+# magic, game id (uuid bytes), created, finished (epoch seconds), flags, difficulty,
+# tier, winner, move count - then (moves + 1) // 2 bytes of nibbles, first move high
+HEADER = struct.Struct("<B16sIIBBBBB")
+INDEX_HEADER = struct.Struct("<4sQ") # b"C4IX", segment bytes the index covers
+INDEX_ENTRY = struct.Struct("<16sI") # game id, record offset
+INDEX_MAGIC = b"C4IX"
+
+# On-disk codes: only ever append to these
+DIFFICULTY_CODES = ("easy", "medium", "hard", "vip")
+TIER_CODES = ("free_tier", "pro", "vip", "batch")
+WINNER_CODES = (None, PLAYER1, PLAYER2, "draw")
+UNKNOWN = 255
+
+FLAG_PLAYER1_BOT = 1
+FLAG_PLAYER2_BOT = 2
+FLAG_SHARED_ANALYSIS = 4
+
+SEGMENT_NAME = re.compile(r"^segment-(\d{6})\.c4a$")
+
+
+def pack_moves(moves):
+    """Columns -> bytes, two moves per byte (first move in the high nibble)."""
+    packed = bytearray((len(moves) + 1) // 2)
+    for i, column in enumerate(moves):
+        packed[i // 2] |= column << (4 if i % 2 == 0 else 0)
+    return bytes(packed)
+
+
+def unpack_moves(packed, count):
+    return [(packed[i // 2] >> (4 if i % 2 == 0 else 0)) & 0xF for i in range(count)]
+
+
+def _code(table, value):
+    return table.index(value) if value in table else UNKNOWN
+
+
+def _value(table, code):
+    return table[code] if code < len(table) else None
+
+
+class ArchivedGame:
+    __slots__ = ("game_id", "moves", "winner", "player1_type", "player2_type", "difficulty", "tier",
+                 "shared_analysis", "created_at", "finished_at")
+
+    def __init__(self, game_id, moves, winner, player1_type, player2_type, difficulty, tier,
+                 shared_analysis, created_at, finished_at):
+        self.game_id = game_id
+        self.moves = moves
+        self.winner = winner
+        self.player1_type = player1_type
+        self.player2_type = player2_type
+        self.difficulty = difficulty
+        self.tier = tier
+        self.shared_analysis = shared_analysis
+        self.created_at = created_at
+        self.finished_at = finished_at
+
+    def replay(self):
+        """The final position as a PackedGame."""
+        game = PackedGame()
+        for column in self.moves:
+            game.drop_piece(column)
+        return game
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def encode_record(game_id, moves, winner, config, created_at, finished_at):
+    flags = 0
+    if config.get("player1_type") == "bot":
+        flags |= FLAG_PLAYER1_BOT
+    if config.get("player2_type") == "bot":
+        flags |= FLAG_PLAYER2_BOT
+    if config.get("shared_analysis"):
+        flags |= FLAG_SHARED_ANALYSIS
+    header = HEADER.pack(MAGIC, uuid.UUID(game_id).bytes, int(created_at), int(finished_at), flags,
+                         _code(DIFFICULTY_CODES, config.get("difficulty")), _code(TIER_CODES, config.get("tier")),
+                         _code(WINNER_CODES, winner), len(moves))
+    return header + pack_moves(moves)
+
+
+def record_length(buffer, offset):
+    """Length of the whole record starting at offset, or 0 if there isn't one (yet)."""
+    end = offset + HEADER.size
+    if end > len(buffer) or buffer[offset] != MAGIC:
+        return 0
+    length = HEADER.size + (buffer[end - 1] + 1) // 2
+    return length if offset + length <= len(buffer) else 0
+
+
+def decode_record(buffer, offset):
+    """Returns: (ArchivedGame, next offset), or (None, offset) if no whole record starts there."""
+    if not record_length(buffer, offset):
+        return None, offset
+    end = offset + HEADER.size
+    magic, raw_id, created, finished, flags, difficulty, tier, winner, count = HEADER.unpack_from(buffer, offset)
+    moves = unpack_moves(buffer[end:end + (count + 1) // 2], count)
+    game = ArchivedGame(
+        str(uuid.UUID(bytes=bytes(raw_id))), moves, _value(WINNER_CODES, winner),
+        "bot" if flags & FLAG_PLAYER1_BOT else "human", "bot" if flags & FLAG_PLAYER2_BOT else "human",
+        _value(DIFFICULTY_CODES, difficulty), _value(TIER_CODES, tier), bool(flags & FLAG_SHARED_ANALYSIS),
+        created, finished)
+    return game, end + (count + 1) // 2
+
+
+class GameArchive:
+    """Append-only, segment-rotated store of finished games. Thread-safe."""
+
+    def __init__(self, directory, segment_bytes=SEGMENT_BYTES):
+        # Absolute, so the archive still works if the process changes directory later
+        self.directory = os.path.abspath(directory)
+        self.segment_bytes = segment_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.index = {} # uuid bytes -> segment number << 32 | offset
+        self.scanned = {} # segment number -> bytes of it already indexed
+        self.segment = None # Number of the segment we append to
+        self.fd = None
+        self.appended = 0
+        with self.lock:
+            self._load_index()
+
+    def _path(self, segment, suffix=".c4a"):
+        return os.path.join(self.directory, f"segment-{segment:06d}{suffix}")
+
+    def segments(self):
+        """Segment numbers present on disk, oldest first."""
+        numbers = []
+        for name in os.listdir(self.directory):
+            match = SEGMENT_NAME.match(name)
+            if match:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    def _load_index(self):
+        for segment in self.segments():
+            if segment not in self.scanned:
+                self._load_sealed_index(segment)
+            self._scan(segment)
+
+    def _load_sealed_index(self, segment):
+        try:
+            with open(self._path(segment, ".idx"), "rb") as f:
+                data = f.read()
+        except OSError:
+            return
+        if len(data) < INDEX_HEADER.size:
+            return
+        magic, covered = INDEX_HEADER.unpack_from(data)
+        if magic != INDEX_MAGIC:
+            return
+        for raw_id, offset in INDEX_ENTRY.iter_unpack(data[INDEX_HEADER.size:]):
+            self.index[raw_id] = segment << 32 | offset
+        self.scanned[segment] = covered
+
+    def _scan(self, segment):
+        """Index the records of a segment past what we have already seen."""
+        start = self.scanned.get(segment, 0)
+        if os.path.getsize(self._path(segment)) <= start:
+            return
+        with open(self._path(segment), "rb") as f:
+            f.seek(start)
+            data = f.read()
+        offset = 0
+        while True:
+            length = record_length(data, offset)
+            if not length:
+                break # End of data, or a record another process is still writing
+            self.index[data[offset + 1:offset + 17]] = segment << 32 | (start + offset)
+            offset += length
+        self.scanned[segment] = start + offset
+
+    def _seal(self, segment):
+        """Write the .idx file of a full segment so later opens don't have to scan it."""
+        self._scan(segment)
+        entries = [INDEX_ENTRY.pack(raw_id, location & 0xFFFFFFFF)
+                   for raw_id, location in self.index.items() if location >> 32 == segment]
+        tmp = self._path(segment, ".idx.tmp")
+        with open(tmp, "wb") as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, self.scanned[segment]))
+            f.write(b"".join(entries))
+        os.replace(tmp, self._path(segment, ".idx"))
+
+    def _open_segment(self):
+        """Point self.fd at the segment to append to, starting a new one when it's full."""
+        if self.fd is None:
+            segments = self.segments()
+            self.segment = segments[-1] if segments else 1
+            self.fd = os.open(self._path(self.segment), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        # Another process may have rotated already; then we just follow it
+        while os.fstat(self.fd).st_size >= self.segment_bytes:
+            os.close(self.fd)
+            full = self.segment
+            self.segment += 1
+            created = not os.path.exists(self._path(self.segment))
+            self.fd = os.open(self._path(self.segment), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            if created:
+                self._seal(full)
+
+    def append(self, game_id, moves, winner, config, created_at, finished_at=None):
+        """Archive one finished game."""
+        record = encode_record(game_id, moves, winner, config, created_at, finished_at or time.time())
+        with self.lock:
+            self._open_segment()
+            os.write(self.fd, record) # One write per record: appends never interleave
+            offset = os.lseek(self.fd, 0, os.SEEK_CUR) - len(record)
+            self.index[record[1:17]] = self.segment << 32 | offset
+            self.appended += 1
+
+    def get(self, game_id):
+        """Return the ArchivedGame, or None."""
+        try:
+            raw_id = uuid.UUID(game_id).bytes
+        except ValueError:
+            return None
+        with self.lock:
+            location = self.index.get(raw_id)
+            if location is None:
+                self._load_index() # Pick up our own and other processes' recent appends
+                location = self.index.get(raw_id)
+                if location is None:
+                    return None
+        segment, offset = location >> 32, location & 0xFFFFFFFF
+        with open(self._path(segment), "rb") as f:
+            f.seek(offset)
+            data = f.read(HEADER.size + 21)
+        return decode_record(data, 0)[0]
+
+    def __contains__(self, game_id):
+        return self.get(game_id) is not None
+
+    def __len__(self):
+        with self.lock:
+            self._load_index()
+            return len(self.index)
+
+    def __iter__(self):
+        return self.iter_games()
+
+    def iter_games(self, chunk_bytes=1024 * 1024):
+        """Stream every archived game, oldest first, reading each segment in chunks."""
+        for segment in self.segments():
+            with open(self._path(segment), "rb") as f:
+                buffer = b""
+                while True:
+                    chunk = f.read(chunk_bytes)
+                    if not chunk:
+                        break
+                    buffer += chunk
+                    offset = 0
+                    while True:
+                        game, next_offset = decode_record(buffer, offset)
+                        if game is None:
+                            break
+                        yield game
+                        offset = next_offset
+                    buffer = buffer[offset:]
+
+    def close(self):
+        with self.lock:
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
+
+    def stats(self):
+        segments = self.segments()
+        return {
+            "segments": len(segments),
+            "bytes": sum(os.path.getsize(self._path(segment)) for segment in segments),
+            "indexed_games": len(self.index),
+            "appended": self.appended,
+        }
+
+
+def create_game_archive():
+    """Archive selected by GAME_ARCHIVE_DIR, or None when archiving is off."""
+    directory = os.getenv("GAME_ARCHIVE_DIR", "game_archive")
+    return GameArchive(directory) if directory else None
+
+
+if __name__ == "__main__":
+    import sys
+    # Quick summary of an archive: python game_archive.py [directory]
+    archive = GameArchive(sys.argv[1] if len(sys.argv) > 1 else os.getenv("GAME_ARCHIVE_DIR", "game_archive"))
+    games = wins = draws = plies = 0
+    for game in archive:
+        games += 1
+        plies += len(game.moves)
+        wins += game.winner == PLAYER1
+        draws += game.winner == "draw"
+    print(f"{games} games, {archive.stats()['bytes']} bytes")
+    if games:
+        print(f"player 1 wins {wins / games:.1%}, draws {draws / games:.1%}, {plies / games:.1f} moves per game")
@@ -8,6 +8,14 @@ PLAYER2 = 2
 ROWS = 6
 COLS = 7
 
+def encode_board(board):
+    """Pack a board into a 42-char string ('0', '1', '2'), row-major from the top row."""
+    return "".join(str(cell) for row in board for cell in row)
+
+def decode_board(key):
+    """Inverse of encode_board."""
+    return [[int(key[r * COLS + c]) for c in range(COLS)] for r in range(ROWS)]
+
 class ConnectFourGame:
     def __init__(self):
         self.board = [[EMPTY for _ in range(COLS)] for _ in range(ROWS)]
@@ -29,7 +37,7 @@ class ConnectFourGame:
         return [col for col in range(COLS) if self.is_valid_move(col)]
 
     def drop_piece(self, column):
-        """Drop a piece into the specified column."""
+        """Drop a piece into the specified column. Returns the row it landed in."""
         if self.game_over:
             raise ValueError("Game is over")
         if not self.is_valid_move(column):
@@ -49,7 +57,18 @@ class ConnectFourGame:
                     self.winner = 'draw'
                 else:
                     self.switch_player()
-                return
+                return row
+
+    def undo_move(self):
+        """Take back the last move (e.g. for search or perft). Returns its column."""
+        column = self.move_history.pop()
+        row = next(r for r in range(ROWS) if self.board[r][column] != EMPTY)
+        # Whoever played it is to move again, whether or not it ended the game
+        self.current_player = self.board[row][column]
+        self.board[row][column] = EMPTY
+        self.game_over = False
+        self.winner = None
+        return column
 
     def switch_player(self):
         self.current_player = PLAYER2 if self.current_player == PLAYER1 else PLAYER1
@@ -132,6 +151,182 @@ class ConnectFourGame:
         lines.append("---------------")
         return "\n".join(lines)
 
+# Bitboard layout used by PackedGame's win check: bit (col * 7 + height) per piece,
+# height 0 being the bottom row. The 7th bit of each column stays empty so shifts never wrap.
+_COLUMN_BITS = ROWS + 1
+_WIN_SHIFTS = (1, _COLUMN_BITS, _COLUMN_BITS - 1, _COLUMN_BITS + 1) # Vertical, horizontal, both diagonals
+
+def _has_four(bits):
+    for shift in _WIN_SHIFTS:
+        pairs = bits & (bits >> shift)
+        if pairs & (pairs >> 2 * shift):
+            return True
+    return False
+
+class PackedGame:
+    """
+    ConnectFourGame for long-lived sessions. A position is fully given by its moves, so
+    the board is packed as one byte per move and the game is two slots (~100 bytes
+    instead of ~1.5 KB). Same play API; `board` is decoded on every read, so it is a
+    snapshot and writing to it doesn't change the game.
+    """
+    __slots__ = ("moves", "winner")
+
+    def __init__(self):
+        self.moves = b"" # Column of each move, in order
+        self.winner = None
+
+    @property
+    def game_over(self):
+        return self.winner is not None
+
+    @property
+    def current_player(self):
+        # The player doesn't switch after the last move of a finished game
+        ply = len(self.moves) - (self.winner is not None)
+        return PLAYER1 if ply % 2 == 0 else PLAYER2
+
+    @property
+    def move_history(self):
+        return list(self.moves)
+
+    @property
+    def board(self):
+        board = [[EMPTY] * COLS for _ in range(ROWS)]
+        heights = [0] * COLS
+        for ply, column in enumerate(self.moves):
+            heights[column] += 1
+            board[ROWS - heights[column]][column] = PLAYER1 if ply % 2 == 0 else PLAYER2
+        return board
+
+    def _bits(self, player):
+        """Bitboard of one player's pieces."""
+        bits = 0
+        heights = [0] * COLS
+        for ply, column in enumerate(self.moves):
+            if ply % 2 == player - 1:
+                bits |= 1 << (column * _COLUMN_BITS + heights[column])
+            heights[column] += 1
+        return bits
+
+    def is_valid_move(self, column):
+        return 0 <= column < COLS and self.moves.count(column) < ROWS
+
+    def get_valid_moves(self):
+        return [col for col in range(COLS) if self.moves.count(col) < ROWS]
+
+    def drop_piece(self, column):
+        """Drop a piece into the specified column. Returns the row it landed in."""
+        if self.game_over:
+            raise ValueError("Game is over")
+        if not self.is_valid_move(column):
+            raise ValueError(f"Invalid move: column {column}")
+
+        player = self.current_player
+        row = ROWS - 1 - self.moves.count(column)
+        self.moves += bytes((column,))
+        if _has_four(self._bits(player)):
+            self.winner = player
+        elif len(self.moves) == ROWS * COLS:
+            self.winner = 'draw'
+        return row
+
+    def is_draw(self):
+        return len(self.moves) == ROWS * COLS
+
+    def undo_move(self):
+        column = self.moves[-1]
+        self.moves = self.moves[:-1]
+        self.winner = None
+        return column
+
+    def to_game(self):
+        """Unpacked ConnectFourGame copy, e.g. for display or code that edits the board."""
+        game = ConnectFourGame()
+        game.board = self.board
+        game.current_player = self.current_player
+        game.move_history = self.move_history
+        game.game_over = self.game_over
+        game.winner = self.winner
+        return game
+
+class BitboardGame:
+    """
+    ConnectFourGame on bitboards, for hot loops (perft, search, self-play): one int per
+    player in the _COLUMN_BITS layout plus column heights, so a move is a few integer
+    operations. Same play API as ConnectFourGame; `board` is decoded on every read.
+    """
+    __slots__ = ("bits", "heights", "moves", "winner")
+
+    def __init__(self):
+        self.bits = [0, 0, 0] # Indexed by player (slot 0 unused)
+        self.heights = [0] * COLS
+        self.moves = []
+        self.winner = None
+
+    @property
+    def game_over(self):
+        return self.winner is not None
+
+    @property
+    def current_player(self):
+        ply = len(self.moves) - (self.winner is not None)
+        return PLAYER1 if ply % 2 == 0 else PLAYER2
+
+    @property
+    def move_history(self):
+        return list(self.moves)
+
+    @property
+    def board(self):
+        board = [[EMPTY] * COLS for _ in range(ROWS)]
+        player1 = self.bits[PLAYER1]
+        for column in range(COLS):
+            for height in range(self.heights[column]):
+                bit = 1 << (column * _COLUMN_BITS + height)
+                board[ROWS - 1 - height][column] = PLAYER1 if player1 & bit else PLAYER2
+        return board
+
+    def is_valid_move(self, column):
+        return 0 <= column < COLS and self.heights[column] < ROWS
+
+    def get_valid_moves(self):
+        heights = self.heights
+        return [col for col in range(COLS) if heights[col] < ROWS]
+
+    def drop_piece(self, column):
+        """Drop a piece into the specified column. Returns the row it landed in."""
+        if self.winner is not None:
+            raise ValueError("Game is over")
+        if not self.is_valid_move(column):
+            raise ValueError(f"Invalid move: column {column}")
+
+        player = PLAYER1 if len(self.moves) % 2 == 0 else PLAYER2
+        height = self.heights[column]
+        self.bits[player] |= 1 << (column * _COLUMN_BITS + height)
+        self.heights[column] = height + 1
+        self.moves.append(column)
+        if _has_four(self.bits[player]):
+            self.winner = player
+        elif len(self.moves) == ROWS * COLS:
+            self.winner = 'draw'
+        return ROWS - 1 - height
+
+    def undo_move(self):
+        column = self.moves.pop()
+        height = self.heights[column] - 1
+        self.heights[column] = height
+        player = PLAYER1 if len(self.moves) % 2 == 0 else PLAYER2
+        self.bits[player] &= ~(1 << (column * _COLUMN_BITS + height))
+        self.winner = None
+        return column
+
+    def is_draw(self):
+        return len(self.moves) == ROWS * COLS
+
+# Interchangeable game backends, by name (perft.py and engine_fuzz.py compare them)
+ENGINES = {"list": ConnectFourGame, "packed": PackedGame, "bitboard": BitboardGame}
+
 if __name__ == "__main__":
     # Simple test
     game = ConnectFourGame()
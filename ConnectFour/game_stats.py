@@ -0,0 +1,219 @@
+import math
+import threading
+import time
+
+from game_engine import PLAYER1, PLAYER2
+
+# Gameplay analytics for /api/stats, kept up to date as games finish.
+#
+# Every finished game and every bot move updates a few running aggregates in O(1):
+# results per difficulty, game length, bot think time (in a quantile sketch) and
+# opening counts. Time windows are rings of slots (1m = 60 x 1s, 1h = 60 x 1min,
+# 24h = 96 x 15min); a slot is reset when the ring comes back around to it, and a
+# window is read by merging its slots. Reading never looks at the games themselves.
+#
+# Stats are per process: with several API workers each reports the games it finished.
+
+# name, span in seconds, number of slots
+WINDOWS = (("1m", 60, 60), ("1h", 3600, 60), ("24h", 86400, 96))
+
+OPENING_PLIES = 2 # Moves that make up an "opening" for the frequency table
+TOP_OPENINGS = 10
+SKETCH_ACCURACY = 0.01 # Relative error of think-time quantiles
+THINK_QUANTILES = (0.5, 0.9, 0.99)
+
+
+class QuantileSketch:
+    """
+    Streaming quantiles over positive values with bounded relative error: values go
+    into logarithmic buckets (bucket k holds (gamma^(k-1), gamma^k]), so any quantile
+    is within `accuracy` of the true value. Sketches merge by adding bucket counts.
+    """
+    __slots__ = ("gamma", "log_gamma", "min_value", "buckets", "zeros", "count", "max")
+
+    def __init__(self, accuracy=SKETCH_ACCURACY, min_value=1e-6):
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.min_value = min_value # At or below this a value counts as zero
+        self.buckets = {}
+        self.zeros = 0
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, value):
+        if value <= self.min_value:
+            self.zeros += 1
+        else:
+            key = math.ceil(math.log(value) / self.log_gamma)
+            self.buckets[key] = self.buckets.get(key, 0) + 1
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q):
+        """Value at quantile q (0-1), or None if the sketch is empty."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                # Middle of the bucket, in the sense that minimizes relative error
+                return min(2 * self.gamma ** key / (self.gamma + 1), self.max)
+        return self.max
+
+
+class Aggregate:
+    """Mergeable totals for one time slot (or a whole window)."""
+    __slots__ = ("games", "plies", "duration", "results", "think", "openings")
+
+    def __init__(self):
+        self.games = 0
+        self.plies = 0
+        self.duration = 0.0
+        self.results = {} # difficulty -> [games, player 1 wins, player 2 wins, draws, bot-vs-human games, bot wins]
+        self.think = {} # difficulty -> QuantileSketch of bot move seconds
+        self.openings = {} # opening moves (tuple) -> games
+
+    def add_game(self, difficulty, moves, winner, bot_seats, duration):
+        self.games += 1
+        self.plies += len(moves)
+        self.duration += duration
+        row = self.results.get(difficulty)
+        if row is None:
+            row = self.results[difficulty] = [0] * 6
+        row[0] += 1
+        if winner == PLAYER1:
+            row[1] += 1
+        elif winner == PLAYER2:
+            row[2] += 1
+        else:
+            row[3] += 1
+        if len(bot_seats) == 1:
+            row[4] += 1
+            row[5] += winner in bot_seats
+        if len(moves) >= OPENING_PLIES:
+            opening = tuple(moves[:OPENING_PLIES])
+            self.openings[opening] = self.openings.get(opening, 0) + 1
+
+    def add_think(self, difficulty, seconds):
+        sketch = self.think.get(difficulty)
+        if sketch is None:
+            sketch = self.think[difficulty] = QuantileSketch()
+        sketch.add(seconds)
+
+    def merge(self, other):
+        self.games += other.games
+        self.plies += other.plies
+        self.duration += other.duration
+        for difficulty, row in other.results.items():
+            mine = self.results.setdefault(difficulty, [0] * 6)
+            for i, value in enumerate(row):
+                mine[i] += value
+        for difficulty, sketch in other.think.items():
+            self.think.setdefault(difficulty, QuantileSketch()).merge(sketch)
+        for opening, count in other.openings.items():
+            self.openings[opening] = self.openings.get(opening, 0) + count
+
+    def to_dict(self):
+        def rate(count, total):
+            return round(count / total, 4) if total else None
+
+        top = sorted(self.openings.items(), key=lambda item: -item[1])[:TOP_OPENINGS]
+        return {
+            "games": self.games,
+            "avg_game_length": round(self.plies / self.games, 2) if self.games else None,
+            "avg_game_seconds": round(self.duration / self.games, 2) if self.games else None,
+            "difficulties": {
+                difficulty: {
+                    "games": games,
+                    "player1_win_rate": rate(p1, games),
+                    "player2_win_rate": rate(p2, games),
+                    "draw_rate": rate(draws, games),
+                    "bot_win_rate": rate(bot_wins, mixed), # Bot-vs-human games only
+                }
+                for difficulty, (games, p1, p2, draws, mixed, bot_wins) in sorted(self.results.items())
+            },
+            "bot_think_seconds": {
+                difficulty: dict(
+                    {f"p{round(q * 100)}": round(sketch.quantile(q), 4) for q in THINK_QUANTILES},
+                    count=sketch.count, max=round(sketch.max, 4))
+                for difficulty, sketch in sorted(self.think.items())
+            },
+            "openings": [{"moves": list(opening), "games": count, "share": rate(count, self.games)}
+                         for opening, count in top],
+        }
+
+
+class RingWindow:
+    """The last `span` seconds as `slots` Aggregates, reused round-robin."""
+
+    def __init__(self, span, slots):
+        self.width = span / slots
+        self.slots = [Aggregate() for _ in range(slots)]
+        self.epochs = [-1] * slots # Which period each slot currently holds
+
+    def slot(self, now):
+        epoch = int(now // self.width)
+        i = epoch % len(self.slots)
+        if self.epochs[i] != epoch:
+            self.slots[i] = Aggregate()
+            self.epochs[i] = epoch
+        return self.slots[i]
+
+    def total(self, now):
+        current = int(now // self.width)
+        total = Aggregate()
+        for aggregate, epoch in zip(self.slots, self.epochs):
+            if current - len(self.slots) < epoch <= current:
+                total.merge(aggregate)
+        return total
+
+
+class GameStats:
+    """Windowed and all-time gameplay aggregates. Thread-safe."""
+
+    def __init__(self, windows=WINDOWS, clock=time.time):
+        self.clock = clock
+        self.windows = {name: RingWindow(span, slots) for name, span, slots in windows}
+        self.lifetime = Aggregate()
+        self.lock = threading.Lock()
+
+    def _targets(self, now):
+        return [window.slot(now) for window in self.windows.values()] + [self.lifetime]
+
+    def record_game(self, moves, winner, config, bot_seats, created_at=None):
+        """A game just finished. `bot_seats` are the players played by bots."""
+        now = self.clock()
+        # Difficulty only means something when a bot plays
+        difficulty = config.get("difficulty") if bot_seats else "human_only"
+        duration = max(0.0, now - created_at) if created_at else 0.0
+        with self.lock:
+            for aggregate in self._targets(now):
+                aggregate.add_game(difficulty, moves, winner, bot_seats, duration)
+
+    def record_think(self, difficulty, seconds):
+        now = self.clock()
+        with self.lock:
+            for aggregate in self._targets(now):
+                aggregate.add_think(difficulty, seconds)
+
+    def snapshot(self):
+        now = self.clock()
+        with self.lock:
+            stats = {name: window.total(now).to_dict() for name, window in self.windows.items()}
+            stats["all_time"] = self.lifetime.to_dict()
+        return stats
+
+
+game_stats = GameStats()
@@ -0,0 +1,538 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Live game storage for the API.
+# GAME_STORE            "memory" (default) or "sqlite"
+# GAME_STORE_PATH       SQLite file for the sqlite store
+# GAME_STORE_MAX_GAMES  cap on games held in memory; the least recently used is evicted past it
+# GAME_IDLE_TTL         seconds a game may sit untouched before the sweep drops it
+# GAME_SWEEP_INTERVAL   seconds between background expiry sweeps
+# GAME_FLUSH_INTERVAL   seconds between SQLite group commits
+# GAME_STORE_SHARED     1 = several API worker processes share the SQLite file (uvicorn --workers N)
+# GAME_LOCK_LEASE       seconds a per-game lock is held before another worker may take it over
+# GAME_LOCK_TIMEOUT     seconds to wait for a per-game lock before giving up
+
+DEFAULT_MAX_GAMES = int(os.getenv("GAME_STORE_MAX_GAMES", 10000))
+DEFAULT_IDLE_TTL = float(os.getenv("GAME_IDLE_TTL", 3600))
+SWEEP_INTERVAL = float(os.getenv("GAME_SWEEP_INTERVAL", 60))
+FLUSH_INTERVAL = float(os.getenv("GAME_FLUSH_INTERVAL", 0.005))
+LOCK_LEASE = float(os.getenv("GAME_LOCK_LEASE", 10))
+LOCK_TIMEOUT = float(os.getenv("GAME_LOCK_TIMEOUT", 5))
+
+LOCK_STRIPES = 64 # In-process game locks, hashed by game id
+SHARED_CONFIGS_MAX = 4096 # Distinct creation configs kept for sharing between sessions
+
+
+class GameLockTimeout(Exception):
+    """Another worker held a game's lock for longer than LOCK_TIMEOUT."""
+
+
+_shared_configs = {}
+
+def shared_config(config):
+    """
+    Canonical copy of a creation config, so games created with the same settings
+    all point at one dict instead of carrying a copy each. Treat it as read-only.
+    """
+    key = tuple(sorted(config.items()))
+    shared = _shared_configs.get(key)
+    if shared is None:
+        if len(_shared_configs) >= SHARED_CONFIGS_MAX:
+            return config # Unusual configs past the cap just aren't shared
+        shared = _shared_configs.setdefault(key, dict(config))
+    return shared
+
+
+class GameSession:
+    """
+    One live game. Slotted, so an idle game costs a few hundred bytes: the game
+    should be a PackedGame, and `config` / `bots` are shared between sessions.
+    The store keeps the game's idle timer in `last_access`.
+    """
+    __slots__ = ("game", "config", "bots", "created_at", "searches", "last_access")
+
+    def __init__(self, game, config, bots=None, created_at=None):
+        self.game = game
+        self.config = config
+        self.bots = bots if bots is not None else {} # seat -> difficulty
+        self.created_at = created_at or time.time()
+        self.searches = None # CancelTokens of bot searches in flight, made on first use
+        self.last_access = None
+
+    def track_search(self, token):
+        if self.searches is None:
+            self.searches = set()
+        self.searches.add(token)
+
+    def untrack_search(self, token):
+        if self.searches is not None:
+            self.searches.discard(token)
+            if not self.searches:
+                self.searches = None
+
+    def running_searches(self):
+        return list(self.searches) if self.searches else []
+
+
+class MemoryGameStore:
+    """
+    In-memory game store with a size cap and an idle TTL.
+    Games are kept in access order, so the LRU victim and the expired games are
+    always at the front and neither eviction path has to scan the whole store.
+    Sessions are GameSessions: their idle timer lives on them, not in a per-game entry.
+    """
+
+    shared = False # True when other processes can change games behind our back
+
+    def __init__(self, max_games=DEFAULT_MAX_GAMES, idle_ttl=DEFAULT_IDLE_TTL, on_evict=None):
+        self.max_games = max_games
+        self.idle_ttl = idle_ttl
+        self.on_evict = on_evict # on_evict(game_id, session), e.g. to cancel bot searches
+        self.games = OrderedDict() # game_id -> session
+        self.lock = threading.Lock()
+        self.game_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self.created = 0
+        self.deleted = 0
+        self.evicted_lru = 0
+        self.evicted_ttl = 0
+
+    def __len__(self):
+        return len(self.games)
+
+    def __contains__(self, game_id):
+        return game_id in self.games
+
+    def get(self, game_id):
+        """Return the session (refreshing its idle timer) or None."""
+        with self.lock:
+            session = self.games.get(game_id)
+            if session is None:
+                return None
+            session.last_access = time.time()
+            self.games.move_to_end(game_id)
+            return session
+
+    def refresh(self, game_id, session):
+        """
+        Bring a session the caller already holds up to date with the store.
+        Returns it, or None if the game is gone.
+        """
+        return session if self.get(game_id) is not None else None
+
+    def game_lock(self, game_id):
+        """Context manager serializing read-check-write sections on one game."""
+        return self.game_locks[hash(game_id) % LOCK_STRIPES]
+
+    def put(self, game_id, session):
+        with self.lock:
+            if game_id not in self.games:
+                self.created += 1
+        self._notify(self._insert(game_id, session))
+
+    def _insert(self, game_id, session):
+        """Insert/refresh a game and return the (game_id, session) pairs evicted by the cap."""
+        evicted = []
+        with self.lock:
+            session.last_access = time.time()
+            self.games[game_id] = session
+            self.games.move_to_end(game_id)
+            while len(self.games) > self.max_games:
+                evicted.append(self.games.popitem(last=False))
+                self.evicted_lru += 1
+        return evicted
+
+    def save(self, game_id, session):
+        """Persist a session after a move. Nothing to do when memory is the store."""
+
+    def close(self):
+        pass
+
+    def pop(self, game_id):
+        """Remove a game explicitly. Returns its session or None."""
+        with self.lock:
+            session = self.games.pop(game_id, None)
+            if session is None:
+                return None
+            self.deleted += 1
+            return session
+
+    def sweep(self, now=None):
+        """Drop every game idle for longer than idle_ttl. Returns how many were dropped."""
+        cutoff = (now or time.time()) - self.idle_ttl
+        evicted = []
+        with self.lock:
+            while self.games:
+                game_id, session = next(iter(self.games.items()))
+                if session.last_access > cutoff:
+                    break
+                self.games.popitem(last=False)
+                evicted.append((game_id, session))
+            self.evicted_ttl += len(evicted)
+        self._notify(evicted)
+        return len(evicted)
+
+    def _notify(self, evicted):
+        if self.on_evict is not None:
+            for game_id, session in evicted:
+                self.on_evict(game_id, session)
+
+    def stats(self):
+        return {
+            "active_games": len(self.games),
+            "max_games": self.max_games,
+            "idle_ttl": self.idle_ttl,
+            "created": self.created,
+            "deleted": self.deleted,
+            "evicted_lru": self.evicted_lru,
+            "evicted_ttl": self.evicted_ttl,
+        }
+
+
+class SQLiteGameStore(MemoryGameStore):
+    """
+    Durable game store: SQLite (WAL) holds every game as its config plus a move-list
+    string ("3342..."), and the inherited memory store is a bounded cache in front of it.
+
+    Writes are write-behind: put/save/pop only record the latest row for the game in
+    `pending`, and a writer thread group-commits everything pending every
+    FLUSH_INTERVAL seconds, so the move path never waits on fsync. A cache miss
+    rebuilds the game from `session_factory(config, created_at)` by replaying its moves.
+
+    With shared=True several processes use the same file (one per uvicorn worker):
+    writes commit straight away instead of going write-behind, every read checks the
+    cached game against the row's move list and replays whatever another worker added,
+    and game_lock() is a lease row in the `game_locks` table so a move is checked and
+    written by one worker at a time. Workers with spectators on a game mark it in
+    `game_watchers`, so the worker playing an exhibition knows someone is watching.
+    Bot searches in flight are rows of `bot_searches`: any worker can cancel them
+    (accept, delete) by setting their `cancel` reason, which the searching worker polls.
+    """
+
+    def __init__(self, path, session_factory, max_games=DEFAULT_MAX_GAMES, idle_ttl=DEFAULT_IDLE_TTL,
+                 on_evict=None, flush_interval=FLUSH_INTERVAL, shared=False,
+                 lock_lease=LOCK_LEASE, lock_timeout=LOCK_TIMEOUT):
+        super().__init__(max_games=max_games, idle_ttl=idle_ttl)
+        self.path = path
+        self.session_factory = session_factory
+        self.on_expire = on_evict # Only games dropped by the TTL are really gone
+        self.flush_interval = flush_interval
+        self.pending = {} # game_id -> row tuple, or None for a delete
+        self.pending_lock = threading.Lock()
+        self.loaded = 0
+        self.flushes = 0
+        self.shared = shared
+        self.lock_lease = lock_lease
+        self.lock_timeout = lock_timeout
+        self.lock_owner = f"{os.getpid()}-{uuid.uuid4().hex}"
+        self.lock_waits = 0
+
+        self.db = self._connect()
+        with self.db:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS games ("
+                " game_id TEXT PRIMARY KEY, config TEXT NOT NULL, moves TEXT NOT NULL,"
+                " created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS games_updated ON games (updated_at)")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS game_locks ("
+                " game_id TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS game_watchers (game_id TEXT PRIMARY KEY, seen REAL NOT NULL)"
+            )
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS bot_searches ("
+                " search_id TEXT PRIMARY KEY, game_id TEXT NOT NULL, started REAL NOT NULL, cancel TEXT)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS bot_searches_game ON bot_searches (game_id)")
+        self.db_lock = threading.Lock() # Guards self.db (reads on cache misses)
+
+        self.closed = threading.Event()
+        self.writer = None
+        if not shared:
+            self.writer = threading.Thread(target=self._write_loop, name="game-store-writer", daemon=True)
+            self.writer.start()
+
+    def _connect(self):
+        # timeout: how long a write waits for another worker's transaction to finish
+        db = sqlite3.connect(self.path, check_same_thread=False, timeout=self.lock_timeout)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    @staticmethod
+    def _row(game_id, session):
+        return (game_id, json.dumps(session.config), "".join(map(str, session.game.move_history)),
+                session.created_at, time.time())
+
+    def _restore(self, row):
+        game_id, config, moves, created_at, _ = row
+        session = self.session_factory(json.loads(config), created_at)
+        game = session.game
+        for col in moves:
+            game.drop_piece(int(col))
+        return session
+
+    def __len__(self):
+        self.flush() # Count what is committed, not what is queued
+        with self.db_lock:
+            return self.db.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    def __contains__(self, game_id):
+        return self.get(game_id) is not None
+
+    def _select(self, game_id):
+        with self.db_lock:
+            return self.db.execute("SELECT * FROM games WHERE game_id = ?", (game_id,)).fetchone()
+
+    def _forget(self, game_id):
+        """Drop a game from the cache only (another worker deleted it)."""
+        with self.lock:
+            self.games.pop(game_id, None)
+
+    @staticmethod
+    def _catch_up(game, moves):
+        """Replay onto a cached game the moves other workers have added to its row."""
+        history = "".join(map(str, game.move_history))
+        if history == moves:
+            return
+        if not moves.startswith(history):
+            # Diverged (shouldn't happen): rebuild in place so held references stay valid
+            game.__init__()
+            history = ""
+        for col in moves[len(history):]:
+            game.drop_piece(int(col))
+
+    def get(self, game_id):
+        if self.shared:
+            row = self._select(game_id)
+            if row is None:
+                self._forget(game_id)
+                return None
+            session = super().get(game_id)
+            if session is None:
+                session = self._restore(row)
+                self.loaded += 1
+                self._insert(game_id, session)
+            else:
+                self._catch_up(session.game, row[2])
+            return session
+
+        session = super().get(game_id)
+        if session is not None:
+            return session
+        with self.pending_lock:
+            if game_id in self.pending:
+                row = self.pending[game_id]
+                if row is None:
+                    return None
+            else:
+                row = None
+        if row is None:
+            with self.db_lock:
+                row = self.db.execute("SELECT * FROM games WHERE game_id = ?", (game_id,)).fetchone()
+            if row is None:
+                return None
+        session = self._restore(row)
+        self.loaded += 1
+        # Dropping a game from the cache loses nothing, so no eviction callback here
+        self._insert(game_id, session)
+        return session
+
+    def refresh(self, game_id, session):
+        if not self.shared:
+            return super().refresh(game_id, session)
+        row = self._select(game_id)
+        if row is None:
+            self._forget(game_id)
+            return None
+        self._catch_up(session.game, row[2])
+        return session
+
+    @contextmanager
+    def game_lock(self, game_id):
+        # Threads of this process queue on the local lock, not on the database
+        with super().game_lock(game_id):
+            if not self.shared:
+                yield
+                return
+            self._acquire_lease(game_id)
+            try:
+                yield
+            finally:
+                with self.db_lock:
+                    with self.db:
+                        self.db.execute("DELETE FROM game_locks WHERE game_id = ? AND owner = ?",
+                                        (game_id, self.lock_owner))
+
+    def _acquire_lease(self, game_id):
+        """Take the game's lease row, or an expired one left by a crashed worker."""
+        deadline = time.monotonic() + self.lock_timeout
+        delay = 0.001
+        while True:
+            now = time.time()
+            with self.db_lock:
+                with self.db:
+                    cursor = self.db.execute(
+                        "INSERT INTO game_locks VALUES (?, ?, ?) ON CONFLICT (game_id) DO UPDATE"
+                        " SET owner = excluded.owner, expires = excluded.expires WHERE game_locks.expires < ?",
+                        (game_id, self.lock_owner, now + self.lock_lease, now))
+            if cursor.rowcount == 1:
+                return
+            self.lock_waits += 1
+            if time.monotonic() + delay > deadline:
+                raise GameLockTimeout(game_id)
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+    def put(self, game_id, session):
+        super().put(game_id, session)
+        self.save(game_id, session)
+
+    def save(self, game_id, session):
+        row = self._row(game_id, session)
+        if self.shared:
+            # Other workers read the row on their next request, so it can't wait for a flush
+            with self.db_lock:
+                with self.db:
+                    self.db.execute("INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?, ?)", row)
+            return
+        with self.pending_lock:
+            self.pending[game_id] = row
+
+    def pop(self, game_id):
+        session = self.get(game_id)
+        if session is None:
+            return None
+        super().pop(game_id)
+        if self.shared:
+            with self.db_lock:
+                with self.db:
+                    self.db.execute("DELETE FROM games WHERE game_id = ?", (game_id,))
+            return session
+        with self.pending_lock:
+            self.pending[game_id] = None
+        return session
+
+    def mark_watched(self, game_id):
+        """Record that this worker has spectators on the game."""
+        with self.db_lock:
+            with self.db:
+                self.db.execute("INSERT OR REPLACE INTO game_watchers VALUES (?, ?)", (game_id, time.time()))
+
+    def last_watched(self, game_id):
+        """When any worker last marked the game watched, or None."""
+        with self.db_lock:
+            row = self.db.execute("SELECT seen FROM game_watchers WHERE game_id = ?", (game_id,)).fetchone()
+        return row[0] if row else None
+
+    def add_search(self, game_id, search_id):
+        """Register a bot search this worker runs for the game (remove it with remove_search)."""
+        with self.db_lock:
+            with self.db:
+                self.db.execute("INSERT OR REPLACE INTO bot_searches VALUES (?, ?, ?, NULL)",
+                                (search_id, game_id, time.time()))
+
+    def remove_search(self, search_id):
+        with self.db_lock:
+            with self.db:
+                self.db.execute("DELETE FROM bot_searches WHERE search_id = ?", (search_id,))
+
+    def cancel_searches(self, game_id, reason):
+        """Ask every worker to stop the game's bot searches. Returns how many were running."""
+        with self.db_lock:
+            with self.db:
+                cursor = self.db.execute("UPDATE bot_searches SET cancel = ? WHERE game_id = ? AND cancel IS NULL",
+                                         (reason, game_id))
+        return cursor.rowcount
+
+    def search_cancel_reason(self, search_id):
+        """Why another worker cancelled the search, or None while it may go on."""
+        with self.db_lock:
+            row = self.db.execute("SELECT cancel FROM bot_searches WHERE search_id = ?", (search_id,)).fetchone()
+        return row[0] if row else None
+
+    def sweep(self, now=None):
+        """
+        Expire idle games from the cache, and delete rows with no move for idle_ttl.
+        A row deleted while its game is still cached is re-inserted by its next save().
+        """
+        now = now or time.time()
+        cutoff = now - self.idle_ttl
+        expired = []
+        with self.lock:
+            while self.games:
+                game_id, session = next(iter(self.games.items()))
+                if session.last_access > cutoff:
+                    break
+                self.games.popitem(last=False)
+                expired.append((game_id, session))
+        if self.on_expire is not None:
+            for game_id, session in expired:
+                self.on_expire(game_id, session)
+        with self.db_lock:
+            with self.db:
+                cursor = self.db.execute("DELETE FROM games WHERE updated_at <= ?", (cutoff,))
+                self.db.execute("DELETE FROM game_locks WHERE expires < ?", (now,))
+                self.db.execute("DELETE FROM game_watchers WHERE seen <= ?", (cutoff,))
+                # Left behind by a worker that died mid-search
+                self.db.execute("DELETE FROM bot_searches WHERE started <= ?", (cutoff,))
+        self.evicted_ttl += cursor.rowcount
+        return cursor.rowcount
+
+    def flush(self):
+        """Group-commit every pending write in one transaction."""
+        with self.pending_lock:
+            if not self.pending:
+                return 0
+            batch, self.pending = self.pending, {}
+        upserts = [row for row in batch.values() if row is not None]
+        deletes = [(game_id,) for game_id, row in batch.items() if row is None]
+        with self.db_lock:
+            with self.db:
+                if upserts:
+                    self.db.executemany("INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?, ?)", upserts)
+                if deletes:
+                    self.db.executemany("DELETE FROM games WHERE game_id = ?", deletes)
+        self.flushes += 1
+        return len(batch)
+
+    def _write_loop(self):
+        while not self.closed.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        self.closed.set()
+        if self.writer is not None:
+            self.writer.join()
+        self.flush()
+        with self.db_lock:
+            self.db.close()
+
+    def stats(self):
+        stats = super().stats()
+        stats.update({
+            "backend": "sqlite-shared" if self.shared else "sqlite",
+            "cached_games": len(self.games),
+            "active_games": len(self),
+            "loaded_from_disk": self.loaded,
+            "pending_writes": len(self.pending),
+            "flushes": self.flushes,
+            "lock_waits": self.lock_waits,
+        })
+        return stats
+
+
+def create_game_store(session_factory, on_evict=None):
+    """Build the store selected by GAME_STORE."""
+    if os.getenv("GAME_STORE", "memory") == "sqlite":
+        return SQLiteGameStore(os.getenv("GAME_STORE_PATH", "games.db"), session_factory, on_evict=on_evict,
+                               shared=os.getenv("GAME_STORE_SHARED", "0") == "1")
+    return MemoryGameStore(on_evict=on_evict)
@@ -0,0 +1,303 @@
+import json
+import os
+import time
+import uuid
+from bisect import bisect_left
+
+# Minimal Prometheus text-format metrics.
+#
+# Hot-path updates take no locks: a counter or histogram bucket is a plain list slot
+# bumped under the GIL. Two threads racing on the same slot can very occasionally
+# lose an increment, which is an acceptable error for monitoring and keeps an
+# observe() to a bisect plus three additions.
+#
+# Metrics live in each process. With several API workers (uvicorn --workers) a scrape
+# lands on any one of them, so set METRICS_DIR: every worker then writes its values
+# there every METRICS_WRITE_INTERVAL seconds, and /metrics on any worker sums them all
+# (see MultiProcessMetrics). Use a directory that is emptied on deploy, like /tmp.
+
+METRICS_DIR = os.getenv("METRICS_DIR")
+METRICS_WRITE_INTERVAL = float(os.getenv("METRICS_WRITE_INTERVAL", 5))
+
+# Request latency buckets (seconds)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.values = {} # label values tuple -> [count]
+
+    def inc(self, *label_values, amount=1):
+        slot = self.values.get(label_values)
+        if slot is None:
+            slot = self.values.setdefault(label_values, [0])
+        slot[0] += amount
+
+    def snapshot(self):
+        return {"name": self.name, "help": self.help, "type": "counter", "labels": self.labels,
+                "values": [(values, slot[0]) for values, slot in list(self.values.items())]}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for values, slot in list(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {slot[0]}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {} # label values tuple -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, *label_values):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series.setdefault(label_values, [0] * (len(self.buckets) + 2))
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def time(self, *label_values):
+        """Context manager observing the elapsed time of its block."""
+        return _Timer(self, label_values)
+
+    def snapshot(self):
+        return {"name": self.name, "help": self.help, "type": "histogram", "labels": self.labels,
+                "buckets": self.buckets, "values": [(values, series[:]) for values, series in list(self.series.items())]}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ("le",)
+        for values, series in list(self.series.items()):
+            # Buckets are stored per-interval; Prometheus wants them cumulative
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, values + (bound,))} {cumulative}")
+            label_str = _format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{label_str} {series[-1]}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "label_values", "start")
+
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+
+
+class GaugeFunction:
+    """
+    Metric read at scrape time from a callback, so nothing is paid on the hot path.
+    `fn` returns either a number or a list of (label values tuple, number).
+    `aggregate` says how MultiProcessMetrics combines the workers' values of a gauge:
+    "sum" (per-process amounts), "max" (the same shared value seen by each) or "mean".
+    """
+
+    def __init__(self, name, help_text, fn, labels=(), kind="gauge", aggregate="sum"):
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+        self.labels = tuple(labels)
+        self.kind = kind
+        self.aggregate = aggregate
+
+    def read(self):
+        result = self.fn()
+        if not isinstance(result, list):
+            result = [((), result)]
+        return result
+
+    def snapshot(self):
+        return {"name": self.name, "help": self.help, "type": self.kind, "labels": self.labels,
+                "aggregate": self.aggregate, "values": self.read()}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, value in self.read():
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {value}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        # One family per name: registering a name again (e.g. the module imported twice,
+        # as __main__ and by name) replaces the old metric instead of rendering both
+        self.metrics = [m for m in self.metrics if m.name != metric.name]
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self.register(Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help_text, labels, buckets))
+
+    def gauge_function(self, name, help_text, fn, labels=(), kind="gauge", aggregate="sum"):
+        return self.register(GaugeFunction(name, help_text, fn, labels, kind, aggregate))
+
+    def snapshot(self):
+        """Every metric's current values, JSON-ready (see MultiProcessMetrics)."""
+        return [metric.snapshot() for metric in self.metrics]
+
+    def render(self):
+        return render_metrics(self.metrics)
+
+
+def render_metrics(metrics):
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class MultiProcessMetrics:
+    """
+    One registry per worker process, summed at scrape time. Each process keeps its
+    registry's snapshot in its own file in `directory` (write() every `interval`
+    seconds, and before rendering); render() merges every file. Files of workers that
+    have exited stay, so counters and histograms never go backwards; their gauges are
+    left out once the file is older than a few intervals.
+    """
+
+    def __init__(self, registry, directory, interval=METRICS_WRITE_INTERVAL):
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        os.makedirs(directory, exist_ok=True)
+        # Unique per process start: a restarted worker reusing a pid doesn't overwrite
+        self.path = os.path.join(directory, f"metrics-{os.getpid()}-{uuid.uuid4().hex[:8]}.json")
+
+    def write(self):
+        temp = self.path + ".tmp"
+        with open(temp, "w") as f:
+            json.dump(self.registry.snapshot(), f)
+        os.replace(temp, self.path) # Readers never see a half-written file
+
+    def _snapshots(self):
+        """Yields: (snapshot, whether its worker is alive) for every worker's file."""
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+                fresh = now - os.path.getmtime(path) <= 3 * self.interval
+            except (OSError, ValueError):
+                continue # Removed or replaced while we looked
+            yield snapshot, fresh
+
+    def render(self):
+        self.write()
+        merged = {} # name -> (first entry seen, {label values: [value, count]})
+        for snapshot, fresh in self._snapshots():
+            for entry in snapshot:
+                if entry["type"] == "gauge" and not fresh:
+                    continue
+                first, values = merged.setdefault(entry["name"], (entry, {}))
+                if first["type"] != entry["type"]:
+                    continue # Changed between deploys; keep the first kind seen
+                for label_values, value in entry["values"]:
+                    slot = values.setdefault(tuple(label_values), [None, 0])
+                    slot[0] = _combine(first, slot[0], value)
+                    slot[1] += 1
+        # In this process's registration order; metrics only other workers have go last
+        names = [metric.name for metric in self.registry.metrics if metric.name in merged]
+        names += [name for name in merged if name not in names]
+        metrics = []
+        for name in names:
+            entry, values = merged[name]
+            labels = tuple(entry["labels"])
+            if entry["type"] == "histogram":
+                metric = Histogram(name, entry["help"], labels, entry["buckets"])
+                metric.series = {key: value for key, (value, _) in values.items()}
+            else:
+                if entry.get("aggregate") == "mean":
+                    values = {key: (value / count, count) for key, (value, count) in values.items()}
+                result = [(key, value) for key, (value, _) in values.items()]
+                metric = GaugeFunction(name, entry["help"], lambda result=result: result, labels, entry["type"])
+            metrics.append(metric)
+        return render_metrics(metrics)
+
+
+def _combine(entry, total, value):
+    if total is None:
+        return value
+    if entry["type"] == "histogram":
+        return [a + b for a, b in zip(total, value)]
+    if entry.get("aggregate") == "max":
+        return max(total, value)
+    return total + value # sum, and mean (divided by the count at the end)
+
+
+def create_multiprocess_metrics(registry):
+    """MultiProcessMetrics over METRICS_DIR, or None to render the registry as it is."""
+    return MultiProcessMetrics(registry, METRICS_DIR) if METRICS_DIR else None
+
+
+registry = Registry()
+
+# Shared by the API (per-route latency) and the bot pool (search time)
+REQUEST_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", labels=("method", "route"))
+REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests by route and status", labels=("method", "route", "status"))
+BOT_SEARCH_SECONDS = registry.histogram(
+    "bot_search_duration_seconds", "Bot search time (cache misses only)", labels=("engine", "difficulty"),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+BOT_QUEUE_SECONDS = registry.histogram(
+    "bot_queue_wait_seconds", "Time bot searches waited for a worker slot", labels=("tier",),
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and status per route template (not per raw path)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            REQUEST_LATENCY.observe(time.perf_counter() - start, scope["method"], path)
+            REQUESTS.inc(scope["method"], path, status[0])
@@ -0,0 +1,202 @@
+import asyncio
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from game_engine import COLS
+from bot_ai import ENGINE_VERSION
+
+# Process-wide cache of finished bot searches:
+# (engine version, canonical position, side, engine, difficulty) -> (column, score)
+#
+# MOVE_CACHE_SIZE            entries kept in memory (LRU)
+# MOVE_CACHE_PATH            optional SQLite file shared by every worker on the box; memory
+#                            misses fall through to it and new results are written to it
+# MOVE_CACHE_FLUSH_INTERVAL  seconds between group commits of new results to the file
+#
+# The event loop never touches the file: lookup() reads it in a thread, and put()
+# only queues the row for a writer thread that commits everything queued at once,
+# like the SQLite game store. Another worker holding the write lock then delays that
+# thread, not the API's requests.
+#
+# Connect Four is left/right symmetric, so a position and its mirror share one entry
+# (the cached column is mirrored back on the way out). When several moves tie on
+# score, the mirror of a cached move can differ from what a fresh search would pick,
+# but it is always a move with the same score.
+#
+# Keys carry bot_ai.ENGINE_VERSION, so a bot change never gets moves cached by the old
+# one (workers of both versions can share the file during a deploy). Opening the file
+# with a newer version deletes the older versions' rows.
+
+MOVE_CACHE_SIZE = int(os.getenv("MOVE_CACHE_SIZE", 200000))
+MOVE_CACHE_PATH = os.getenv("MOVE_CACHE_PATH")
+MOVE_CACHE_FLUSH_INTERVAL = float(os.getenv("MOVE_CACHE_FLUSH_INTERVAL", 0.5))
+
+
+def mirror_key(key):
+    """Mirror an encode_board() string left-to-right."""
+    return "".join(key[r * COLS:(r + 1) * COLS][::-1] for r in range(len(key) // COLS))
+
+
+def canonical_key(key):
+    """Returns: (canonical board string, whether it is the mirrored one) for an encoded board."""
+    mirrored = mirror_key(key)
+    if mirrored < key:
+        return mirrored, True
+    return key, False
+
+
+class MoveCache:
+    def __init__(self, max_entries=MOVE_CACHE_SIZE, path=MOVE_CACHE_PATH, version=ENGINE_VERSION,
+                 flush_interval=MOVE_CACHE_FLUSH_INTERVAL):
+        self.version = version
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock() # Guards the memory tier
+        self.hits = 0
+        self.file_hits = 0
+        self.misses = 0
+        self.flush_interval = flush_interval
+        self.pending = {} # key -> (column, score) not yet written to the file
+        self.pending_lock = threading.Lock()
+        self.db_lock = threading.Lock() # Guards self.db
+        self.closed = threading.Event()
+        self.writer = None
+
+        self.db = None
+        if path:
+            # It's a cache: trade durability for write speed, a lost entry is just recomputed
+            self.db = sqlite3.connect(path, check_same_thread=False, timeout=1.0)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=OFF")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS moves (key TEXT PRIMARY KEY, col INTEGER NOT NULL, score REAL NOT NULL)"
+            )
+            self.db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            row = self.db.execute("SELECT value FROM meta WHERE name = 'engine_version'").fetchone()
+            if row is None or row[0] < version:
+                # Older entries can never be read again; don't keep them around
+                self.db.execute("DELETE FROM moves WHERE key NOT LIKE ?", (f"v{version}:%",))
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('engine_version', ?)", (version,))
+            self.db.commit()
+            self.writer = threading.Thread(target=self._write_loop, name="move-cache-writer", daemon=True)
+            self.writer.start()
+
+    def _key(self, position, player, engine, difficulty):
+        return f"v{self.version}:{position}:{player}:{engine}:{difficulty}"
+
+    def get(self, position, player, engine, difficulty):
+        """
+        `position` is an encode_board() string. Reads the file on a memory miss, so
+        call it off the event loop; async code uses lookup().
+        Returns: (column, score) for this position, or None on a miss.
+        """
+        key, mirrored = self._lookup_key(position, player, engine, difficulty)
+        hit = self._memory_get(key)
+        if hit is None and self.db is not None:
+            hit = self._file_get(key)
+        return self._result(hit, mirrored)
+
+    async def lookup(self, position, player, engine, difficulty):
+        """get() for the event loop: memory inline, the file in a thread."""
+        key, mirrored = self._lookup_key(position, player, engine, difficulty)
+        hit = self._memory_get(key)
+        if hit is None and self.db is not None:
+            hit = await asyncio.to_thread(self._file_get, key)
+        return self._result(hit, mirrored)
+
+    def _lookup_key(self, position, player, engine, difficulty):
+        position, mirrored = canonical_key(position)
+        return self._key(position, player, engine, difficulty), mirrored
+
+    def _memory_get(self, key):
+        with self.lock:
+            hit = self.entries.get(key)
+            if hit is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+        return hit
+
+    def _result(self, hit, mirrored):
+        if hit is None:
+            with self.lock:
+                self.misses += 1
+            return None
+        col, score = hit
+        return (COLS - 1 - col if mirrored else col), score
+
+    def put(self, position, player, engine, difficulty, column, score):
+        position, mirrored = canonical_key(position)
+        key = self._key(position, player, engine, difficulty)
+        hit = (COLS - 1 - column if mirrored else column, score)
+        self._remember(key, hit)
+        if self.db is not None:
+            with self.pending_lock:
+                self.pending[key] = hit
+
+    def _remember(self, key, hit):
+        with self.lock:
+            self.entries[key] = hit
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def _file_get(self, key):
+        try:
+            with self.db_lock:
+                row = self.db.execute("SELECT col, score FROM moves WHERE key = ?", (key,)).fetchone()
+        except sqlite3.OperationalError:
+            return None # Another worker holds the file; treat as a miss
+        if row is None:
+            return None
+        hit = tuple(row)
+        self._remember(key, hit)
+        with self.lock:
+            self.file_hits += 1
+        return hit
+
+    def flush(self):
+        """Commit every queued result to the file in one transaction."""
+        with self.pending_lock:
+            if not self.pending:
+                return 0
+            batch, self.pending = self.pending, {}
+        try:
+            with self.db_lock:
+                with self.db:
+                    self.db.executemany("INSERT OR REPLACE INTO moves VALUES (?, ?, ?)",
+                                        [(key, col, score) for key, (col, score) in batch.items()])
+        except sqlite3.OperationalError:
+            return 0 # File busy past the timeout: the results are still cached in memory
+        return len(batch)
+
+    def _write_loop(self):
+        while not self.closed.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        self.closed.set()
+        if self.writer is not None:
+            self.writer.join()
+        if self.db is not None:
+            self.flush()
+            with self.db_lock:
+                self.db.close()
+            self.db = None
+
+    def stats(self):
+        lookups = self.hits + self.file_hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "file_hits": self.file_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.file_hits) / lookups, 4) if lookups else 0.0,
+            "shared_file": self.db is not None,
+            "pending_writes": len(self.pending),
+        }
+
+
+move_cache = MoveCache()
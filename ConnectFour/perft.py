@@ -0,0 +1,85 @@
+import argparse
+import sys
+import time
+
+from game_engine import ENGINES
+
+# Perft: count the move sequences (leaf positions) of each length from a position,
+# to check a game backend's move generation and win detection and to time it.
+#
+#   python perft.py --depth 8                        # list engine, from the empty board
+#   python perft.py --depth 9 --engine bitboard --moves 3,3,2 --divide
+#
+# A won game has no moves, so a sequence stops where a game ends and only counts at
+# its own length (like perft in chess). From the empty board the counts are
+# 1, 7, 49, 343, 2401, 16807, 117649, 823536, 5673234, 38040394 ...
+
+# Counts from the empty board, by depth (OEIS A212693)
+KNOWN_COUNTS = (1, 7, 49, 343, 2401, 16807, 117649, 823536, 5673234, 38040394)
+
+
+def perft(game, depth):
+    """Leaf positions `depth` moves from the game's position. Leaves the game as it found it."""
+    if depth == 0:
+        return 1
+    if game.game_over:
+        return 0
+    if depth == 1:
+        return len(game.get_valid_moves())
+    total = 0
+    for column in game.get_valid_moves():
+        game.drop_piece(column)
+        total += perft(game, depth - 1)
+        game.undo_move()
+    return total
+
+
+def divide(game, depth):
+    """Perft split by first move: {column: leaves}"""
+    counts = {}
+    for column in game.get_valid_moves():
+        game.drop_piece(column)
+        counts[column] = perft(game, depth - 1)
+        game.undo_move()
+    return counts
+
+
+def start_position(engine, moves):
+    game = ENGINES[engine]()
+    for column in moves:
+        game.drop_piece(column)
+    return game
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Count Connect Four move sequences to a given depth.")
+    parser.add_argument("--depth", type=int, default=7)
+    parser.add_argument("--engine", choices=sorted(ENGINES), action="append",
+                        help="backend(s) to run (default: list)")
+    parser.add_argument("--moves", default="", help="start position as comma-separated columns, e.g. 3,3,2")
+    parser.add_argument("--divide", action="store_true", help="also print the count after each first move")
+    args = parser.parse_args(argv)
+
+    moves = [int(column) for column in args.moves.split(",") if column.strip()]
+    failed = False
+    for engine in args.engine or ["list"]:
+        game = start_position(engine, moves)
+        print(f"{engine}:")
+        for depth in range(1, args.depth + 1):
+            start = time.perf_counter()
+            count = perft(game, depth)
+            seconds = time.perf_counter() - start
+            note = ""
+            if not moves and depth < len(KNOWN_COUNTS):
+                ok = count == KNOWN_COUNTS[depth]
+                failed |= not ok
+                note = "ok" if ok else f"MISMATCH, expected {KNOWN_COUNTS[depth]}"
+            print(f"  depth {depth:>2} {count:>12} {seconds:>9.3f}s {count / seconds if seconds else 0:>12,.0f} leaves/s  {note}")
+        if args.divide:
+            for column, count in divide(game, args.depth).items():
+                print(f"  {column}: {count}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
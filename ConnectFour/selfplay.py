@@ -0,0 +1,248 @@
+import argparse
+import os
+import random
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from game_engine import BitboardGame, ROWS, COLS, EMPTY, PLAYER1, PLAYER2, _COLUMN_BITS
+from bot_ai import MinimaxAI, EVALUATIONS, BOOK_SCORE
+
+try:
+    import numpy as np
+except ImportError: # Only needed to read a dataset through open_dataset
+    np = None
+
+# Self-play dataset generator: labeled positions for tuning evaluation weights offline.
+#
+#   python selfplay.py --positions 10000000 --depth 4 --workers 8 --output selfplay.c4sp
+#
+# Worker processes play MinimaxAI against itself (a few random opening moves, then
+# the searched move, or with probability --epsilon a random one so games differ). Every
+# searched position (not opening book moves) becomes a record: the position, side to
+# move, search score and best move, and - once the game is over - its result from the
+# side to move's point of view.
+#
+# The file is a 32-byte header followed by fixed-size records, written a batch of games
+# at a time, so it never has to fit in memory. Running again appends to the file. Read
+# it with open_dataset() (a read-only numpy memmap) or iter_records() (no numpy needed).
+
+MAGIC = b"C4SP"
+VERSION = 1
+# magic, version, record size, games numbered so far (ids of the next run start here)
+HEADER = struct.Struct("<4sHHQ16x")
+# player 1 bits, player 2 bits (BitboardGame layout), game id, score, side to move,
+# ply, best move, result (+1 side to move won, 0 draw, -1 lost), search depth
+RECORD = struct.Struct("<QQIiBBbbB3x")
+
+if np is not None:
+    RECORD_DTYPE = np.dtype([
+        ("player1", "<u8"), ("player2", "<u8"), ("game", "<u4"), ("score", "<i4"), ("side", "u1"),
+        ("ply", "u1"), ("best_move", "i1"), ("result", "i1"), ("depth", "u1"), ("_pad", "V3"),
+    ])
+    assert RECORD_DTYPE.itemsize == RECORD.size
+
+
+def play_game(game_id, seed, depth, evaluation, random_plies, epsilon):
+    """One self-play game. Returns its records, packed."""
+    rng = random.Random((seed << 32) + game_id)
+    game = BitboardGame()
+    for _ in range(random_plies):
+        game.drop_piece(rng.choice(game.get_valid_moves()))
+        if game.game_over:
+            return b"" # Decided during the random opening: nothing was searched
+    bots = {player: MinimaxAI(player, depth=depth, evaluation=evaluation) for player in (PLAYER1, PLAYER2)}
+    labeled = []
+    while not game.game_over:
+        player = game.current_player
+        valid = game.get_valid_moves()
+        best, score = bots[player].get_best_move(game.board, valid)
+        if score != BOOK_SCORE: # Book moves weren't searched, so they have no score to learn from
+            labeled.append((game.bits[PLAYER1], game.bits[PLAYER2], player, len(game.moves), best, score))
+        game.drop_piece(rng.choice(valid) if rng.random() < epsilon else best)
+    records = []
+    for player1, player2, side, ply, best, score in labeled:
+        result = 0 if game.winner == "draw" else 1 if game.winner == side else -1
+        score = max(-2 ** 31, min(2 ** 31 - 1, int(score)))
+        records.append(RECORD.pack(player1, player2, game_id, score, side, ply, best, result, depth))
+    return b"".join(records)
+
+
+def play_batch(game_ids, seed, depth, evaluation, random_plies, epsilon):
+    """Packed records of games `game_ids`"""
+    return b"".join(play_game(game_id, seed, depth, evaluation, random_plies, epsilon) for game_id in game_ids)
+
+
+class DatasetWriter:
+    """Appends records to a dataset file, creating it (with its header) if needed."""
+
+    def __init__(self, path):
+        self.path = path
+        exists = os.path.exists(path) and os.path.getsize(path) >= HEADER.size
+        self.file = open(path, "r+b" if exists else "w+b")
+        if exists:
+            magic, version, record_size, self.games = HEADER.unpack(self.file.read(HEADER.size))
+            if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+                self.file.close()
+                raise ValueError(f"{path} is not a version {VERSION} self-play dataset")
+            size = os.path.getsize(path)
+            # An interrupted write can leave part of a record at the end
+            self.file.truncate(size - (size - HEADER.size) % RECORD.size)
+        else:
+            self.games = 0
+            self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, 0))
+        self.file.seek(0, os.SEEK_END)
+        self.records = (self.file.tell() - HEADER.size) // RECORD.size
+
+    def next_game_ids(self, count):
+        ids = range(self.games, self.games + count)
+        self.games += count
+        return ids
+
+    def write(self, data):
+        self.file.write(data)
+        self.records += len(data) // RECORD.size
+        # Record how far game ids got, so an appending run doesn't reuse them
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, self.games))
+        self.file.seek(0, os.SEEK_END)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def generate(path, positions, depth=4, evaluation="v2", random_plies=4, epsilon=0.1, workers=None,
+             seed=None, batch_games=20, progress=None):
+    """Append about `positions` labeled positions to the dataset at `path`. Returns the writer's record count."""
+    seed = seed if seed is not None else random.randrange(2 ** 31)
+    writer = DatasetWriter(path)
+    target = writer.records + positions
+    args = (seed, depth, evaluation, random_plies, epsilon)
+    try:
+        if workers == 0:
+            while writer.records < target:
+                data = play_batch(writer.next_game_ids(batch_games), *args)
+                writer.write(data)
+                if progress:
+                    progress(writer.records)
+            return writer.records
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Keep a couple of batches per worker in flight; results go to disk as they come
+            in_flight = (workers or os.cpu_count() or 1) * 2
+            pending = {executor.submit(play_batch, writer.next_game_ids(batch_games), *args)
+                       for _ in range(in_flight)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    data = future.result()
+                    writer.write(data)
+                    if progress:
+                        progress(writer.records)
+                    if writer.records < target:
+                        pending.add(executor.submit(play_batch, writer.next_game_ids(batch_games), *args))
+                if writer.records >= target:
+                    for future in pending:
+                        future.cancel()
+                    pending = {future for future in pending if not future.cancelled()}
+        return writer.records
+    finally:
+        writer.close()
+
+
+def dataset_length(path):
+    return (os.path.getsize(path) - HEADER.size) // RECORD.size
+
+
+def check_header(path):
+    with open(path, "rb") as f:
+        magic, version, record_size, _ = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+        raise ValueError(f"{path} is not a version {VERSION} self-play dataset")
+
+
+def open_dataset(path):
+    """The dataset's records as a read-only numpy memmap with RECORD_DTYPE fields."""
+    if np is None:
+        raise RuntimeError("open_dataset needs numpy; iter_records reads the file without it")
+    check_header(path)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER.size, shape=(dataset_length(path),))
+
+
+def iter_records(path, chunk_records=65536):
+    """Stream records as dicts, a chunk at a time."""
+    check_header(path)
+    with open(path, "rb") as f:
+        f.seek(HEADER.size)
+        while True:
+            chunk = f.read(chunk_records * RECORD.size)
+            chunk = chunk[:len(chunk) - len(chunk) % RECORD.size]
+            if not chunk:
+                return
+            for player1, player2, game, score, side, ply, best, result, depth in RECORD.iter_unpack(chunk):
+                yield {"player1": player1, "player2": player2, "game": game, "score": score, "side": side,
+                       "ply": ply, "best_move": best, "result": result, "depth": depth}
+
+
+def decode_board(player1, player2):
+    """Bitboards of a record -> 6x7 board (top row first), as the engine and evaluations use."""
+    board = [[EMPTY] * COLS for _ in range(ROWS)]
+    for column in range(COLS):
+        for height in range(ROWS):
+            bit = 1 << (column * _COLUMN_BITS + height)
+            if player1 & bit:
+                board[ROWS - 1 - height][column] = PLAYER1
+            elif player2 & bit:
+                board[ROWS - 1 - height][column] = PLAYER2
+    return board
+
+
+def decode_boards(records):
+    """numpy: boards of a slice of records as an (n, 6, 7) int8 array (top row first)."""
+    shifts = np.array([[column * _COLUMN_BITS + (ROWS - 1 - row) for column in range(COLS)]
+                       for row in range(ROWS)], dtype=np.uint64)
+    player1 = (records["player1"][:, None, None] >> shifts) & np.uint64(1)
+    player2 = (records["player2"][:, None, None] >> shifts) & np.uint64(1)
+    return (player1 * PLAYER1 + player2 * PLAYER2).astype(np.int8)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a self-play dataset of labeled Connect Four positions.")
+    parser.add_argument("--positions", type=int, default=100000, help="positions to add")
+    parser.add_argument("--output", default="selfplay.c4sp")
+    parser.add_argument("--depth", type=int, default=4, help="search depth of the labels")
+    parser.add_argument("--evaluation", choices=sorted(EVALUATIONS), default="v2")
+    parser.add_argument("--random-plies", type=int, default=4, help="random opening moves (not recorded)")
+    parser.add_argument("--epsilon", type=float, default=0.1, help="chance of a random move instead of the best")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes; 0 = in-process")
+    parser.add_argument("--batch-games", type=int, default=20, help="games per worker task")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    before = dataset_length(args.output) if os.path.exists(args.output) else 0
+    step = max(args.positions // 20, 1)
+    last = [before]
+
+    def progress(records):
+        if records - last[0] >= step:
+            last[0] = records
+            rate = (records - before) / (time.time() - start)
+            print(f"  {records} positions ({rate:,.0f}/s)", flush=True)
+
+    try:
+        total = generate(args.output, args.positions, args.depth, args.evaluation, args.random_plies, args.epsilon,
+                         args.workers, args.seed, args.batch_games, progress)
+    except ValueError as e:
+        sys.exit(str(e))
+    except KeyboardInterrupt:
+        sys.exit(f"\nInterrupted; {args.output} holds every batch finished so far")
+    print(f"{total - before} positions added, {total} in {args.output} "
+          f"({os.path.getsize(args.output) / 1e6:.1f} MB, {time.time() - start:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import math
+import random
+import threading
+from collections import OrderedDict
+
+from game_engine import PLAYER1, PLAYER2, COLS, encode_board
+from bot_ai import MinimaxAI, DIFFICULTY_EASY, DIFFICULTY_MEDIUM, DIFFICULTY_HARD
+
+# Shared-analysis difficulty tiers:
+# A full-window search scores every valid move of a position, the scores are cached by
+# position, and the tiers sample a move from them instead of searching themselves.
+# An easy bot on a cached position costs a dict lookup plus a softmax over 7 numbers.
+#
+# Cost: scoring all moves with a full window is several times a normal alpha-beta
+# search of the same depth, since the root can't cut off. So a miss is scored only as
+# deep as the tier needs (its own minimax depth), and an entry serves any tier at or
+# below its depth. An easy miss costs a depth-2 analysis (milliseconds) instead of the
+# hard one (most of a second); cold positions are the common case, since games
+# quickly leave the cached openings. Post-game analysis asks for ANALYSIS_DIFFICULTY
+# and deepens entries the bots left shallow.
+
+ANALYSIS_DIFFICULTY = 'hard'
+ANALYSIS_CACHE_SIZE = 50000
+
+# depth: search depth of the analysis this tier samples from
+# temperature: softmax temperature over move scores (0 = always the best move)
+# blunder_rate: chance of ignoring the analysis and playing a uniformly random move
+# (Against evaluation_v2, where an open three is worth 200, easy's 400 is close to
+# uniform among moves that don't lose outright - on purpose.)
+TIER_PROFILES = {
+    'easy': {'depth': DIFFICULTY_EASY, 'temperature': 400.0, 'blunder_rate': 0.25},
+    'medium': {'depth': DIFFICULTY_MEDIUM, 'temperature': 60.0, 'blunder_rate': 0.05},
+    'hard': {'depth': DIFFICULTY_HARD, 'temperature': 0.0, 'blunder_rate': 0.0},
+    'vip': {'depth': DIFFICULTY_HARD, 'temperature': 0.0, 'blunder_rate': 0.0},
+}
+
+
+class AnalysisCache:
+    """LRU cache of position -> (depth, {column: score}), filled by one analyst per side."""
+
+    def __init__(self, max_entries=ANALYSIS_CACHE_SIZE, difficulty=ANALYSIS_DIFFICULTY):
+        self.max_entries = max_entries
+        self.analysts = {
+            PLAYER1: MinimaxAI(PLAYER1, difficulty),
+            PLAYER2: MinimaxAI(PLAYER2, difficulty),
+        }
+        self.depth = self.analysts[PLAYER1].depth # Default depth of an analysis
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def analyze(self, board, piece, valid_moves, cancel_token=None, depth=None):
+        """
+        Return {column: score} for `piece` to move, at least `depth` deep (default: the
+        analysis depth), searching only on a cache miss.
+        """
+        depth = depth or self.depth
+        scores = self.get(board, piece, depth)
+        if scores is not None:
+            return scores
+
+        # Search outside the lock; two threads racing on the same position just
+        # both compute it, which is cheaper than serializing every miss.
+        scores = self.analysts[piece].score_moves(board, valid_moves, cancel_token, depth)
+        self.put(board, piece, scores, depth)
+        return scores
+
+    def get(self, board, piece, depth=None):
+        """Cached {column: score} searched at least `depth` deep, or None (counted as a miss)."""
+        key = (encode_board(board), piece)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] >= (depth or self.depth):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        return None
+
+    def put(self, board, piece, scores, depth=None):
+        key = (encode_board(board), piece)
+        depth = depth or self.depth
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= depth: # Never replace a deeper analysis
+                self.entries[key] = (depth, scores)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Process-wide cache shared by every TieredBot
+shared_cache = AnalysisCache()
+
+
+class TieredBot:
+    """
+    Drop-in replacement for MinimaxAI that picks its move from the shared analysis
+    using the tier's temperature / blunder-rate profile.
+    """
+
+    def __init__(self, player_piece, difficulty='medium', cache=None, rng=None):
+        self.player_piece = player_piece
+        self.opponent_piece = PLAYER1 if player_piece == PLAYER2 else PLAYER2
+        self.difficulty = difficulty if difficulty in TIER_PROFILES else 'medium'
+        self.profile = TIER_PROFILES[self.difficulty]
+        self.cache = cache or shared_cache
+        self.rng = rng or random.Random()
+
+    def get_best_move(self, board, valid_moves, cancel_token=None):
+        """
+        Returns: (column, score) where score is the analysis score of the chosen move.
+        """
+        scores = self.cache.analyze(board, self.player_piece, valid_moves, cancel_token, self.profile['depth'])
+        return self.pick(scores, valid_moves)
+
+    def pick(self, scores, valid_moves):
+        """Sample a move from a position's analysis ({column: score}). Returns: (column, score)"""
+        if self.rng.random() < self.profile['blunder_rate']:
+            col = self.rng.choice(valid_moves)
+            return col, scores[col]
+
+        temperature = self.profile['temperature']
+        best_score = max(scores[col] for col in valid_moves)
+        if temperature <= 0:
+            # Ties go to the most central column, same as the minimax move ordering
+            best = [col for col in valid_moves if scores[col] == best_score]
+            col = min(best, key=lambda c: abs(c - COLS // 2))
+            return col, best_score
+
+        # Softmax relative to the best score so win/loss scores don't overflow
+        weights = [math.exp((scores[col] - best_score) / temperature) for col in valid_moves]
+        col = self.rng.choices(valid_moves, weights=weights)[0]
+        return col, scores[col]
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import os
+import threading
+
+# Fan-out of live game events to spectators (WebSocket and SSE).
+#
+# Each event is serialized once, when it is published, and the same text is queued for
+# every subscriber of the game. Subscriber queues are bounded: a viewer whose queue
+# fills up (slow network, stalled tab) is dropped - told so, and disconnected - rather
+# than buffering without limit or holding up everyone else.
+#
+# SPECTATOR_BUFFER         events a subscriber may have queued before it is dropped
+# SPECTATOR_POLL_INTERVAL  seconds between store reads of a watched game when the game
+#                          store is shared by several workers (one reader per game, not per viewer)
+
+SPECTATOR_BUFFER = int(os.getenv("SPECTATOR_BUFFER", 64))
+SPECTATOR_POLL_INTERVAL = float(os.getenv("SPECTATOR_POLL_INTERVAL", 0.5))
+
+
+class Event:
+    """One serialized event. The SSE framing is built on first use, then shared too."""
+    __slots__ = ("kind", "seq", "json", "_sse")
+
+    def __init__(self, kind, payload, seq=None):
+        self.kind = kind
+        self.seq = seq
+        self.json = json.dumps(dict(payload, type=kind))
+        self._sse = None
+
+    @property
+    def sse(self):
+        if self._sse is None:
+            self._sse = f"event: {self.kind}\ndata: {self.json}\n\n"
+        return self._sse
+
+
+class Subscriber:
+    """One viewer's queue of Events. get() returns None once the stream has ended."""
+    __slots__ = ("queue", "buffer", "closed", "dropped")
+
+    def __init__(self, buffer):
+        self.queue = asyncio.Queue()
+        self.buffer = buffer
+        self.closed = False
+        self.dropped = False
+
+    async def get(self):
+        return await self.queue.get()
+
+    def offer(self, event):
+        """Queue an event. Returns False if that dropped the subscriber for being too far behind."""
+        if self.closed:
+            return True
+        if self.queue.qsize() >= self.buffer:
+            while not self.queue.empty(): # Nothing queued is worth sending any more
+                self.queue.get_nowait()
+            self.queue.put_nowait(Event("dropped", {"detail": "Spectator fell too far behind"}))
+            self.dropped = True
+            self.close()
+            return False
+        self.queue.put_nowait(event)
+        return True
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.queue.put_nowait(None)
+
+
+class Channel:
+    """Subscribers of one game, plus the sequence number (ply) of the last event sent."""
+    __slots__ = ("subscribers", "seq")
+
+    def __init__(self):
+        self.subscribers = set()
+        self.seq = 0
+
+
+class SpectatorHub:
+    """
+    Spectator channels by game id. Subscribing happens on the event loop; publish() and
+    close() may be called from any thread and are handed over to the loop.
+    """
+
+    def __init__(self, buffer=SPECTATOR_BUFFER):
+        self.buffer = buffer
+        self.channels = {}
+        self.loop = None
+        self.lock = threading.Lock()
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, game_id):
+        """
+        Join a game's channel (on the event loop). Subscribe before reading the game's
+        snapshot so no event is missed, then skip events whose seq the snapshot already
+        covers. Returns: (Subscriber, whether the channel is new)
+        """
+        self.loop = asyncio.get_running_loop()
+        subscriber = Subscriber(self.buffer)
+        with self.lock:
+            channel = self.channels.get(game_id)
+            created = channel is None
+            if created:
+                channel = self.channels[game_id] = Channel()
+            channel.subscribers.add(subscriber)
+        return subscriber, created
+
+    def unsubscribe(self, game_id, subscriber):
+        with self.lock:
+            channel = self.channels.get(game_id)
+            if channel is not None:
+                channel.subscribers.discard(subscriber)
+                if not channel.subscribers:
+                    del self.channels[game_id]
+
+    def watching(self, game_id):
+        return game_id in self.channels
+
+    def publish(self, game_id, kind, payload, seq=None):
+        """
+        Send an event to a game's spectators. With `seq` (the ply), events at or before
+        the last one sent are skipped, so a move reported twice goes out once.
+        """
+        if game_id not in self.channels: # Most games have no spectators: don't serialize anything
+            return
+        self._call(self._deliver, game_id, Event(kind, payload, seq), seq, False)
+
+    def close(self, game_id, kind=None, payload=None):
+        """End a game's streams, after an optional last event."""
+        if game_id not in self.channels:
+            return
+        self._call(self._deliver, game_id, Event(kind, payload or {}) if kind else None, None, True)
+
+    def _call(self, fn, *args):
+        loop = self.loop
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            fn(*args)
+            return
+        try:
+            loop.call_soon_threadsafe(fn, *args)
+        except RuntimeError:
+            pass # The loop is gone (shutdown), and its subscribers with it
+
+    def _deliver(self, game_id, event, seq, end):
+        with self.lock:
+            channel = self.channels.get(game_id)
+            if channel is None:
+                return
+            if seq is not None:
+                if seq <= channel.seq:
+                    return
+                channel.seq = seq
+            subscribers = list(channel.subscribers)
+            if end:
+                del self.channels[game_id]
+        if event is not None:
+            self.published += 1
+            self.delivered += len(subscribers)
+            for subscriber in subscribers:
+                if not subscriber.offer(event):
+                    self.dropped += 1
+        if end:
+            for subscriber in subscribers:
+                subscriber.close()
+
+    def stats(self):
+        with self.lock:
+            subscribers = sum(len(channel.subscribers) for channel in self.channels.values())
+            games = len(self.channels)
+        return {
+            "games": games,
+            "subscribers": subscribers,
+            "events_published": self.published,
+            "events_delivered": self.delivered,
+            "dropped": self.dropped,
+            "buffer": self.buffer,
+        }
+
+
+spectators = SpectatorHub()
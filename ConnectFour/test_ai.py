@@ -1,7 +1,16 @@
 
 import unittest
 from game_engine import ConnectFourGame, PLAYER1, PLAYER2, ROWS, COLS, EMPTY
-from bot_ai import MinimaxAI
+from bot_ai import MinimaxAI, CancelToken, SearchCancelled
+from shared_analysis import AnalysisCache, TieredBot
+from bot_worker import BotPool
+from move_cache import MoveCache
+from game_engine import encode_board
+import asyncio
+import os
+import unittest.mock
+import random
+import tempfile
 import time
 
 class TestConnectFourAI(unittest.TestCase):
@@ -61,5 +70,223 @@ class TestConnectFourAI(unittest.TestCase):
         best_col, score = self.ai.get_best_move(self.game.board, self.game.get_valid_moves())
         self.assertEqual(best_col, 3)
 
+    def test_cancelled_search_returns_partial_move(self):
+        """A pre-cancelled token stops the search but still offers a playable move."""
+        self.game.drop_piece(0)
+        token = CancelToken()
+        token.cancel("timeout")
+        with self.assertRaises(SearchCancelled) as ctx:
+            self.ai.get_best_move(self.game.board, self.game.get_valid_moves(), token)
+        self.assertEqual(ctx.exception.reason, "timeout")
+        self.assertIn(ctx.exception.column, self.game.get_valid_moves())
+
+    def test_uncancelled_token_does_not_change_result(self):
+        self.game.drop_piece(0)
+        plain = self.ai.get_best_move(self.game.board, self.game.get_valid_moves())
+        tokened = self.ai.get_best_move(self.game.board, self.game.get_valid_moves(), CancelToken())
+        self.assertEqual(plain, tokened)
+
+    def test_iterative_search_reports_every_depth(self):
+        for m in [3, 3, 2]:
+            self.game.drop_piece(m)
+        iterations = []
+        result = self.ai.iterative_search(self.game.board, self.game.get_valid_moves(),
+                                          on_iteration=lambda *it: iterations.append(it))
+        self.assertEqual([depth for depth, _, _ in iterations], list(range(1, self.ai.depth + 1)))
+        self.assertEqual(result, iterations[-1][1:])
+        # Same depth, same score as the one-shot search (ties may pick another column)
+        self.assertEqual(result[1], self.ai.get_best_move(self.game.board, self.game.get_valid_moves())[1])
+
+    def test_cancelled_iterative_search_returns_last_completed_depth(self):
+        self.game.drop_piece(0)
+        token = CancelToken()
+        iterations = []
+        def on_iteration(depth, col, score):
+            iterations.append((col, score))
+            if depth == 2:
+                token.cancel("accepted")
+        with self.assertRaises(SearchCancelled) as ctx:
+            self.ai.iterative_search(self.game.board, self.game.get_valid_moves(), token, on_iteration)
+        self.assertEqual(len(iterations), 2)
+        self.assertEqual((ctx.exception.column, ctx.exception.score), iterations[-1])
+
+    def test_time_budget_stops_deepening_in_time(self):
+        self.game.drop_piece(3)
+        bot = MinimaxAI(PLAYER2, depth=42, time_budget=0.2)
+        start = time.time()
+        col, _ = bot.get_best_move(self.game.board, self.game.get_valid_moves())
+        self.assertLess(time.time() - start, 1.0)
+        self.assertIn(col, self.game.get_valid_moves())
+
+    def test_evaluation_can_be_chosen(self):
+        from evaluation import score_position
+        bot = MinimaxAI(PLAYER2, depth=2, evaluation='v1')
+        self.assertIs(bot.evaluate, score_position)
+        self.assertEqual(bot.depth, 2)
+        with self.assertRaises(KeyError):
+            MinimaxAI(PLAYER2, evaluation='v3')
+
+class TestSharedAnalysis(unittest.TestCase):
+    def setUp(self):
+        self.cache = AnalysisCache(max_entries=8, difficulty='medium')
+        self.game = ConnectFourGame()
+
+    def test_analysis_is_cached_by_position(self):
+        """A weaker tier on an already analyzed position should hit the cache instead of searching."""
+        for m in [3, 3, 2]:
+            self.game.drop_piece(m)
+        easy = TieredBot(PLAYER2, 'easy', cache=self.cache, rng=random.Random(1))
+        medium = TieredBot(PLAYER2, 'medium', cache=self.cache, rng=random.Random(1))
+        medium.get_best_move(self.game.board, self.game.get_valid_moves())
+        easy.get_best_move(self.game.board, self.game.get_valid_moves())
+        self.assertEqual(self.cache.misses, 1)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_misses_are_scored_at_the_tier_depth(self):
+        for m in [3, 3, 2]:
+            self.game.drop_piece(m)
+        valid = self.game.get_valid_moves()
+        easy = TieredBot(PLAYER2, 'easy', cache=self.cache, rng=random.Random(1))
+        easy.get_best_move(self.game.board, valid)
+        self.assertEqual(self.cache.get(self.game.board, PLAYER2, 2),
+                         MinimaxAI(PLAYER2, 'easy').score_moves(self.game.board, valid))
+        # Too shallow for medium: analyzed again, deeper, and the deeper entry is kept
+        self.assertIsNone(self.cache.get(self.game.board, PLAYER2, 4))
+        medium = self.cache.analyze(self.game.board, PLAYER2, valid, depth=4)
+        self.cache.put(self.game.board, PLAYER2, {col: 0 for col in valid}, 2)
+        self.assertEqual(self.cache.get(self.game.board, PLAYER2, 2), medium)
+
+    def test_hard_tier_matches_best_analysis_move(self):
+        """Hard tier has no temperature, so it must still block a vertical win."""
+        for m in [0, 1, 0, 1, 0]:
+            self.game.drop_piece(m)
+        bot = TieredBot(PLAYER2, 'hard', cache=self.cache)
+        best_col, _ = bot.get_best_move(self.game.board, self.game.get_valid_moves())
+        self.assertEqual(best_col, 0)
+
+    def test_cache_is_bounded(self):
+        bot = TieredBot(PLAYER1, 'medium', cache=self.cache, rng=random.Random(2))
+        for col in range(COLS):
+            game = ConnectFourGame()
+            game.drop_piece(col)
+            game.drop_piece((col + 1) % COLS)
+            bot.get_best_move(game.board, game.get_valid_moves())
+        game = ConnectFourGame()
+        for m in [0, 1, 2, 3]:
+            game.drop_piece(m)
+            bot.get_best_move(game.board, game.get_valid_moves())
+        self.assertLessEqual(len(self.cache.entries), 8)
+
+class TestBotPool(unittest.TestCase):
+    def setUp(self):
+        # Thread mode keeps the test in-process; the job path is the same as with processes
+        self.pool = BotPool(workers=0)
+        self.game = ConnectFourGame()
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_pool_search_matches_direct_search(self):
+        for m in [0, 1, 0, 1, 0]:
+            self.game.drop_piece(m)
+        direct = MinimaxAI(PLAYER2, 'medium').get_best_move(self.game.board, self.game.get_valid_moves())
+        pooled = asyncio.run(self.pool.search(self.game.board, PLAYER2, 'medium'))
+        self.assertEqual(pooled, direct)
+
+    def test_pool_search_cancel_raises_with_partial_move(self):
+        self.game.drop_piece(0)
+        token = CancelToken()
+        token.cancel("deleted")
+        with self.assertRaises(SearchCancelled) as ctx:
+            asyncio.run(self.pool.search(self.game.board, PLAYER2, 'hard', cancel_token=token))
+        self.assertEqual(ctx.exception.reason, "deleted")
+        self.assertIn(ctx.exception.column, range(COLS))
+
+    def test_pool_search_reports_progress(self):
+        for m in [3, 3, 2]:
+            self.game.drop_piece(m)
+        progress = []
+        column, score = asyncio.run(self.pool.search(
+            self.game.board, PLAYER2, 'medium', cancel_token=CancelToken(),
+            on_progress=lambda *p: progress.append(p)))
+        self.assertEqual([depth for depth, _, _ in progress], [1, 2, 3, 4]) # Every depth, in order
+        self.assertEqual(progress[-1], (4, column, score))
+        self.assertTrue(all(type(value) is int for _, _, value in progress))
+
+    def test_pool_analyze_scores_every_move_once(self):
+        # A late position keeps the hard-depth analysis quick
+        for m in [0, 1, 2, 3, 4, 5, 6] * 2 + [1, 0, 3, 2, 5, 4, 6] * 2:
+            self.game.drop_piece(m)
+        cache = AnalysisCache()
+        with unittest.mock.patch("bot_worker.shared_cache", cache):
+            scores = asyncio.run(self.pool.analyze(self.game.board, PLAYER1))
+            again = asyncio.run(self.pool.analyze(self.game.board, PLAYER1))
+        direct = MinimaxAI(PLAYER1, 'hard').score_moves(self.game.board, self.game.get_valid_moves())
+        self.assertEqual(scores, direct)
+        self.assertIs(again, scores)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_shared_search_on_cached_position_skips_the_pool(self):
+        self.game.drop_piece(3)
+        cache = AnalysisCache()
+        scores = {col: 0 for col in range(COLS)}
+        scores[2] = 500
+        cache.put(self.game.board, PLAYER2, scores)
+        with unittest.mock.patch("bot_worker.shared_cache", cache):
+            column, score = asyncio.run(self.pool.search(self.game.board, PLAYER2, 'hard', engine="shared"))
+        self.assertEqual((column, score), (2, 500))
+        self.assertIsNone(self.pool.executor) # No worker was needed
+        self.assertEqual(self.pool.scheduler.stats()["tiers"]["free_tier"]["queued"], 0)
+
+class TestMoveCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = MoveCache(max_entries=4)
+        self.game = ConnectFourGame()
+
+    def test_miss_then_hit(self):
+        self.game.drop_piece(1)
+        position = encode_board(self.game.board)
+        self.assertIsNone(self.cache.get(position, PLAYER2, "minimax", "medium"))
+        self.cache.put(position, PLAYER2, "minimax", "medium", 2, 15)
+        self.assertEqual(self.cache.get(position, PLAYER2, "minimax", "medium"), (2, 15))
+        self.assertIsNone(self.cache.get(position, PLAYER2, "minimax", "hard"))
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_mirrored_position_shares_entry(self):
+        """A move cached for a position is mirrored back for its mirror image."""
+        self.game.drop_piece(1)
+        mirror = ConnectFourGame()
+        mirror.drop_piece(5)
+        self.cache.put(encode_board(self.game.board), PLAYER2, "minimax", "medium", 2, 15)
+        self.assertEqual(self.cache.get(encode_board(mirror.board), PLAYER2, "minimax", "medium"), (4, 15))
+
+    def test_shared_file_between_workers(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "moves.db")
+            worker_a = MoveCache(path=path, flush_interval=60)
+            worker_b = MoveCache(path=path, flush_interval=60)
+            position = encode_board(self.game.board)
+            worker_a.put(position, PLAYER1, "minimax", "hard", 3, 7)
+            # Write-behind: the row reaches the file with the next flush
+            self.assertIsNone(asyncio.run(worker_b.lookup(position, PLAYER1, "minimax", "hard")))
+            self.assertEqual(worker_a.flush(), 1)
+            self.assertEqual(asyncio.run(worker_b.lookup(position, PLAYER1, "minimax", "hard")), (3, 7))
+            self.assertEqual(worker_b.get(position, PLAYER1, "minimax", "hard"), (3, 7)) # Now in memory
+            self.assertEqual(worker_b.stats()["file_hits"], 1)
+            worker_a.close()
+            worker_b.close()
+
+    def test_engine_version_change_invalidates_the_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "moves.db")
+            old = MoveCache(path=path, version=1)
+            position = encode_board(self.game.board)
+            old.put(position, PLAYER1, "minimax", "hard", 3, 7)
+            old.close() # Flushes
+            new = MoveCache(path=path, version=2)
+            self.assertIsNone(new.get(position, PLAYER1, "minimax", "hard"))
+            self.assertEqual(new.db.execute("SELECT COUNT(*) FROM moves").fetchone()[0], 0)
+            new.close()
+
 if __name__ == '__main__':
     unittest.main()
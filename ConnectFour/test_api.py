@@ -1,9 +1,14 @@
 
 import requests
+import json
+import os
 import time
 import sys
 
 BASE_URL = "http://localhost:8001/api"
+WS_URL = "ws://localhost:8001/api"
+# Key the server grants the pro tier (or higher) through TIER_API_KEYS, for the Pro checks
+API_KEY = os.getenv("CONNECT4_API_KEY")
 
 def test_health():
     try:
@@ -60,10 +65,118 @@ def test_game_flow():
     else:
         print("❌ Game State Verification: FAILED")
 
-    print("\nAPI Integration Tests Complete.")
+def test_turn_endpoint():
+    r = requests.post(f"{BASE_URL}/games/new", json={"player1_type": "human", "player2_type": "bot", "difficulty": "easy"})
+    game_id = r.json()['game_id']
+    r = requests.post(f"{BASE_URL}/games/{game_id}/turn", json={"column": 3, "player": 1})
+    if r.status_code == 200 and r.json()['bot_move'] and r.json()['current_player'] == 1:
+        print(f"✅ Combined Turn (Bot Col {r.json()['bot_move']['column']}): PASSED")
+    else:
+        print(f"❌ Combined Turn Failed: {r.text}")
+
+def test_compact_format():
+    r = requests.post(f"{BASE_URL}/games/new?format=compact", json={"player1_type": "human", "player2_type": "bot", "difficulty": "easy"})
+    game_id = r.json()['game_id']
+    requests.post(f"{BASE_URL}/games/{game_id}/move?format=moves", json={"column": 3, "player": 1})
+    compact = requests.get(f"{BASE_URL}/games/{game_id}/state?format=compact").json()
+    full = requests.get(f"{BASE_URL}/games/{game_id}/state").json()
+    expected = "".join(str(cell) for row in full['board'] for cell in row)
+    if compact['board'] == expected and compact['move_history'] == [3]:
+        print("✅ Compact Board Format: PASSED")
+    else:
+        print(f"❌ Compact Board Format Failed: {compact}")
+
+def test_bot_move_stream():
+    r = requests.post(f"{BASE_URL}/games/new", json={"player1_type": "human", "player2_type": "bot", "difficulty": "hard"})
+    game_id = r.json()['game_id']
+    requests.post(f"{BASE_URL}/games/{game_id}/move", json={"column": 0, "player": 1})
+    events = []
+    with requests.get(f"{BASE_URL}/games/{game_id}/bot-move/stream", stream=True) as r:
+        for line in r.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                events.append(line[len("event: "):])
+    if events and events[-1] == "move" and "progress" in events:
+        print(f"✅ Bot Move Stream ({events.count('progress')} progress events): PASSED")
+    else:
+        print(f"❌ Bot Move Stream Failed: {events}")
+
+def test_batch_endpoints():
+    games = [{"player1_type": "bot", "player2_type": "human", "difficulty": "easy"}] * 10
+    r = requests.post(f"{BASE_URL}/games/batch", json={"games": games, "play_bot_openings": True})
+    created = r.json()['games'] if r.status_code == 200 else []
+    if len(created) == 10 and all(g['current_player'] == 2 for g in created):
+        print("✅ Batch Game Creation (10 games): PASSED")
+    else:
+        print(f"❌ Batch Game Creation Failed: {r.text}")
+
+    positions = [{"moves": [3, 3]}, {"moves": [0, 1, 0, 1, 0]}, {"moves": [0, 1, 0, 1, 0, 1, 0]}]
+    r = requests.post(f"{BASE_URL}/positions/evaluate", json={"positions": positions})
+    results = r.json()['results'] if r.status_code == 200 else []
+    if len(results) == 3 and results[1]['column'] == 0 and results[2]['error']:
+        print("✅ Batch Position Evaluation: PASSED")
+    else:
+        print(f"❌ Batch Position Evaluation Failed: {r.text}")
+
+def test_game_analysis():
+    r = requests.post(f"{BASE_URL}/games/new", json={"player1_type": "human", "player2_type": "human"})
+    free_game = r.json()['game_id']
+    if not API_KEY:
+        print("⏭️  Game Analysis: SKIPPED (set CONNECT4_API_KEY to a pro key)")
+        return
+    claimed = requests.post(f"{BASE_URL}/games/new", json={"player1_type": "human", "player2_type": "human", "tier": "pro"})
+    r = requests.post(f"{BASE_URL}/games/new", json={"player1_type": "human", "player2_type": "human", "tier": "pro"},
+                      headers={"X-API-Key": API_KEY})
+    game_id = r.json()['game_id']
+    for i, col in enumerate([3, 4, 3, 4, 3, 0, 3]): # Player 2 misses the block on its last move
+        requests.post(f"{BASE_URL}/games/{game_id}/move", json={"column": col, "player": 1 + i % 2})
+    denied = requests.post(f"{BASE_URL}/games/{free_game}/analysis")
+    r = requests.post(f"{BASE_URL}/games/{game_id}/analysis")
+    analysis = r.json() if r.status_code == 200 else {}
+    if (denied.status_code == 403 and claimed.status_code == 403 and len(analysis.get('eval_curve', [])) == 7
+            and analysis['moves'][5]['blunder'] and analysis['moves'][5]['best_column'] == 3):
+        print(f"✅ Game Analysis ({analysis['thinking_time']:.2f}s): PASSED")
+    else:
+        print(f"❌ Game Analysis Failed: {denied.status_code} {r.text}")
+
+def test_websocket_channel():
+    from websockets.sync.client import connect
+
+    r = requests.post(f"{BASE_URL}/games/new", json={"player1_type": "human", "player2_type": "bot", "difficulty": "easy"})
+    game_id = r.json()['game_id']
+    with connect(f"{WS_URL}/games/{game_id}/ws") as ws:
+        state = json.loads(ws.recv())
+        ws.send(json.dumps({"type": "move", "column": 3, "player": 1}))
+        human = json.loads(ws.recv())
+        bot = json.loads(ws.recv())
+    if state['type'] == "state" and human['row'] == 5 and bot['type'] == "bot_move":
+        print(f"✅ WebSocket Turn (Bot Col {bot['column']}): PASSED")
+    else:
+        print(f"❌ WebSocket Turn Failed: {state} {human} {bot}")
+
+def test_spectate_exhibition():
+    from websockets.sync.client import connect
+
+    r = requests.post(f"{BASE_URL}/exhibitions", json={"difficulty": "easy", "move_delay": 0.05})
+    game_id = r.json()['game_id']
+    with connect(f"{WS_URL}/games/{game_id}/spectate") as ws:
+        events = [json.loads(message) for message in ws]
+    plies = [e['ply'] for e in events]
+    if (events and events[0]['type'] == "state" and events[-1]['game_over']
+            and plies == list(range(plies[0], plies[0] + len(plies)))):
+        print(f"✅ Spectate Exhibition ({len(events) - 1} moves): PASSED")
+    else:
+        print(f"❌ Spectate Exhibition Failed: {events}")
 
 if __name__ == "__main__":
     # Wait a moment for server to start if running via script
     time.sleep(1) 
     test_health()
     test_game_flow()
+    test_turn_endpoint()
+    test_compact_format()
+    test_bot_move_stream()
+    test_batch_endpoints()
+    test_game_analysis()
+    test_websocket_channel()
+    test_spectate_exhibition()
+    print("\nAPI Integration Tests Complete.")
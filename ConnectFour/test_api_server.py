@@ -0,0 +1,323 @@
+import json
+import os
+import runpy
+import shutil
+import tempfile
+import time
+import unittest
+from itertools import product
+from unittest import mock
+
+# In-process: bots in threads, games in memory, finished games in a throwaway archive
+ARCHIVE_DIR = tempfile.mkdtemp(prefix="test_api_archive_")
+os.environ["BOT_POOL_WORKERS"] = "0"
+os.environ["GAME_STORE"] = "memory"
+os.environ["GAME_ARCHIVE_DIR"] = ARCHIVE_DIR
+os.environ["TIER_API_KEYS"] = "test-pro:pro,test-vip:vip"
+os.environ["MAX_EXHIBITIONS"] = "2"
+os.environ["EXHIBITION_IDLE_TIMEOUT"] = "0.5"
+
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+import api_server
+import bot_worker
+from bot_scheduler import BotScheduler, SchedulerFull
+from game_engine import ConnectFourGame, decode_board, encode_board
+from move_cache import MoveCache
+
+def tearDownModule():
+    shutil.rmtree(ARCHIVE_DIR, ignore_errors=True)
+
+def wait_for(condition, timeout=10):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+class ApiTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = TestClient(api_server.app)
+        cls.client.__enter__() # Runs the startup handlers (bot pool)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.__exit__(None, None, None)
+
+    def start_game(self, **config) -> str:
+        """A new game (human vs easy bot unless `config` says otherwise). Returns its id."""
+        config = {"player1_type": "human", "player2_type": "bot", "difficulty": "easy", **config}
+        r = self.client.post("/api/games/new", json=config)
+        self.assertEqual(r.status_code, 200)
+        return r.json()["game_id"]
+
+class TestMetrics(ApiTestCase):
+    def test_each_metric_is_exposed_once(self):
+        # `python api_server.py` runs the module twice (as __main__, then by name for uvicorn)
+        runpy.run_path(api_server.__file__, run_name="api_server_again")
+        self.client.get("/api/health")
+        r = self.client.get("/metrics")
+        self.assertEqual(r.status_code, 200)
+        types = [line.split()[2] for line in r.text.splitlines() if line.startswith("# TYPE")]
+        self.assertIn("http_requests_total", types)
+        self.assertEqual(len(types), len(set(types)))
+
+class TestEvaluatePositions(ApiTestCase):
+    def evaluate(self, *positions):
+        r = self.client.post("/api/positions/evaluate", json={"positions": list(positions)})
+        self.assertEqual(r.status_code, 200)
+        return r.json()["results"]
+
+    def test_bad_items_fail_alone(self):
+        empty = [[0] * 7 for _ in range(6)]
+        floating = [row[:] for row in empty]
+        floating[4][0] = 1
+        bad_cell = [row[:] for row in empty]
+        bad_cell[5][0] = 12
+        won = [row[:] for row in empty]
+        won[5][:4] = [1, 1, 1, 1]
+        won[4][:3] = [2, 2, 2]
+        uneven = [row[:] for row in empty]
+        uneven[5][0] = 2
+        results = self.evaluate(
+            {"moves": [3], "player": 3, "shared_analysis": True},
+            {"moves": [3], "player": 1},
+            {"board": floating},
+            {"board": bad_cell},
+            {"board": won},
+            {"board": uneven},
+            {"moves": [9]},
+            {"moves": [3], "player": 2, "difficulty": "easy"},
+        )
+        for result in results[:-1]:
+            self.assertIsNotNone(result["error"])
+            self.assertIsNone(result["column"])
+        self.assertIsNone(results[-1]["error"])
+        self.assertIn(results[-1]["column"], range(7))
+
+    def test_full_batch_fits_a_one_worker_pool(self):
+        # Distinct positions, so every item is a real search (no move cache hits)
+        seen, positions = set(), []
+        for moves in product(range(7), repeat=4):
+            game = ConnectFourGame()
+            for col in moves:
+                game.drop_piece(col)
+            if encode_board(game.board) not in seen:
+                seen.add(encode_board(game.board))
+                positions.append({"moves": list(moves), "difficulty": "easy"})
+        positions = positions[:api_server.MAX_BATCH_SIZE]
+        with mock.patch.object(api_server.bot_pool, "scheduler", BotScheduler(1)):
+            results = self.evaluate(*positions)
+        self.assertEqual([result["error"] for result in results], [None] * len(positions))
+
+class TestGamesBatch(ApiTestCase):
+    def test_failed_openings_undo_the_batch(self):
+        games = [{"player1_type": "bot", "player2_type": "human", "difficulty": "easy"}] * 3
+        before = len(api_server.games_db)
+        with mock.patch.object(api_server.bot_pool, "search", side_effect=SchedulerFull("batch", 1)):
+            r = self.client.post("/api/games/batch", json={"games": games, "play_bot_openings": True})
+        self.assertEqual(r.status_code, 503)
+        self.assertEqual(len(api_server.games_db), before)
+
+    def test_openings_are_played(self):
+        games = [{"player1_type": "bot", "player2_type": "human", "difficulty": "easy"}] * 3
+        with mock.patch.object(api_server.bot_pool, "scheduler", BotScheduler(1)):
+            r = self.client.post("/api/games/batch", json={"games": games, "play_bot_openings": True})
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(all(game["current_player"] == 2 for game in r.json()["games"]))
+
+class TestTurn(ApiTestCase):
+    def test_human_move_stands_when_the_bot_fails(self):
+        game_id = self.client.post("/api/games/new", json={"difficulty": "easy"}).json()["game_id"]
+        with mock.patch.object(api_server.bot_pool, "search", side_effect=SchedulerFull("free_tier", 1)):
+            r = self.client.post(f"/api/games/{game_id}/turn", json={"column": 3, "player": 1})
+        self.assertEqual(r.status_code, 200)
+        turn = r.json()
+        self.assertIsNone(turn["bot_move"])
+        self.assertEqual(turn["error"], "Bot workers are busy, try again")
+        self.assertEqual(turn["current_player"], 2)
+        # The client retries the bot's reply alone
+        r = self.client.get(f"/api/games/{game_id}/bot-move")
+        self.assertEqual(r.status_code, 200)
+        state = self.client.get(f"/api/games/{game_id}/state").json()
+        self.assertEqual(state["move_history"], [3, r.json()["column"]])
+
+    def test_turn_plays_both_moves(self):
+        game_id = self.start_game()
+        r = self.client.post(f"/api/games/{game_id}/turn", json={"column": 3, "player": 1})
+        self.assertEqual(r.status_code, 200)
+        turn = r.json()
+        self.assertEqual((turn["column"], turn["row"]), (3, 5))
+        self.assertIsNone(turn["error"])
+        bot = turn["bot_move"]
+        self.assertIsNotNone(bot)
+        self.assertEqual(turn["current_player"], 1)
+        state = self.client.get(f"/api/games/{game_id}/state").json()
+        self.assertEqual(state["move_history"], [3, bot["column"]])
+        self.assertEqual(state["board"], turn["board"])
+        self.assertEqual(state["board"][bot["row"]][bot["column"]], 2)
+
+class TestGameChannel(ApiTestCase):
+    def test_moves_come_back_as_deltas(self):
+        game_id = self.start_game()
+        with self.client.websocket_connect(f"/api/games/{game_id}/ws") as ws:
+            state = ws.receive_json()
+            self.assertEqual(state["type"], "state")
+            self.assertEqual(state["move_history"], [])
+            ws.send_json({"type": "move", "column": 9, "player": 1})
+            self.assertEqual(ws.receive_json(), {"type": "error", "detail": "Invalid move"})
+
+            ws.send_json({"type": "move", "column": 3, "player": 1})
+            move = ws.receive_json()
+            self.assertEqual((move["type"], move["player"], move["column"], move["row"]), ("move", 1, 3, 5))
+            self.assertEqual(move["current_player"], 2)
+            self.assertNotIn("board", move) # Only the changed cell
+            # The bot's reply is pushed without asking
+            bot = ws.receive_json()
+            self.assertEqual((bot["type"], bot["player"], bot["current_player"]), ("bot_move", 2, 1))
+            self.assertNotIn("board", bot)
+
+            ws.send_json({"type": "state"})
+            state = ws.receive_json()
+            self.assertEqual(state["move_history"], [3, bot["column"]])
+            self.assertEqual(state["board"][bot["row"]][bot["column"]], 2)
+
+class TestBoardFormats(ApiTestCase):
+    def test_compact_board_round_trips(self):
+        config = {"player1_type": "human", "player2_type": "human"}
+        r = self.client.post("/api/games/new?format=compact", json=config)
+        self.assertEqual(r.status_code, 200)
+        game_id = r.json()["game_id"]
+        self.assertEqual(r.json()["board"], "0" * 42)
+
+        self.client.post(f"/api/games/{game_id}/move", json={"column": 3, "player": 1})
+        r = self.client.post(f"/api/games/{game_id}/move?format=compact", json={"column": 3, "player": 2})
+        board = r.json()["board"]
+        self.assertEqual(len(board), 42)
+        self.assertEqual((board[5 * 7 + 3], board[4 * 7 + 3]), ("1", "2"))
+        full = self.client.get(f"/api/games/{game_id}/state").json()["board"]
+        self.assertEqual(decode_board(board), full)
+        self.assertEqual(encode_board(full), board)
+        compact = self.client.get(f"/api/games/{game_id}/state?format=compact").json()
+        self.assertEqual(compact["board"], board)
+
+    def test_moves_format_has_no_board(self):
+        game_id = self.start_game(player2_type="human")
+        self.client.post(f"/api/games/{game_id}/move", json={"column": 2, "player": 1})
+        state = self.client.get(f"/api/games/{game_id}/state?format=moves").json()
+        self.assertNotIn("board", state)
+        self.assertEqual(state["move_history"], [2])
+
+class TestBotMoveStream(ApiTestCase):
+    def read_events(self, url):
+        events, kind = [], None
+        with self.client.stream("GET", url) as r:
+            self.assertEqual(r.status_code, 200)
+            for line in r.iter_lines():
+                if line.startswith("event: "):
+                    kind = line[len("event: "):]
+                elif line.startswith("data: "):
+                    events.append((kind, json.loads(line[len("data: "):])))
+        return events
+
+    def test_progress_per_depth_then_the_move(self):
+        game_id = self.start_game(difficulty="medium")
+        self.client.post(f"/api/games/{game_id}/move", json={"column": 3, "player": 1})
+        # A cached position answers at once, with no progress to report
+        with mock.patch.object(bot_worker, "move_cache", MoveCache(path=None)):
+            events = self.read_events(f"/api/games/{game_id}/bot-move/stream")
+        kinds = [kind for kind, _ in events]
+        self.assertEqual(kinds, ["progress"] * 4 + ["move"])
+        progress = [payload for _, payload in events[:-1]]
+        self.assertEqual([p["depth"] for p in progress], [1, 2, 3, 4])
+        move = events[-1][1]
+        self.assertEqual(move["column"], progress[-1]["column"])
+        state = self.client.get(f"/api/games/{game_id}/state").json()
+        self.assertEqual(state["move_history"], [3, move["column"]])
+
+    def test_human_turn_is_an_error_before_streaming(self):
+        game_id = self.start_game(difficulty="medium")
+        r = self.client.get(f"/api/games/{game_id}/bot-move/stream")
+        self.assertEqual(r.status_code, 400)
+
+class TestSpectate(ApiTestCase):
+    def test_evicted_game_ends_its_spectator_streams(self):
+        game_id = self.start_game(player2_type="human")
+        with self.client.websocket_connect(f"/api/games/{game_id}/spectate") as ws:
+            self.assertEqual(ws.receive_json()["type"], "state")
+            # Idle past the TTL, as the background sweep would find it
+            api_server.games_db.sweep(now=time.time() + api_server.games_db.idle_ttl + 1)
+            self.assertEqual(ws.receive_json()["type"], "deleted")
+            with self.assertRaises(WebSocketDisconnect):
+                ws.receive_json()
+        self.assertFalse(api_server.spectators.watching(game_id))
+
+class TestTierGating(ApiTestCase):
+    def new_game(self, key=None, **config):
+        headers = {"X-API-Key": key} if key else {}
+        return self.client.post("/api/games/new", json={"player1_type": "human", "player2_type": "human", **config},
+                                headers=headers)
+
+    def test_tier_in_the_body_is_not_trusted(self):
+        self.assertEqual(self.new_game(tier="vip").status_code, 403)
+        self.assertEqual(self.new_game("not-a-key", tier="pro").status_code, 403)
+        self.assertEqual(self.new_game(difficulty="vip").status_code, 403)
+
+    def test_keys_grant_up_to_their_tier(self):
+        self.assertEqual(self.new_game("test-pro", tier="pro").status_code, 200)
+        self.assertEqual(self.new_game("test-pro", tier="free_tier").status_code, 200)
+        self.assertEqual(self.new_game("test-pro", tier="vip").status_code, 403)
+        self.assertEqual(self.new_game("test-vip", tier="vip", difficulty="vip").status_code, 200)
+        self.assertEqual(self.new_game("test-vip", tier="gold").status_code, 400)
+
+    def test_batch_is_checked_against_the_key(self):
+        games = [{"player1_type": "human", "player2_type": "human", "tier": "pro"}]
+        r = self.client.post("/api/games/batch", json={"games": games})
+        self.assertEqual(r.status_code, 403)
+        r = self.client.post("/api/games/batch", json={"games": games}, headers={"X-API-Key": "test-pro"})
+        self.assertEqual(r.status_code, 200)
+
+    def test_analysis_needs_a_granted_tier(self):
+        free_game = self.new_game().json()["game_id"]
+        pro_game = self.new_game("test-pro", tier="pro").json()["game_id"]
+        for game_id in (free_game, pro_game):
+            self.client.post(f"/api/games/{game_id}/move", json={"column": 3, "player": 1})
+        self.assertEqual(self.client.post(f"/api/games/{free_game}/analysis").status_code, 403)
+        self.assertEqual(self.client.post(f"/api/games/{pro_game}/analysis").status_code, 200)
+
+class TestExhibitions(ApiTestCase):
+    def setUp(self):
+        # Exhibitions of earlier tests stop once nobody has watched them for the timeout
+        self.assertTrue(wait_for(lambda: not api_server.exhibitions))
+
+    def start(self, move_delay):
+        return self.client.post("/api/exhibitions", json={"difficulty": "easy", "move_delay": move_delay})
+
+    def test_at_most_max_exhibitions_run(self):
+        for _ in range(api_server.MAX_EXHIBITIONS):
+            self.assertEqual(self.start(0.1).status_code, 200)
+        r = self.start(0.1)
+        self.assertEqual(r.status_code, 503)
+        self.assertIn("retry-after", r.headers)
+
+    def test_unwatched_exhibition_is_deleted(self):
+        game_id = self.start(0.1).json()["game_id"] # 7 plies take longer than the timeout
+        self.assertTrue(wait_for(lambda: self.client.get(f"/api/games/{game_id}/state").status_code == 404))
+        self.assertTrue(wait_for(lambda: not api_server.exhibitions))
+
+    def test_watched_exhibition_plays_to_the_end(self):
+        game_id = self.start(0.05).json()["game_id"]
+        events = []
+        with self.client.websocket_connect(f"/api/games/{game_id}/spectate") as ws:
+            try:
+                while True:
+                    events.append(ws.receive_json())
+            except WebSocketDisconnect:
+                pass
+        self.assertEqual(events[0]["type"], "state")
+        self.assertTrue(events[-1]["game_over"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+import copy
+from benchmark import CORPUS, bench_position, run, compare
+
+class TestBenchmark(unittest.TestCase):
+    def test_node_counts_are_reproducible(self):
+        first = bench_position(CORPUS["endgame-4"], "v2", depth=3)
+        second = bench_position(CORPUS["endgame-4"], "v2", depth=3)
+        self.assertGreater(first["nodes"], 0)
+        self.assertEqual((first["nodes"], first["column"]), (second["nodes"], second["column"]))
+        self.assertEqual(len(first["time_to_depth"]), 3)
+
+    def test_corpus_positions_are_playable(self):
+        report = run(depth=1, positions=list(CORPUS))
+        self.assertEqual(len(report["results"]), 2 * len(CORPUS)) # v1 and v2
+
+    def test_compare_flags_throughput_regressions_and_changes(self):
+        report = run(depth=2, evaluations=("v2",), positions=["opening-1"])
+        baseline = copy.deepcopy(report)
+        self.assertEqual(compare(report, baseline, 0.1), ([], []))
+        baseline["totals"]["v2"]["nps"] = report["totals"]["v2"]["nps"] * 2
+        baseline["results"]["opening-1/v2"]["nodes"] += 1
+        regressions, changes = compare(report, baseline, 0.1)
+        self.assertEqual(len(regressions), 1)
+        self.assertEqual(len(changes), 1)
+
+if __name__ == '__main__':
+    unittest.main()
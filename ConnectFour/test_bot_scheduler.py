@@ -0,0 +1,107 @@
+import unittest
+import asyncio
+from bot_ai import CancelToken
+from bot_scheduler import BotScheduler, SchedulerFull
+
+class TestBotScheduler(unittest.TestCase):
+    def run_async(self, coro):
+        return asyncio.run(coro)
+
+    def test_weighted_fair_dispatch_prefers_paying_tiers(self):
+        async def scenario():
+            scheduler = BotScheduler(1)
+            order = []
+            hold = asyncio.Event()
+
+            async def job(tier):
+                async with scheduler.slot(tier):
+                    order.append(tier)
+                    await hold.wait()
+
+            blocker = asyncio.create_task(job("free_tier"))
+            await asyncio.sleep(0)
+            waiters = [asyncio.create_task(job(tier)) for tier in ["free_tier"] * 4 + ["vip"] * 4]
+            await asyncio.sleep(0)
+            hold.set()
+            await asyncio.gather(blocker, *waiters)
+            return order[1:]
+
+        order = self.run_async(scenario())
+        self.assertEqual(len(order), 8)
+        self.assertGreaterEqual(order[:5].count("vip"), 4)
+
+    def test_full_queue_is_rejected_with_retry_after(self):
+        async def scenario():
+            scheduler = BotScheduler(1, {"free_tier": {"weight": 1, "running_share": 1.0, "queue_per_slot": 1}})
+            hold = asyncio.Event()
+
+            async def job():
+                async with scheduler.slot("free_tier"):
+                    await hold.wait()
+
+            tasks = [asyncio.create_task(job()) for _ in range(2)] # One running, one queued
+            await asyncio.sleep(0)
+            with self.assertRaises(SchedulerFull) as ctx:
+                async with scheduler.slot("free_tier"):
+                    pass
+            hold.set()
+            await asyncio.gather(*tasks)
+            return ctx.exception, scheduler.stats()
+
+        error, stats = self.run_async(scenario())
+        self.assertGreaterEqual(error.retry_after, 1)
+        self.assertEqual(stats["tiers"]["free_tier"]["rejected"], 1)
+        self.assertEqual(stats["running"], 0)
+
+    def test_free_tier_cap_leaves_room_for_vip(self):
+        async def scenario():
+            scheduler = BotScheduler(4) # free_tier may hold 3 of the 4 slots
+            hold = asyncio.Event()
+            started = []
+
+            async def job(tier):
+                async with scheduler.slot(tier):
+                    started.append(tier)
+                    await hold.wait()
+
+            tasks = [asyncio.create_task(job("free_tier")) for _ in range(5)]
+            await asyncio.sleep(0)
+            tasks.append(asyncio.create_task(job("vip")))
+            await asyncio.sleep(0)
+            snapshot = list(started)
+            hold.set()
+            await asyncio.gather(*tasks)
+            return snapshot
+
+        self.assertEqual(sorted(self.run_async(scenario())), ["free_tier"] * 3 + ["vip"])
+
+    def test_cancelled_token_leaves_the_queue(self):
+        async def scenario():
+            scheduler = BotScheduler(1)
+            hold = asyncio.Event()
+
+            async def blocker():
+                async with scheduler.slot("free_tier"):
+                    await hold.wait()
+
+            task = asyncio.create_task(blocker())
+            await asyncio.sleep(0)
+            token = CancelToken()
+
+            async def waiter():
+                async with scheduler.slot("free_tier", token) as granted:
+                    return granted
+
+            waiting = asyncio.create_task(waiter())
+            await asyncio.sleep(0)
+            token.cancel("disconnected")
+            granted = await waiting
+            queued = scheduler.stats()["tiers"]["free_tier"]["queued"]
+            hold.set()
+            await task
+            return granted, queued, scheduler.running
+
+        self.assertEqual(self.run_async(scenario()), (False, 0, 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,10 @@
 
 import unittest
 import json
-from game_engine import ConnectFourGame, EMPTY, PLAYER1, PLAYER2, ROWS, COLS
+import random
+from game_engine import ConnectFourGame, PackedGame, BitboardGame, ENGINES, EMPTY, PLAYER1, PLAYER2, ROWS, COLS
+from perft import perft, divide, KNOWN_COUNTS
+from engine_fuzz import fuzz_game, run as run_fuzz
 
 class TestConnectFourEngine(unittest.TestCase):
     def setUp(self):
@@ -18,7 +21,7 @@ class TestConnectFourEngine(unittest.TestCase):
                 self.assertEqual(self.game.board[r][c], EMPTY)
 
     def test_valid_drop(self):
-        self.game.drop_piece(0)
+        self.assertEqual(self.game.drop_piece(0), ROWS-1)
         self.assertEqual(self.game.board[ROWS-1][0], PLAYER1)
         self.assertEqual(len(self.game.move_history), 1)
         self.assertEqual(self.game.current_player, PLAYER2)
@@ -204,5 +207,90 @@ class TestConnectFourEngine(unittest.TestCase):
         self.assertIn("0 1 2 3 4 5 6", output)
         self.assertIn("| | | | | | | |", output)
 
+class TestPackedGame(unittest.TestCase):
+    def assertSameState(self, packed, game):
+        self.assertEqual(packed.board, game.board)
+        self.assertEqual(packed.current_player, game.current_player)
+        self.assertEqual(packed.move_history, game.move_history)
+        self.assertEqual(packed.game_over, game.game_over)
+        self.assertEqual(packed.winner, game.winner)
+        self.assertEqual(packed.get_valid_moves(), game.get_valid_moves())
+
+    def test_random_games_match_connect_four_game(self):
+        rng = random.Random(7)
+        for _ in range(200):
+            packed, game = PackedGame(), ConnectFourGame()
+            while not game.game_over:
+                column = rng.choice(game.get_valid_moves())
+                self.assertEqual(packed.drop_piece(column), game.drop_piece(column))
+                self.assertSameState(packed, game)
+
+    def test_full_board_is_a_draw(self):
+        packed = PackedGame()
+        # Columns in pairs shifted by one row, so no four line up anywhere
+        for column in [0, 1, 2, 3, 4, 5, 6] * 2 + [1, 0, 3, 2, 5, 4, 6] * 2 + [0, 1, 2, 3, 4, 5, 6] * 2:
+            packed.drop_piece(column)
+        self.assertEqual(packed.winner, 'draw')
+        self.assertTrue(packed.is_draw())
+        self.assertEqual(packed.get_valid_moves(), [])
+
+    def test_invalid_moves_raise(self):
+        packed = PackedGame()
+        for column in (-1, COLS):
+            with self.assertRaises(ValueError):
+                packed.drop_piece(column)
+        for _ in range(ROWS):
+            packed.drop_piece(0)
+        with self.assertRaises(ValueError):
+            packed.drop_piece(0)
+
+    def test_to_game_round_trip(self):
+        packed = PackedGame()
+        for column in [3, 3, 4]:
+            packed.drop_piece(column)
+        self.assertSameState(packed, packed.to_game())
+
+class TestBackends(unittest.TestCase):
+    def test_perft_matches_known_counts(self):
+        for name, engine in ENGINES.items():
+            game = engine()
+            for depth in range(6 if name == "bitboard" else 5):
+                self.assertEqual(perft(game, depth), KNOWN_COUNTS[depth], (name, depth))
+            self.assertEqual(game.move_history, []) # Every move was taken back
+
+    def test_perft_divide_sums_to_perft(self):
+        game = BitboardGame()
+        for column in [3, 3, 3, 3, 3]:
+            game.drop_piece(column)
+        counts = divide(game, 3)
+        self.assertEqual(counts[3], 36) # Column 3 takes one more piece, then it's full
+        self.assertEqual(sum(counts.values()), perft(game, 3))
+
+    def test_undo_after_a_win(self):
+        for engine in ENGINES.values():
+            game = engine()
+            for column in [0, 1, 0, 1, 0, 1, 0]:
+                game.drop_piece(column)
+            self.assertEqual(game.winner, PLAYER1)
+            self.assertEqual(game.undo_move(), 0)
+            self.assertEqual((game.winner, game.game_over, game.current_player), (None, False, PLAYER1))
+            self.assertEqual(game.drop_piece(2), ROWS - 1)
+
+    def test_fuzzer_finds_no_differences(self):
+        played, mismatch, _ = run_fuzz(list(ENGINES), games=150, seed=11, workers=0)
+        self.assertEqual((played, mismatch), (150, None))
+
+    def test_fuzzer_catches_a_broken_backend(self):
+        class LateWinner(BitboardGame):
+            __slots__ = ()
+            def drop_piece(self, column):
+                row = super().drop_piece(column)
+                if self.winner == PLAYER2:
+                    self.winner = None # Misses player 2's wins
+                return row
+
+        mismatches = [fuzz_game({"list": ConnectFourGame, "broken": LateWinner}, seed) for seed in range(200)]
+        self.assertTrue(any(mismatch is not None for mismatch in mismatches))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import os
+import tempfile
+import uuid
+from game_engine import PLAYER1
+from game_archive import GameArchive, pack_moves, unpack_moves
+
+CONFIG = {"player1_type": "human", "player2_type": "bot", "difficulty": "hard", "tier": "pro",
+          "shared_analysis": False}
+WIN = [3, 4, 3, 4, 3, 4, 3] # Player 1 wins vertically
+
+class TestGameArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.archive = GameArchive(self.tmp.name, segment_bytes=1024)
+
+    def tearDown(self):
+        self.archive.close()
+        self.tmp.cleanup()
+
+    def add(self, archive=None, moves=WIN):
+        game_id = str(uuid.uuid4())
+        (archive or self.archive).append(game_id, moves, PLAYER1, CONFIG, created_at=1700000000)
+        return game_id
+
+    def test_moves_pack_into_nibbles(self):
+        moves = [6, 0, 3, 3, 5]
+        self.assertEqual(len(pack_moves(moves)), 3)
+        self.assertEqual(unpack_moves(pack_moves(moves), len(moves)), moves)
+
+    def test_get_returns_the_archived_game(self):
+        game_id = self.add()
+        game = self.archive.get(game_id)
+        self.assertEqual(game.game_id, game_id)
+        self.assertEqual(game.moves, WIN)
+        self.assertEqual(game.winner, PLAYER1)
+        self.assertEqual((game.player1_type, game.player2_type, game.difficulty, game.tier),
+                         ("human", "bot", "hard", "pro"))
+        self.assertEqual(game.created_at, 1700000000)
+        self.assertEqual(game.replay().winner, PLAYER1)
+        self.assertIsNone(self.archive.get(str(uuid.uuid4())))
+        self.assertIsNone(self.archive.get("not-a-uuid"))
+
+    def test_segments_rotate_and_index_survives_reopen(self):
+        ids = [self.add() for _ in range(100)] # ~34 bytes each, several 1 KB segments
+        self.assertGreater(len(self.archive.segments()), 1)
+        self.assertTrue(os.path.exists(self.archive._path(1, ".idx")))
+        self.archive.close()
+        self.archive = GameArchive(self.tmp.name, segment_bytes=1024)
+        self.assertEqual(len(self.archive), 100)
+        self.assertEqual(self.archive.get(ids[0]).moves, WIN)
+        self.assertEqual(self.archive.get(ids[-1]).moves, WIN)
+        self.assertEqual([game.game_id for game in self.archive], ids)
+
+    def test_appends_from_another_process_are_found(self):
+        other = GameArchive(self.tmp.name, segment_bytes=1024)
+        try:
+            game_id = self.add(other)
+            self.assertEqual(self.archive.get(game_id).moves, WIN)
+        finally:
+            other.close()
+
+    def test_torn_last_record_is_skipped(self):
+        game_id = self.add()
+        with open(self.archive._path(1), "ab") as f:
+            f.write(b"\xc4\x00\x01") # A record cut off mid-write
+        reopened = GameArchive(self.tmp.name, segment_bytes=1024)
+        try:
+            self.assertEqual([game.game_id for game in reopened], [game_id])
+            self.assertEqual(len(reopened), 1)
+        finally:
+            reopened.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import random
+from game_engine import PLAYER1, PLAYER2
+from game_stats import GameStats, QuantileSketch
+
+PRO = {"difficulty": "hard"}
+BOT_P2 = {PLAYER2: "hard"}
+
+class FakeClock:
+    def __init__(self, now=1700000000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class TestQuantileSketch(unittest.TestCase):
+    def test_quantiles_within_relative_accuracy(self):
+        rng = random.Random(7)
+        values = [rng.lognormvariate(-3, 1.5) for _ in range(20000)]
+        sketch = QuantileSketch(accuracy=0.01)
+        for value in values:
+            sketch.add(value)
+        values.sort()
+        for q in (0.5, 0.9, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            self.assertAlmostEqual(sketch.quantile(q) / exact, 1, delta=0.011)
+        self.assertLess(len(sketch.buckets), 1000)
+
+    def test_merge_matches_a_single_sketch(self):
+        a, b, both = QuantileSketch(), QuantileSketch(), QuantileSketch()
+        for i in range(1, 1001):
+            (a if i % 2 else b).add(i / 100)
+            both.add(i / 100)
+        a.merge(b)
+        self.assertEqual(a.count, 1000)
+        self.assertEqual(a.quantile(0.9), both.quantile(0.9))
+        self.assertIsNone(QuantileSketch().quantile(0.5))
+
+class TestGameStats(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.stats = GameStats(clock=self.clock)
+
+    def test_results_lengths_and_openings(self):
+        self.stats.record_game([3, 3, 2, 2, 1, 1, 0], PLAYER1, PRO, BOT_P2, created_at=self.clock.now - 60)
+        self.stats.record_game([3, 4, 3, 4, 3, 4, 0, 4], PLAYER2, PRO, BOT_P2, created_at=self.clock.now - 30)
+        self.stats.record_game([3, 3], "draw", {"difficulty": "easy"}, {}, created_at=self.clock.now)
+        self.stats.record_think("hard", 0.2)
+        minute = self.stats.snapshot()["1m"]
+        self.assertEqual(minute["games"], 3)
+        self.assertAlmostEqual(minute["avg_game_length"], 17 / 3, places=2)
+        self.assertEqual(minute["avg_game_seconds"], 30)
+        hard = minute["difficulties"]["hard"]
+        self.assertEqual((hard["games"], hard["bot_win_rate"], hard["player1_win_rate"]), (2, 0.5, 0.5))
+        self.assertEqual(minute["difficulties"]["human_only"]["draw_rate"], 1.0)
+        self.assertEqual(minute["openings"][0], {"moves": [3, 3], "games": 2, "share": 0.6667})
+        self.assertEqual(minute["bot_think_seconds"]["hard"]["count"], 1)
+
+    def test_windows_expire_old_slots(self):
+        self.stats.record_game([3, 3], PLAYER1, PRO, BOT_P2)
+        self.clock.now += 120
+        self.stats.record_game([2, 2], PLAYER1, PRO, BOT_P2)
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot["1m"]["games"], 1)
+        self.assertEqual(snapshot["1h"]["games"], 2)
+        self.clock.now += 86400
+        snapshot = self.stats.snapshot()
+        self.assertEqual((snapshot["1m"]["games"], snapshot["24h"]["games"]), (0, 0))
+        self.assertEqual(snapshot["all_time"]["games"], 2)
+        self.assertIsNone(snapshot["1m"]["avg_game_length"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,202 @@
+import unittest
+import os
+import tempfile
+import time
+from game_engine import PackedGame, PLAYER2
+from game_store import MemoryGameStore, SQLiteGameStore, GameSession, GameLockTimeout, shared_config
+
+def make_session(config, created_at=None):
+    return GameSession(PackedGame(), config, created_at=created_at)
+
+class TestMemoryGameStore(unittest.TestCase):
+    def setUp(self):
+        self.evicted = []
+        self.store = MemoryGameStore(max_games=3, idle_ttl=60,
+                                     on_evict=lambda game_id, session: self.evicted.append(game_id))
+
+    def test_put_and_get(self):
+        session = make_session({"n": 1})
+        self.store.put("a", session)
+        self.assertIn("a", self.store)
+        self.assertIs(self.store.get("a"), session)
+        self.assertIsNone(self.store.get("missing"))
+
+    def test_lru_eviction_over_capacity(self):
+        for game_id in ["a", "b", "c"]:
+            self.store.put(game_id, make_session({}))
+        self.store.get("a") # "b" is now least recently used
+        self.store.put("d", make_session({}))
+        self.assertNotIn("b", self.store)
+        self.assertEqual(self.evicted, ["b"])
+        self.assertEqual(self.store.stats()["evicted_lru"], 1)
+
+    def test_sweep_drops_idle_games(self):
+        self.store.put("a", make_session({}))
+        self.store.put("b", make_session({}))
+        self.store.games["a"].last_access -= 120 # "a" idle for two minutes
+        self.assertEqual(self.store.sweep(), 1)
+        self.assertNotIn("a", self.store)
+        self.assertIn("b", self.store)
+        self.assertEqual(self.store.stats()["evicted_ttl"], 1)
+
+    def test_get_refreshes_idle_timer(self):
+        self.store.put("a", make_session({}))
+        self.store.put("b", make_session({}))
+        self.store.get("a")
+        self.assertEqual(self.store.sweep(now=time.time() + 30), 0)
+        self.assertEqual(self.store.sweep(now=time.time() + 61), 2)
+
+    def test_pop_counts_as_delete_not_eviction(self):
+        session = make_session({})
+        self.store.put("a", session)
+        self.assertIs(self.store.pop("a"), session)
+        self.assertIsNone(self.store.pop("a"))
+        stats = self.store.stats()
+        self.assertEqual(stats["deleted"], 1)
+        self.assertEqual(stats["evicted_lru"] + stats["evicted_ttl"], 0)
+        self.assertEqual(self.evicted, [])
+
+class TestGameSession(unittest.TestCase):
+    def test_equal_configs_share_one_dict(self):
+        a = shared_config({"difficulty": "easy", "tier": "pro"})
+        b = shared_config({"tier": "pro", "difficulty": "easy"})
+        self.assertIs(a, b)
+        self.assertIsNot(a, shared_config({"difficulty": "hard", "tier": "pro"}))
+
+    def test_search_set_only_exists_while_searching(self):
+        session = make_session({})
+        self.assertIsNone(session.searches)
+        session.track_search("token")
+        self.assertEqual(session.running_searches(), ["token"])
+        session.untrack_search("token")
+        self.assertIsNone(session.searches)
+        with self.assertRaises(AttributeError):
+            session.extra = 1 # Slotted
+
+class TestSQLiteGameStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "games.db")
+        self.store = SQLiteGameStore(self.path, make_session, max_games=2, flush_interval=0.001)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def reopen(self):
+        self.store.close()
+        self.store = SQLiteGameStore(self.path, make_session, max_games=2, flush_interval=0.001)
+
+    def test_game_survives_restart(self):
+        session = make_session({"difficulty": "hard"})
+        self.store.put("g1", session)
+        for col in [3, 3, 4]:
+            session.game.drop_piece(col)
+            self.store.save("g1", session)
+        self.reopen()
+        restored = self.store.get("g1")
+        self.assertEqual(restored.game.move_history, [3, 3, 4])
+        self.assertEqual(restored.game.current_player, PLAYER2)
+        self.assertEqual(restored.config, {"difficulty": "hard"})
+
+    def test_cache_miss_reloads_from_disk(self):
+        for game_id in ["a", "b", "c"]:
+            session = make_session({})
+            session.game.drop_piece(0)
+            self.store.put(game_id, session)
+        self.assertEqual(len(self.store.games), 2) # "a" pushed out of the cache
+        self.assertEqual(self.store.get("a").game.move_history, [0])
+        self.assertEqual(self.store.loaded, 1)
+
+    def test_writes_are_group_committed(self):
+        for i in range(50):
+            self.store.put(f"g{i}", make_session({}))
+        self.store.flush()
+        self.assertLessEqual(self.store.flushes, 50)
+        self.assertEqual(len(self.store), 50)
+
+    def test_pop_deletes_from_disk(self):
+        self.store.put("g1", make_session({}))
+        self.assertIsNotNone(self.store.pop("g1"))
+        self.reopen()
+        self.assertIsNone(self.store.get("g1"))
+
+    def test_sweep_deletes_idle_rows(self):
+        self.store.put("g1", make_session({}))
+        self.store.flush()
+        self.assertEqual(self.store.sweep(now=time.time() + self.store.idle_ttl + 1), 1)
+        self.assertIsNone(self.store.get("g1"))
+
+class TestSharedSQLiteGameStore(unittest.TestCase):
+    """Two stores on one file stand in for two API worker processes."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, "games.db")
+        self.a = SQLiteGameStore(path, make_session, shared=True, lock_lease=5, lock_timeout=0.05)
+        self.b = SQLiteGameStore(path, make_session, shared=True, lock_lease=5, lock_timeout=0.05)
+
+    def tearDown(self):
+        self.a.close()
+        self.b.close()
+        self.tmp.cleanup()
+
+    def test_game_created_on_one_worker_is_visible_on_another(self):
+        self.a.put("g1", make_session({"difficulty": "easy"}))
+        self.assertEqual(self.b.get("g1").config, {"difficulty": "easy"})
+
+    def test_cached_game_catches_up_with_other_workers_moves(self):
+        session = make_session({})
+        self.a.put("g1", session)
+        held = self.b.get("g1")
+        for col in [3, 4]:
+            session.game.drop_piece(col)
+            self.a.save("g1", session)
+        self.assertIs(self.b.get("g1"), held) # Same object, moves replayed onto it
+        self.assertEqual(held.game.move_history, [3, 4])
+        session.game.drop_piece(5)
+        self.a.save("g1", session)
+        self.assertIs(self.b.refresh("g1", held), held)
+        self.assertEqual(held.game.move_history, [3, 4, 5])
+
+    def test_delete_on_one_worker_is_seen_by_another(self):
+        self.a.put("g1", make_session({}))
+        held = self.b.get("g1")
+        self.a.pop("g1")
+        self.assertIsNone(self.b.refresh("g1", held))
+        self.assertIsNone(self.b.get("g1"))
+
+    def test_game_lock_excludes_other_workers(self):
+        with self.a.game_lock("g1"):
+            with self.assertRaises(GameLockTimeout):
+                with self.b.game_lock("g1"):
+                    pass
+            with self.b.game_lock("g2"): # Other games are not blocked
+                pass
+        with self.b.game_lock("g1"):
+            pass
+
+    def test_expired_lease_is_taken_over(self):
+        self.a.lock_lease = -1 # Lease already expired, as if worker "a" crashed holding it
+        with self.a.game_lock("g1"):
+            with self.b.game_lock("g1"):
+                pass
+
+    def test_search_cancel_on_one_worker_reaches_another(self):
+        self.a.add_search("g1", "s1")
+        self.assertIsNone(self.a.search_cancel_reason("s1"))
+        self.assertEqual(self.b.cancel_searches("g1", "accepted"), 1)
+        self.assertEqual(self.a.search_cancel_reason("s1"), "accepted")
+        self.assertEqual(self.b.cancel_searches("g1", "deleted"), 0) # Already cancelled
+        self.a.remove_search("s1")
+        self.assertEqual(self.b.cancel_searches("g1", "accepted"), 0)
+
+    def test_spectators_on_one_worker_are_seen_by_another(self):
+        self.assertIsNone(self.b.last_watched("g1"))
+        self.a.mark_watched("g1")
+        self.assertIsNotNone(self.b.last_watched("g1"))
+        self.b.sweep(now=time.time() + self.b.idle_ttl + 1)
+        self.assertIsNone(self.a.last_watched("g1"))
+
+if __name__ == '__main__':
+    unittest.main()
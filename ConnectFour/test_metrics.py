@@ -0,0 +1,90 @@
+import os
+import tempfile
+import time
+import unittest
+from metrics import Registry, MultiProcessMetrics
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter_per_label_set(self):
+        requests = self.registry.counter("requests_total", "Requests", labels=("route",))
+        requests.inc("/a")
+        requests.inc("/a")
+        requests.inc("/b", amount=5)
+        text = self.registry.render()
+        self.assertIn('requests_total{route="/a"} 2', text)
+        self.assertIn('requests_total{route="/b"} 5', text)
+
+    def test_histogram_buckets_are_cumulative(self):
+        latency = self.registry.histogram("latency_seconds", "Latency", labels=("route",), buckets=(0.1, 1.0))
+        for value in [0.05, 0.5, 0.5, 3.0]:
+            latency.observe(value, "/a")
+        text = self.registry.render()
+        self.assertIn('latency_seconds_bucket{route="/a",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{route="/a",le="1.0"} 3', text)
+        self.assertIn('latency_seconds_bucket{route="/a",le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_count{route="/a"} 4', text)
+        self.assertIn('latency_seconds_sum{route="/a"} 4.05', text)
+
+    def test_gauge_function_read_at_scrape(self):
+        state = {"games": 3}
+        self.registry.gauge_function("games_active", "Games", lambda: state["games"])
+        self.assertIn("games_active 3", self.registry.render())
+        state["games"] = 7
+        self.assertIn("games_active 7", self.registry.render())
+
+    def test_registering_a_name_again_replaces_it(self):
+        self.registry.gauge_function("games_active", "Games", lambda: 0)
+        self.registry.gauge_function("games_active", "Games", lambda: 17)
+        text = self.registry.render()
+        self.assertEqual(text.count("# TYPE games_active"), 1)
+        self.assertIn("games_active 17", text)
+
+class TestMultiProcessMetrics(unittest.TestCase):
+    """Two registries on one directory stand in for two API worker processes."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.workers = []
+        for games, queued in [(5, 1), (5, 2)]:
+            registry = Registry()
+            registry.counter("requests_total", "Requests", labels=("route",))
+            registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+            registry.gauge_function("games_active", "Shared store games", lambda games=games: games, aggregate="max")
+            registry.gauge_function("queue_depth", "Queued searches", lambda queued=queued: queued)
+            self.workers.append((registry, MultiProcessMetrics(registry, self.tmp.name, interval=60)))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_scrape_on_any_worker_sums_all_of_them(self):
+        (a, a_metrics), (b, b_metrics) = self.workers
+        a.metrics[0].inc("/a", amount=2)
+        b.metrics[0].inc("/a", amount=3)
+        b.metrics[0].inc("/b")
+        a.metrics[1].observe(0.05)
+        b.metrics[1].observe(0.5)
+        b_metrics.write()
+        text = a_metrics.render()
+        self.assertEqual(text, b_metrics.render())
+        self.assertIn('requests_total{route="/a"} 5', text)
+        self.assertIn('requests_total{route="/b"} 1', text)
+        self.assertIn('latency_seconds_bucket{le="1.0"} 2', text)
+        self.assertIn("games_active 5", text)
+        self.assertIn("queue_depth 3", text)
+        self.assertEqual(text.count("# TYPE requests_total"), 1)
+
+    def test_exited_worker_keeps_its_counts_but_not_its_gauges(self):
+        (a, a_metrics), (b, b_metrics) = self.workers
+        b.metrics[0].inc("/a", amount=3)
+        b_metrics.write()
+        old = time.time() - 3600
+        os.utime(b_metrics.path, (old, old))
+        text = a_metrics.render()
+        self.assertIn('requests_total{route="/a"} 3', text)
+        self.assertIn("queue_depth 1", text)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import os
+import tempfile
+from game_engine import BitboardGame
+from selfplay import RECORD, HEADER, generate, play_game, iter_records, decode_board, open_dataset, dataset_length
+
+class TestSelfPlay(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".c4sp")
+        os.close(fd)
+        os.remove(self.path)
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_records_label_positions_with_the_final_result(self):
+        records = list(RECORD.iter_unpack(play_game(3, 7, 2, "v2", 4, 0.1)))
+        self.assertTrue(records)
+        for player1, player2, game, score, side, ply, best, result, depth in records:
+            self.assertEqual((game, depth), (3, 2))
+            self.assertGreaterEqual(ply, 4) # The random opening isn't recorded
+            self.assertEqual(sum(cell != 0 for row in decode_board(player1, player2) for cell in row), ply)
+            self.assertEqual(side, 1 + ply % 2)
+            self.assertIn(result, (-1, 0, 1))
+        results = {side: result for *_, side, ply, best, result, depth in records}
+        if results.get(1) is not None and results.get(2) is not None:
+            self.assertEqual(results[1], -results[2]) # Zero-sum, from the side to move's view
+
+    def test_generate_appends_and_survives_a_torn_record(self):
+        first = generate(self.path, 50, depth=1, workers=0, seed=1, batch_games=2)
+        self.assertGreaterEqual(first, 50)
+        with open(self.path, "ab") as f:
+            f.write(b"\x00" * (RECORD.size // 2)) # Interrupted mid-write
+        self.assertEqual(dataset_length(self.path), first)
+        total = generate(self.path, 10, depth=1, workers=0, seed=2, batch_games=2)
+        self.assertEqual(os.path.getsize(self.path), HEADER.size + total * RECORD.size)
+        records = list(iter_records(self.path))
+        self.assertEqual(len(records), total)
+        # Game ids keep counting across runs
+        self.assertGreater(min(r["game"] for r in records[first:]), max(r["game"] for r in records[:first]))
+
+    def test_decode_board_matches_the_engine(self):
+        game = BitboardGame()
+        for column in [3, 3, 2, 4, 6, 0, 3]:
+            game.drop_piece(column)
+        self.assertEqual(decode_board(game.bits[1], game.bits[2]), game.board)
+
+    def test_rejects_other_files(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a dataset".ljust(HEADER.size + RECORD.size, b"\x00"))
+        with self.assertRaises(ValueError):
+            list(iter_records(self.path))
+        with self.assertRaises(ValueError):
+            generate(self.path, 1, workers=0)
+
+    def test_memmap_view_matches_streamed_records(self):
+        generate(self.path, 20, depth=1, workers=0, seed=3, batch_games=2)
+        view = open_dataset(self.path)
+        records = list(iter_records(self.path))
+        self.assertEqual(len(view), len(records))
+        self.assertEqual(int(view["score"][-1]), records[-1]["score"])
+        self.assertEqual(int(view["player1"][0]), records[0]["player1"])
+
+if __name__ == '__main__':
+    unittest.main()
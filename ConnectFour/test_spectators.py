@@ -0,0 +1,79 @@
+import unittest
+import asyncio
+import threading
+from spectators import SpectatorHub
+
+def drain(subscriber):
+    """Everything queued for a subscriber, up to the end marker if there is one."""
+    events = []
+    while not subscriber.queue.empty():
+        events.append(subscriber.queue.get_nowait())
+    return events
+
+class TestSpectatorHub(unittest.TestCase):
+    def run_async(self, coro):
+        return asyncio.run(coro)
+
+    def test_event_is_serialized_once_for_all_subscribers(self):
+        async def scenario():
+            hub = SpectatorHub(buffer=8)
+            subscribers = [hub.subscribe("g")[0] for _ in range(1000)]
+            hub.publish("g", "move", {"column": 3}, seq=1)
+            return hub, subscribers
+
+        hub, subscribers = self.run_async(scenario())
+        first = drain(subscribers[0])
+        self.assertEqual(len(first), 1)
+        self.assertEqual(first[0].json, '{"column": 3, "type": "move"}')
+        self.assertTrue(all(drain(s)[0] is first[0] for s in subscribers[1:]))
+        self.assertEqual(hub.stats()["events_delivered"], 1000)
+
+    def test_slow_subscriber_is_dropped_without_holding_up_others(self):
+        async def scenario():
+            hub = SpectatorHub(buffer=4)
+            slow, _ = hub.subscribe("g")
+            fast, _ = hub.subscribe("g")
+            received = []
+            for ply in range(1, 11):
+                hub.publish("g", "move", {"ply": ply}, seq=ply)
+                received.extend(drain(fast))
+            return hub, slow, received
+
+        hub, slow, received = self.run_async(scenario())
+        self.assertEqual(len(received), 10)
+        events = drain(slow)
+        self.assertEqual([e.kind for e in events[:-1]], ["dropped"]) # Its backlog is thrown away
+        self.assertIsNone(events[-1])
+        self.assertTrue(slow.dropped)
+        self.assertEqual(hub.stats()["dropped"], 1)
+
+    def test_repeated_and_stale_moves_go_out_once(self):
+        async def scenario():
+            hub = SpectatorHub()
+            subscriber, created = hub.subscribe("g")
+            for ply in (1, 2, 2, 1, 3):
+                hub.publish("g", "move", {}, seq=ply)
+            return subscriber, created
+
+        subscriber, created = self.run_async(scenario())
+        self.assertTrue(created)
+        self.assertEqual([e.seq for e in drain(subscriber)], [1, 2, 3])
+
+    def test_publish_from_another_thread_and_close(self):
+        async def scenario():
+            hub = SpectatorHub()
+            subscriber, _ = hub.subscribe("g")
+            hub.publish("other", "move", {}) # Nobody watching: ignored
+            thread = threading.Thread(target=lambda: (hub.publish("g", "move", {}, seq=1), hub.close("g", "deleted")))
+            thread.start()
+            events = [await asyncio.wait_for(subscriber.get(), 5) for _ in range(3)]
+            thread.join()
+            return hub, events
+
+        hub, events = self.run_async(scenario())
+        self.assertEqual([e and e.kind for e in events], ["move", "deleted", None])
+        self.assertFalse(hub.watching("g"))
+        self.assertEqual(hub.stats()["subscribers"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
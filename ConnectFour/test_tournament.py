@@ -0,0 +1,54 @@
+import unittest
+import json
+import os
+import tempfile
+from tournament import fit_elo, opening_suite, run, check_engine, parse_engine
+
+ROSTER = [check_engine({"name": "d1", "depth": 1}), check_engine({"name": "d2", "depth": 2})]
+
+class TestTournament(unittest.TestCase):
+    def test_elo_fit(self):
+        even = [("a", "b", 1.0), ("a", "b", 0.0)] * 10
+        self.assertAlmostEqual(fit_elo(even, ["a", "b"])["a"], 0, places=6)
+        # 3:1 is ~191 Elo apart
+        lopsided = [("a", "b", 1.0)] * 30 + [("b", "a", 1.0)] * 10
+        elo = fit_elo(lopsided, ["a", "b"], prior_draws=0)
+        self.assertAlmostEqual(elo["a"] - elo["b"], 400 * 0.4771, delta=0.5)
+        # The prior keeps a shutout finite
+        shutout = fit_elo([("a", "b", 1.0)] * 5, ["a", "b"])
+        self.assertGreater(shutout["a"], shutout["b"])
+
+    def test_opening_suite_is_reproducible(self):
+        suite = opening_suite(3, 4, seed=5)
+        self.assertEqual(suite, opening_suite(3, 4, seed=5))
+        self.assertEqual(len({tuple(opening) for opening in suite}), 3)
+        self.assertTrue(all(len(opening) == 4 for opening in suite))
+
+    def test_engine_spec_parsing(self):
+        self.assertEqual(parse_engine("fast:depth=20,eval=v1,time=0.05"),
+                         {"name": "fast", "depth": 20, "evaluation": "v1", "time_budget": 0.05})
+        with self.assertRaises(ValueError):
+            parse_engine("bad:speed=3")
+
+    def test_interrupted_run_resumes(self):
+        openings = [[3, 3], [2, 4]]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "results.jsonl")
+            games = run(ROSTER, openings, path, workers=0)
+            self.assertEqual(len(games), 4)
+            self.assertTrue(all(g["score"] in (0, 0.5, 1) for g in games))
+            with open(path, "rb+") as f: # Lose the last result and tear the one before
+                lines = f.read().splitlines(keepends=True)
+                f.seek(0)
+                f.truncate()
+                f.write(b"".join(lines[:-2]) + lines[-2][:10])
+            games = run(ROSTER, openings, path, workers=0)
+            self.assertEqual(len(games), 4)
+            with open(path) as f:
+                records = [json.loads(line) for line in f]
+            self.assertEqual(len(records), 5) # Header + each game once
+            with self.assertRaises(ValueError):
+                run(ROSTER[::-1], openings, path, workers=0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,348 @@
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from game_engine import ConnectFourGame
+from bot_ai import MinimaxAI, EVALUATIONS
+
+# Round-robin tournament between bot configurations, with Elo ratings.
+#
+#   python tournament.py --openings 20 --workers 8
+#   python tournament.py --engine d4:depth=4 --engine d4-v1:depth=4,eval=v1 --engine fast:depth=20,time=0.05
+#   python tournament.py --roster roster.json --output results.jsonl --report report.json
+#
+# An engine is a name plus depth, evaluation ("v1"/"v2") and an optional time budget
+# per move (seconds; iterative deepening, with depth as the cap). Every pair of engines
+# plays every opening of a random suite twice, once with each side moving first.
+# Openings are random move sequences kept only if a reference search finds them
+# roughly even, so games differ while neither side starts lost.
+#
+# Games run in worker processes (--workers, default all cores; 0 plays in-process).
+# Each result is appended to --output as one JSON line as soon as it's known; running
+# the same command again resumes from that file, skipping games already played.
+
+DEFAULT_ROSTER = [
+    {"name": "easy", "depth": 2},
+    {"name": "medium", "depth": 4},
+    {"name": "medium-v1", "depth": 4, "evaluation": "v1"},
+    {"name": "hard", "depth": 6},
+]
+
+KEY_ALIASES = {"eval": "evaluation", "time": "time_budget"}
+
+
+def parse_engine(text):
+    """'name:depth=4,eval=v1,time=0.5' -> engine spec dict"""
+    name, _, options = text.partition(":")
+    spec = {"name": name}
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        key = KEY_ALIASES.get(key.strip(), key.strip())
+        spec[key] = value.strip() if key == "evaluation" else float(value) if key == "time_budget" else int(value)
+    return check_engine(spec)
+
+
+def check_engine(spec):
+    spec = dict(spec)
+    unknown = set(spec) - {"name", "depth", "evaluation", "time_budget"}
+    if unknown or not spec.get("name"):
+        raise ValueError(f"Bad engine spec {spec}: needs a name, and only depth, evaluation, time_budget")
+    spec.setdefault("depth", 4)
+    spec.setdefault("evaluation", "v2")
+    spec.setdefault("time_budget", None)
+    if spec["evaluation"] not in EVALUATIONS:
+        raise ValueError(f"Unknown evaluation {spec['evaluation']!r} (one of {', '.join(EVALUATIONS)})")
+    return spec
+
+
+def make_bot(spec, player):
+    return MinimaxAI(player, depth=spec["depth"], evaluation=spec["evaluation"], time_budget=spec["time_budget"])
+
+
+def opening_suite(count, plies, seed, balance=100, reference_depth=4, max_attempts=None):
+    """
+    `count` distinct random openings of `plies` moves whose position a depth
+    `reference_depth` search scores within +-balance for the side to move.
+    """
+    rng = random.Random(seed)
+    openings = []
+    seen = set()
+    attempts = 0
+    while len(openings) < count:
+        attempts += 1
+        if attempts > (max_attempts or count * 100):
+            raise ValueError(f"Only found {len(openings)} balanced openings; loosen --balance or use fewer plies")
+        game = ConnectFourGame()
+        for _ in range(plies):
+            game.drop_piece(rng.choice(game.get_valid_moves()))
+            if game.game_over:
+                break
+        moves = tuple(game.move_history)
+        if game.game_over or moves in seen:
+            continue
+        seen.add(moves)
+        _, score = MinimaxAI(game.current_player, depth=reference_depth).get_best_move(
+            game.board, game.get_valid_moves())
+        if abs(score) <= balance:
+            openings.append(list(moves))
+    return openings
+
+
+def schedule(roster, openings):
+    """Every game of the tournament: (key, first engine, second engine, opening index)"""
+    games = []
+    for i, a in enumerate(roster):
+        for b in roster[i + 1:]:
+            for n in range(len(openings)):
+                games.append((f"{a['name']}|{b['name']}|{n}", a, b, n))
+                games.append((f"{b['name']}|{a['name']}|{n}", b, a, n))
+    return games
+
+
+def play_game(key, first, second, opening_index, opening):
+    """Play one game from an opening. `first` moves first (player 1) after the opening."""
+    game = ConnectFourGame()
+    for column in opening:
+        game.drop_piece(column)
+    # The engine moving first out of the opening plays whichever color is to move
+    seats = {game.current_player: first, 3 - game.current_player: second}
+    bots = {player: make_bot(spec, player) for player, spec in seats.items()}
+    think = {first["name"]: 0.0, second["name"]: 0.0}
+    while not game.game_over:
+        spec = seats[game.current_player]
+        start = time.perf_counter()
+        column, _ = bots[game.current_player].get_best_move(game.board, game.get_valid_moves())
+        think[spec["name"]] += time.perf_counter() - start
+        game.drop_piece(column)
+    if game.winner == "draw":
+        score = 0.5
+    else:
+        score = 1.0 if seats[game.winner] is first else 0.0
+    return {
+        "type": "game",
+        "key": key,
+        "first": first["name"],
+        "second": second["name"],
+        "opening": opening_index,
+        "score": score, # For `first`
+        "moves": game.move_history,
+        "think_seconds": {name: round(seconds, 4) for name, seconds in think.items()},
+    }
+
+
+def fit_elo(results, names, prior_draws=1.0, iterations=500):
+    """
+    Maximum-likelihood ratings (Bradley-Terry, a draw counts half a win each way) from
+    (name, name, score of the first) results. Every pair that met gets `prior_draws`
+    virtual draws, so an engine that never scored still gets a finite rating.
+    Returns {name: elo}, centered on 0.
+    """
+    index = {name: i for i, name in enumerate(names)}
+    n = len(names)
+    games = [[0.0] * n for _ in range(n)]
+    wins = [0.0] * n
+    for a, b, score in results:
+        i, j = index[a], index[b]
+        games[i][j] += 1
+        games[j][i] += 1
+        wins[i] += score
+        wins[j] += 1 - score
+    for i in range(n):
+        for j in range(n):
+            if i != j and games[i][j]:
+                games[i][j] += prior_draws
+                wins[i] += prior_draws / 2
+    strength = [1.0] * n
+    for _ in range(iterations):
+        updated = []
+        for i in range(n):
+            denominator = sum(games[i][j] / (strength[i] + strength[j]) for j in range(n) if games[i][j])
+            updated.append(wins[i] / denominator if denominator else strength[i])
+        mean = math.exp(sum(math.log(s) for s in updated) / n)
+        updated = [s / mean for s in updated]
+        done = max(abs(u - s) for u, s in zip(updated, strength)) < 1e-9
+        strength = updated
+        if done:
+            break
+    return {name: 400 * math.log10(strength[index[name]]) for name in names}
+
+
+def elo_intervals(results, names, samples=200, confidence=0.95, seed=0):
+    """Bootstrap confidence intervals: refit on games resampled with replacement."""
+    rng = random.Random(seed)
+    fits = {name: [] for name in names}
+    for _ in range(samples):
+        resampled = [results[rng.randrange(len(results))] for _ in results]
+        for name, elo in fit_elo(resampled, names).items():
+            fits[name].append(elo)
+    tail = (1 - confidence) / 2
+    intervals = {}
+    for name, values in fits.items():
+        values.sort()
+        intervals[name] = (values[int(tail * (len(values) - 1))], values[int((1 - tail) * (len(values) - 1))])
+    return intervals
+
+
+def load_results(path):
+    """Header and game records of a results file. A line torn by an interrupted run is cut off."""
+    header, games = None, {}
+    if not os.path.exists(path):
+        return header, games
+    with open(path, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end) # Appending after a partial line would corrupt the next record too
+    for line in data[:end].splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if record["type"] == "header":
+            header = record
+        elif record["type"] == "game":
+            games[record["key"]] = record
+    return header, games
+
+
+def report(roster, games, bootstrap=200):
+    names = [spec["name"] for spec in roster]
+    results = [(g["first"], g["second"], g["score"]) for g in games]
+    elo = fit_elo(results, names) if results else {name: 0.0 for name in names}
+    intervals = elo_intervals(results, names, bootstrap) if results and bootstrap else {}
+    rows = {name: {"games": 0, "wins": 0, "draws": 0, "losses": 0, "think_seconds": 0.0, "moves": 0}
+            for name in names}
+    for g in games:
+        for name, score in ((g["first"], g["score"]), (g["second"], 1 - g["score"])):
+            row = rows[name]
+            row["games"] += 1
+            row["wins" if score == 1 else "losses" if score == 0 else "draws"] += 1
+            row["think_seconds"] += g["think_seconds"][name]
+        # Moves after the opening alternate, first engine first
+        played = len(g["moves"]) - len(g.get("opening_moves", []))
+        rows[g["first"]]["moves"] += (played + 1) // 2
+        rows[g["second"]]["moves"] += played // 2
+    table = []
+    for name in sorted(names, key=lambda name: -elo[name]):
+        row = rows[name]
+        low, high = intervals.get(name, (None, None))
+        table.append({
+            "name": name,
+            "elo": round(elo[name], 1),
+            "elo_low": round(low, 1) if low is not None else None,
+            "elo_high": round(high, 1) if high is not None else None,
+            "games": row["games"],
+            "wins": row["wins"],
+            "draws": row["draws"],
+            "losses": row["losses"],
+            "score": round((row["wins"] + row["draws"] / 2) / row["games"], 4) if row["games"] else None,
+            "avg_move_seconds": round(row["think_seconds"] / row["moves"], 4) if row["moves"] else None,
+        })
+    return {"games": len(games), "engines": table}
+
+
+def print_report(summary):
+    print(f"\n{summary['games']} games\n")
+    print(f"{'engine':<20} {'elo':>7} {'95% CI':>17} {'games':>6} {'W-D-L':>13} {'score':>6} {'s/move':>8}")
+    for row in summary["engines"]:
+        ci = f"[{row['elo_low']:.0f}, {row['elo_high']:.0f}]" if row["elo_low"] is not None else "-"
+        wdl = f"{row['wins']}-{row['draws']}-{row['losses']}"
+        score = f"{row['score']:.1%}" if row["score"] is not None else "-"
+        move = f"{row['avg_move_seconds']:.3f}" if row["avg_move_seconds"] is not None else "-"
+        print(f"{row['name']:<20} {row['elo']:>7.0f} {ci:>17} {row['games']:>6} {wdl:>13} {score:>6} {move:>8}")
+
+
+def run(roster, openings, output, workers, seed=None):
+    """Play every game not yet in `output`, appending each result as it finishes. Returns all game records."""
+    header, done = load_results(output)
+    if header is None:
+        header = {"type": "header", "roster": roster, "openings": openings, "seed": seed}
+        with open(output, "a") as f:
+            f.write(json.dumps(header) + "\n")
+    elif header["roster"] != roster or header["openings"] != openings:
+        raise ValueError(f"{output} belongs to a different tournament (roster or openings differ)")
+    pending = [game for game in schedule(roster, openings) if game[0] not in done]
+    print(f"{len(done)} games already played, {len(pending)} to go")
+
+    with open(output, "a") as f:
+        def record(result):
+            result["opening_moves"] = openings[result["opening"]]
+            f.write(json.dumps(result) + "\n")
+            f.flush()
+            done[result["key"]] = result
+            if len(done) % 10 == 0:
+                print(f"  {len(done)} games", flush=True)
+
+        if workers == 0:
+            for key, first, second, n in pending:
+                record(play_game(key, first, second, n, openings[n]))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(play_game, key, first, second, n, openings[n])
+                           for key, first, second, n in pending]
+                try:
+                    for future in as_completed(futures):
+                        record(future.result())
+                except KeyboardInterrupt:
+                    for future in futures:
+                        future.cancel()
+                    raise
+    return list(done.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Round-robin tournament between Connect Four bot configurations.")
+    parser.add_argument("--engine", action="append", type=parse_engine, default=[],
+                        help="name:depth=4,eval=v1,time=0.5 (repeat for each engine)")
+    parser.add_argument("--roster", help="JSON file with a list of engine specs")
+    parser.add_argument("--openings", type=int, default=10, help="openings in the suite (each played twice per pair)")
+    parser.add_argument("--opening-plies", type=int, default=4)
+    parser.add_argument("--balance", type=float, default=100,
+                        help="keep openings the reference search scores within +-this")
+    parser.add_argument("--seed", type=int, default=None, help="opening suite seed (random if omitted)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes; 0 = in-process")
+    parser.add_argument("--bootstrap", type=int, default=200, help="resamples for the Elo confidence intervals")
+    parser.add_argument("--output", default="tournament_results.jsonl")
+    parser.add_argument("--report", help="also write the final table as JSON here")
+    args = parser.parse_args(argv)
+
+    header, _ = load_results(args.output)
+    seed = header["seed"] if header is not None else None
+    if header is not None and not args.engine and not args.roster:
+        # Resuming with no roster given: carry on with the file's
+        roster, openings = header["roster"], header["openings"]
+    else:
+        if args.roster:
+            with open(args.roster) as f:
+                roster = [check_engine(spec) for spec in json.load(f)]
+        else:
+            roster = args.engine or [check_engine(spec) for spec in DEFAULT_ROSTER]
+        if len({spec["name"] for spec in roster}) != len(roster) or len(roster) < 2:
+            parser.error("need at least two engines with distinct names")
+        if header is not None:
+            openings = header["openings"] # Resume on the suite the file was started with
+        else:
+            seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+            print(f"Building {args.openings} openings (seed {seed})...")
+            openings = opening_suite(args.openings, args.opening_plies, seed, args.balance)
+    try:
+        games = run(roster, openings, args.output, args.workers, seed)
+    except ValueError as e:
+        sys.exit(str(e))
+    except KeyboardInterrupt:
+        sys.exit(f"\nInterrupted; run again to resume from {args.output}")
+
+    summary = report(roster, games, args.bootstrap)
+    print_report(summary)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(summary, f, indent=2)
+    return summary
+
+
+if __name__ == "__main__":
+    main()